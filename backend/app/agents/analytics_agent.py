@@ -1,99 +1,220 @@
 import json
+import threading
+from datetime import datetime
 from app.agents.base import BaseAgent
 from app.models.fresher import Fresher, Skill
-from app.models.assessment import Submission
-from app.models.report import Alert
+from app.models.assessment import Assessment, Submission
+from app.core.assessment_cache import compiled_assessments
+from app.core.cohort_stats import CohortStats
+from app.core.periodic import PeriodicTask
+from app.config import settings
+from app.models.analytics import PerformanceAnalytics
+
+# Serializes read-modify-write of one fresher's analytics row across event workers
+_analytics_locks = [threading.Lock() for _ in range(64)]
 
 
 class AnalyticsAgent(BaseAgent):
     """The Strategist — performs cohort analysis, risk prediction, and gap identification."""
 
+    llm_task = "risk"
+
     def __init__(self):
         super().__init__()
 
     def execute(self, db, **kwargs):
         return self.cohort_analysis(db)
 
-    def predict_risk(self, db, fresher: Fresher):
-        """Predict risk level for a fresher using LLM analysis."""
-        # Gather data
-        skills = db.query(Skill).filter(Skill.fresher_id == fresher.id).all()
-        subs = db.query(Submission).filter(Submission.user_id == fresher.user_id).all()
-        avg_score = sum(s.score or 0 for s in subs) / len(subs) if subs else 0
-        failed = sum(1 for s in subs if s.pass_status == "fail")
-
-        prompt = f"""
-Analyze risk for trainee:
-- Overall progress: {fresher.overall_progress}%
-- Average score: {avg_score:.1f}
-- Failed assessments: {failed}/{len(subs)}
-- Skills: {json.dumps([{"name": s.name, "level": s.level} for s in skills])}
-
-Return JSON with risk_level (low/medium/high/critical), risk_score (0-100), factors (list), recommendations (list).
-"""
-        response = self.call_llm(prompt)
-
-        try:
-            result = json.loads(response)
-        except Exception:
-            # Deterministic fallback
-            if avg_score >= 75:
-                risk_level, risk_score = "low", 15
-            elif avg_score >= 60:
-                risk_level, risk_score = "medium", 40
-            elif avg_score >= 40:
-                risk_level, risk_score = "high", 70
-            else:
-                risk_level, risk_score = "critical", 90
-
-            result = {
-                "risk_level": risk_level,
-                "risk_score": risk_score,
-                "factors": [
-                    f"Average score: {avg_score:.0f}%",
-                    f"Failed {failed} assessments",
-                ],
-                "recommendations": [
-                    "Review weak skill areas",
-                    "Schedule mentoring session" if risk_score > 50 else "Continue current pace",
-                ],
-            }
+    def predict_risk(self, db, fresher: Fresher, raise_alert: bool = True):
+        """Score a fresher's risk with the local risk model (see app/agents/risk_engine.py).
+
+        The LLM is only asked to explain borderline and high-risk results. With
+        ``raise_alert=False`` no Alert is touched; the post-grading pipeline
+        raises alerts itself when the level changes. Otherwise the fresher's
+        open alert is created or updated in place.
+        """
+        from app.agents.risk_engine import HIGH_RISK, risk_engine
+        result = risk_engine.assess(db, [fresher])[0]
+        if result["borderline"] or result["risk_level"] in HIGH_RISK:
+            risk_engine.explain(db, result)
 
         # Update fresher risk
-        fresher.risk_level = result.get("risk_level", "low")
-        fresher.risk_score = result.get("risk_score", 0)
-
-        # Create alert if high risk
-        if fresher.risk_level in ("high", "critical"):
-            from app.models.user import User
-            user = db.query(User).filter(User.id == fresher.user_id).first()
-            alert = Alert(
-                fresher_id=fresher.id,
-                fresher_name=f"{user.first_name} {user.last_name}" if user else "Unknown",
-                risk_level=fresher.risk_level,
-                risk_score=fresher.risk_score,
-                reason="; ".join(result.get("factors", ["High risk detected"])),
-                status="new",
-            )
-            db.add(alert)
+        fresher.risk_level = result["risk_level"]
+        fresher.risk_score = result["risk_score"]
+
+        if raise_alert:
+            risk_engine.upsert_alert(db, fresher, result)
 
         db.commit()
         result["agent"] = "AnalyticsAgent"
         return result
 
+    @staticmethod
+    def _week_key(when) -> str:
+        year, week, _ = when.isocalendar()
+        return f"{year}-W{week:02d}"
+
+    @staticmethod
+    def _materialize(analytics: PerformanceAnalytics, state: dict):
+        """Derive the public PerformanceAnalytics columns from its running sums."""
+        count = state["count"]
+        analytics.assessment_count = count
+        analytics.passed_count = state["passed"]
+        analytics.failed_count = count - state["passed"]
+        analytics.overall_score = state["total"] / count if count else 0
+        analytics.quiz_average = state["quiz_total"] / state["quiz_count"] if state["quiz_count"] else 0
+        analytics.pass_rate = state["passed"] / count * 100 if count else 0
+        analytics.skills_breakdown = {
+            skill: round(total / n, 1) for skill, (n, total) in sorted(state["skills"].items()) if n
+        }
+        weeks = sorted(state["weeks"])[-settings.ANALYTICS_TREND_WEEKS:]
+        state["weeks"] = {w: state["weeks"][w] for w in weeks}
+        trend = {w: round(total / n, 1) for w, (n, total) in state["weeks"].items() if n}
+        analytics.score_trend = trend
+        first, last = (trend[weeks[0]], trend[weeks[-1]]) if len(trend) >= 2 else (0, 0)
+        analytics.improvement_rate = round((last - first) / first * 100, 1) if first else 0
+        analytics.materialized_state = state
+        analytics.updated_at = datetime.utcnow()
+
+    @classmethod
+    def _fold(cls, state: dict, submission: Submission, skills: list):
+        score = submission.score
+        state["count"] += 1
+        state["total"] += score
+        if submission.pass_status == "pass":
+            state["passed"] += 1
+        if submission.submission_type == "quiz":
+            state["quiz_count"] += 1
+            state["quiz_total"] += score
+        for skill in skills:
+            n, total = state["skills"].get(skill, (0, 0.0))
+            state["skills"][skill] = (n + 1, total + score)
+        when = submission.submitted_at or submission.graded_at or datetime.utcnow()
+        week = cls._week_key(when)
+        n, total = state["weeks"].get(week, (0, 0.0))
+        state["weeks"][week] = (n + 1, total + score)
+        submission.in_analytics = True
+
+    def update_performance_analytics(self, db, fresher: Fresher):
+        """Rebuild a fresher's PerformanceAnalytics row from all their graded submissions."""
+        submissions = db.query(Submission).filter(
+            Submission.user_id == fresher.user_id,
+            Submission.score != None,
+        ).order_by(Submission.submitted_at).all()
+        if not submissions:
+            return None
+
+        assessments = {
+            a.id: a for a in db.query(Assessment).filter(Assessment.id.in_({s.assessment_id for s in submissions})).all()
+        }
+        state = {"count": 0, "total": 0.0, "passed": 0, "quiz_count": 0, "quiz_total": 0.0, "skills": {}, "weeks": {}}
+        for sub in submissions:
+            assessment = assessments.get(sub.assessment_id)
+            self._fold(state, sub, compiled_assessments.get(assessment).skills_assessed if assessment else [])
+
+        analytics = db.query(PerformanceAnalytics).filter(PerformanceAnalytics.fresher_id == fresher.id).first()
+        if not analytics:
+            analytics = PerformanceAnalytics(fresher_id=fresher.id)
+            db.add(analytics)
+        analytics.last_assessment_date = max((s.submitted_at for s in submissions if s.submitted_at), default=None)
+        analytics.risk_level = fresher.risk_level
+        analytics.risk_score = fresher.risk_score
+        self._materialize(analytics, state)
+        db.commit()
+        return analytics
+
+    def apply_graded_submission(self, db, fresher: Fresher, submission: Submission):
+        """Fold one newly graded submission into the fresher's PerformanceAnalytics in O(1).
+
+        Rows without running sums (created before materialization existed) and
+        regraded submissions fall back to a full rebuild.
+        """
+        if submission.score is None:
+            return None
+        with _analytics_locks[fresher.id % len(_analytics_locks)]:
+            return self._apply_graded_submission(db, fresher, submission)
+
+    def _apply_graded_submission(self, db, fresher: Fresher, submission: Submission):
+        # Claim the submission in the database rather than trusting the loaded flag: a rebuild
+        # may have folded it in since it was read. The write also holds SQLite's write lock
+        # (and FOR UPDATE the row elsewhere) until commit, so folds of one fresher serialize
+        # even when the caller commits after the in-process lock is released.
+        claimed = db.query(Submission).filter(
+            Submission.id == submission.id, Submission.in_analytics.isnot(True)
+        ).update({Submission.in_analytics: True}, synchronize_session=False)
+        analytics = db.query(PerformanceAnalytics).filter(
+            PerformanceAnalytics.fresher_id == fresher.id
+        ).with_for_update().first()
+        if analytics is None or not analytics.materialized_state or not claimed:
+            return self.update_performance_analytics(db, fresher)
+
+        assessment = db.query(Assessment).filter(Assessment.id == submission.assessment_id).first()
+        state = json.loads(json.dumps(analytics.materialized_state))  # a copy, so the JSON column registers the change
+        self._fold(state, submission, compiled_assessments.get(assessment).skills_assessed if assessment else [])
+        if submission.submitted_at and (
+            analytics.last_assessment_date is None
+            or submission.submitted_at.replace(tzinfo=None) > analytics.last_assessment_date.replace(tzinfo=None)
+        ):
+            analytics.last_assessment_date = submission.submitted_at
+        analytics.risk_level = fresher.risk_level
+        analytics.risk_score = fresher.risk_score
+        self._materialize(analytics, state)
+        db.commit()
+        return analytics
+
+    def recompute_cohort_ranks(self, db) -> int:
+        """Batch pass: cohort_rank and cohort_percentile for every fresher from one sort."""
+        rows = db.query(PerformanceAnalytics.id, PerformanceAnalytics.overall_score).filter(
+            PerformanceAnalytics.assessment_count > 0
+        ).all()
+        ranked = sorted(rows, key=lambda r: r.overall_score or 0, reverse=True)
+        n = len(ranked)
+        updates = []
+        rank = 0
+        previous = None
+        for position, row in enumerate(ranked, 1):
+            score = row.overall_score or 0
+            if score != previous:
+                rank, previous = position, score
+            updates.append({
+                "id": row.id,
+                "cohort_rank": rank,
+                # Share of the cohort this fresher scores at or above
+                "cohort_percentile": round((n - rank + 1) / n * 100, 1),
+            })
+        if updates:
+            db.bulk_update_mappings(PerformanceAnalytics, updates)
+            db.commit()
+        return n
+
     def cohort_analysis(self, db):
-        freshers = db.query(Fresher).all()
-        if not freshers:
+        rows = db.query(Fresher.overall_progress, Fresher.risk_level).all()
+        if not rows:
             return {"total": 0, "average_progress": 0, "risk_distribution": {}}
 
-        avg_progress = sum(f.overall_progress for f in freshers) / len(freshers)
-        risk_dist = {}
-        for f in freshers:
-            risk_dist[f.risk_level] = risk_dist.get(f.risk_level, 0) + 1
-
+        cohort = CohortStats.from_records(
+            rows,
+            labels={"risk_level": lambda r: r.risk_level},
+            columns={"progress": lambda r: r.overall_progress},
+        )
         return {
-            "total": len(freshers),
-            "average_progress": round(avg_progress, 1),
-            "risk_distribution": risk_dist,
+            "total": cohort.size,
+            "average_progress": round(cohort.mean("progress"), 1),
+            "progress_percentiles": cohort.percentiles("progress"),
+            "risk_distribution": cohort.value_counts("risk_level"),
             "agent": "AnalyticsAgent",
         }
+
+
+def _refresh_cohort_ranks():
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        ranked = AnalyticsAgent().recompute_cohort_ranks(db)
+        print(f"[AnalyticsAgent] ✓ Cohort ranks refreshed for {ranked} freshers")
+    finally:
+        db.close()
+
+
+# Periodic batch pass for cohort_rank / cohort_percentile (started in app startup)
+cohort_rank_refresher = PeriodicTask("CohortRanks", settings.ANALYTICS_RANK_INTERVAL_SECONDS, _refresh_cohort_ranks)
@@ -1,47 +1,70 @@
 import json
-import random
-from datetime import datetime, timezone, date
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from app.agents.base import BaseAgent
+from app.schemas.agent_outputs import ReviewFeedback
 from app.models.assessment import Assessment, Submission
+from app.core.assessment_cache import compiled_assessments, normalize_answer
+from app.core.code_sandbox import code_sandbox
 from app.config import settings
 
+# Bounds concurrent explanation LLM calls across all grading workers. Repeats across
+# submissions (many freshers miss the same daily question the same way) are answered
+# by the LLM response cache, which never stores mock fallbacks.
+_explanation_pool = ThreadPoolExecutor(
+    max_workers=settings.LLM_EXPLANATION_CONCURRENCY,
+    thread_name_prefix="ExplanationWorker",
+)
+
 
 class AssessmentAgent(BaseAgent):
     """The Evaluator — grades code and quiz submissions using LLM review."""
 
+    use_llm_cache = True
+    llm_task = "code_review"
+
     def __init__(self):
-        super().__init__(model_name=settings.OLLAMA_CODE_MODEL)
+        super().__init__()
+
+    @staticmethod
+    def _explanation_key(iq: dict) -> tuple:
+        return (
+            str(iq["question"]).strip(),
+            str(iq["user_answer"]).strip().lower(),
+            str(iq["correct_answer"]).strip().lower(),
+        )
+
+    def _generate_explanation(self, iq: dict) -> str:
+        expl_prompt = f"""
+                    Question: {iq['question']}
+                    User Answer: {iq['user_answer']}
+                    Correct Answer: {iq['correct_answer']}
+                    
+                    Explain why the user's answer is wrong and why the correct answer is right.
+                    Keep it to 1-2 short, helpful sentences. Address the user directly ("You...").
+                    """
+        return self.call_llm(expl_prompt, task="explanation").strip().replace("\"", "'")
+
+    def _explain_incorrect(self, incorrect: list) -> list:
+        """One explanation per wrong answer, in order. Distinct wrong answers are
+        generated in parallel, so the batch is one LLM round-trip."""
+        keys = [self._explanation_key(iq) for iq in incorrect]
+        pending = {}
+        for key, iq in zip(keys, incorrect):
+            if key not in pending:
+                pending[key] = _explanation_pool.submit(self._generate_explanation, iq)
+
+        found = {}
+        for key, future in pending.items():
+            try:
+                found[key] = future.result() or None
+            except Exception as ex:
+                print(f"[AssessmentAgent] ✗ Explanation generation failed: {ex}")
 
-    def _extract_json_from_llm_response(self, llm_response: str) -> dict:
-        """Extract JSON from LLM response, handling markdown code blocks."""
-        try:
-            response_text = llm_response.strip()
-            
-            # Remove markdown code blocks
-            if "```json" in response_text:
-                start = response_text.find("```json") + 7
-                end = response_text.find("```", start)
-                if end > start:
-                    response_text = response_text[start:end].strip()
-            elif "```" in response_text:
-                start = response_text.find("```") + 3
-                end = response_text.find("```", start)
-                if end > start:
-                    response_text = response_text[start:end].strip()
-            
-            # Extract JSON object
-            json_start = response_text.find("{")
-            json_end = response_text.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                response_text = response_text[json_start:json_end]
-            
-            parsed = json.loads(response_text)
-            print(f"[AssessmentAgent] ✓ Successfully parsed LLM JSON response")
-            return parsed
-        except Exception as e:
-            print(f"[AssessmentAgent] ✗ JSON parse error: {e}")
-            print(f"[AssessmentAgent] Raw response: {llm_response[:200]}...")
-            return {}
+        return [
+            found.get(key) or f"The correct answer is '{iq['correct_answer']}'."
+            for key, iq in zip(keys, incorrect)
+        ]
 
     def execute(self, db, submission: Submission):
         assessment = db.query(Assessment).filter(Assessment.id == submission.assessment_id).first()
@@ -55,35 +78,16 @@ class AssessmentAgent(BaseAgent):
         else:
             result = self._grade_assignment(db, submission, assessment)
 
-        # Update profile after grading
+        # Skills, badges, analytics and risk are updated by event subscribers
         try:
-            from app.agents.profile_agent import ProfileAgent
-            from app.models.fresher import Fresher
-            fresher = db.query(Fresher).filter(Fresher.user_id == submission.user_id).first()
-            if fresher:
-                profile_agent = ProfileAgent()
-                profile_agent.update_after_assessment(db, fresher, submission)
+            from app.agents.post_grading import publish_submission_graded
+            publish_submission_graded(db, submission)
         except Exception as e:
-            print(f"[AssessmentAgent] Profile update error: {e}")
+            print(f"[AssessmentAgent] Publishing submission.graded failed: {e}")
 
         return result
 
     def _grade_quiz(self, db, submission: Submission, assessment: Assessment):
-        def normalize_answer(value):
-            text = str(value or "").strip().lower()
-            if text in ["true", "t", "yes", "1"]:
-                return "true"
-            if text in ["false", "f", "no", "0"]:
-                return "false"
-            return text
-
-        def select_daily_questions(question_list, count, assessment_id):
-            if not question_list or len(question_list) <= count:
-                return question_list
-            day_seed = int(date.today().strftime("%Y%m%d")) + int(assessment_id)
-            rng = random.Random(day_seed)
-            return rng.sample(question_list, count)
-
         # Parse answers
         answers = {}
         if submission.answers:
@@ -92,58 +96,35 @@ class AssessmentAgent(BaseAgent):
             except Exception:
                 pass
 
-        # Parse questions for correct answers
-        questions = []
-        if assessment.questions:
-            try:
-                questions = json.loads(assessment.questions)
-            except Exception:
-                pass
-
-        if assessment.assessment_type == "quiz":
-            questions = select_daily_questions(questions, 5, assessment.id)
+        # Today's questions with their precomputed answer key
+        answer_key = compiled_assessments.get(assessment).answer_key(5)
+        questions = [kq.question for kq in answer_key]
 
         # Auto-grade against correct answers
         total_points = 0
         earned_points = 0
         incorrect_questions = []  # Store full question details for better feedback
         
-        for q_index, q in enumerate(questions):
-            q_id_raw = q.get("id", "")
-            q_id = str(q_id_raw).strip()
-            points = q.get("points", 10)
+        for kq in answer_key:
+            q = kq.question
+            points = 10 if kq.points is None else kq.points
             total_points += points
-            correct = q.get("correct_answer", "")
-
-            candidate_keys = [
-                q_id_raw,
-                q_id,
-                f"q{q_index + 1}",
-                str(q_index),
-                str(q_index + 1),
-            ]
-
-            user_answer = ""
-            matched_key = None
-            for key in candidate_keys:
-                if key in answers:
-                    user_answer = answers.get(key, "")
-                    matched_key = key
-                    break
+            matched_key, user_answer = kq.lookup(answers)
+            user_normalized = normalize_answer(user_answer)
 
             print(
-                f"[AssessmentAgent][QUIZ] Q{q_index + 1} id={q_id} key={matched_key} "
-                f"user={normalize_answer(user_answer)!r} correct={normalize_answer(correct)!r}"
+                f"[AssessmentAgent][QUIZ] Q{kq.index + 1} id={kq.candidate_keys[1]} key={matched_key} "
+                f"user={user_normalized!r} correct={kq.correct_normalized!r}"
             )
             
-            if normalize_answer(user_answer) == normalize_answer(correct):
+            if user_normalized == kq.correct_normalized:
                 earned_points += points
             else:
                 # Track full question details for detailed explanations
                 incorrect_questions.append({
                     "question": q.get("question", "Unknown question"),
                     "user_answer": user_answer,
-                    "correct_answer": correct,
+                    "correct_answer": kq.correct,
                     "options": q.get("options", []),
                     "explanation": q.get("explanation", "")
                 })
@@ -185,8 +166,7 @@ IMPORTANT: Return ONLY the JSON object, nothing else.
 
         print(f"[AssessmentAgent] 📝 Requesting LLM feedback for QUIZ...")
         try:
-            llm_feedback = self.call_llm(prompt)
-            feedback_data = self._extract_json_from_llm_response(llm_feedback)
+            feedback_data = self.call_llm_structured(prompt, ReviewFeedback, task="quiz_feedback")
             
             if not feedback_data:
                 raise ValueError("Empty feedback data")
@@ -200,26 +180,13 @@ IMPORTANT: Return ONLY the JSON object, nothing else.
         except Exception as e:
             print(f"[AssessmentAgent] ✗ QUIZ LLM feedback error: {e}, using fallback")
             
-            # Generate personalized explanations using LLM individually for each error
-            # This is slower but ensures high-quality feedback even if the main JSON generation failed
-            detailed_errors = []
-            for iq in incorrect_questions[:5]:
-                try:
-                    expl_prompt = f"""
-                    Question: {iq['question']}
-                    User Answer: {iq['user_answer']}
-                    Correct Answer: {iq['correct_answer']}
-                    
-                    Explain why the user's answer is wrong and why the correct answer is right.
-                    Keep it to 1-2 short, helpful sentences. Address the user directly ("You...").
-                    """
-                    explanation = self.call_llm(expl_prompt).strip().replace("\"", "'")
-                except Exception as ex:
-                    print(f"Error generating explanation for Q: {ex}")
-                    explanation = f"The correct answer is '{iq['correct_answer']}'."
-
-                error_msg = f"For '{iq['question']}', you answered '{iq['user_answer']}'. {explanation}"
-                detailed_errors.append(error_msg)
+            # Generate personalized explanations for each error (memoized, misses run concurrently)
+            # so feedback stays specific even if the main JSON generation failed
+            top_incorrect = incorrect_questions[:5]
+            detailed_errors = [
+                f"For '{iq['question']}', you answered '{iq['user_answer']}'. {explanation}"
+                for iq, explanation in zip(top_incorrect, self._explain_incorrect(top_incorrect))
+            ]
             
             # Fallback feedback based on score
             if score >= 80:
@@ -293,93 +260,29 @@ IMPORTANT: Return ONLY the JSON object, nothing else.
     def _grade_code(self, db, submission: Submission, assessment: Assessment):
         code = submission.code or ""
 
-        # Parse test cases
-        test_cases = []
-        if assessment.test_cases:
-            try:
-                test_cases = json.loads(assessment.test_cases)
-            except Exception:
-                pass
+        compiled = compiled_assessments.get(assessment)
+        test_cases = compiled.test_cases
+        # Optional rubric "entry_point" names the function under test
+        entry_point = compiled.rubric.get("entry_point") if isinstance(compiled.rubric, dict) else None
 
-        # Execute Python code with actual test cases
+        # Compile once per worker, run the suite (fanned out if large), time each call
+        outcomes = code_sandbox.run(code, test_cases, entry_point=entry_point) if test_cases else []
         test_results = []
         passed = 0
-        
-        for i, tc in enumerate(test_cases):
-            try:
-                # Create isolated namespace for code execution
-                namespace = {}
-                
-                # Execute the user's code
-                exec(code, namespace)
-                
-                # Get the function name (assume first function defined)
-                func_name = None
-                for key in namespace:
-                    if callable(namespace[key]) and not key.startswith('_'):
-                        func_name = key
-                        break
-                
-                if not func_name:
-                    test_results.append({
-                        "id": tc.get("id", str(i)),
-                        "name": tc.get("name", f"Test {i+1}"),
-                        "passed": False,
-                        "expected": tc.get("expected_output"),
-                        "actual": "No function found",
-                        "error": "No callable function defined in code",
-                        "points": tc.get("points", 10),
-                    })
-                    continue
-                
-                # Get the test input and execute function
-                test_input = tc.get("input", "")
-                expected = tc.get("expected_output", "")
-                
-                # Parse input (handle different types)
-                try:
-                    if test_input.strip().startswith('['):
-                        parsed_input = eval(test_input)
-                    else:
-                        parsed_input = int(test_input) if test_input.isdigit() else test_input
-                except:
-                    parsed_input = test_input
-                
-                # Call the function
-                func = namespace[func_name]
-                actual = func(parsed_input)
-                
-                # Convert actual output to string for comparison
-                actual_str = str(actual)
-                expected_str = str(expected)
-                
-                # Check if test passed
-                is_pass = actual_str == expected_str
-                
-                test_results.append({
-                    "id": tc.get("id", str(i)),
-                    "name": tc.get("name", f"Test {i+1}"),
-                    "passed": is_pass,
-                    "expected": expected_str,
-                    "actual": actual_str,
-                    "error": None if is_pass else f"Expected {expected_str}, got {actual_str}",
-                    "points": tc.get("points", 10),
-                })
-                
-                if is_pass:
-                    passed += 1
-                    
-            except Exception as e:
-                # Handle execution errors
-                test_results.append({
-                    "id": tc.get("id", str(i)),
-                    "name": tc.get("name", f"Test {i+1}"),
-                    "passed": False,
-                    "expected": tc.get("expected_output"),
-                    "actual": "Error",
-                    "error": str(e),
-                    "points": tc.get("points", 10),
-                })
+
+        for i, (tc, outcome) in enumerate(zip(test_cases, outcomes)):
+            test_results.append({
+                "id": tc.get("id", str(i)),
+                "name": tc.get("name", f"Test {i+1}"),
+                "passed": outcome["passed"],
+                "expected": str(tc.get("expected_output", "")),
+                "actual": outcome["actual"],
+                "error": outcome["error"],
+                "points": tc.get("points", 10),
+                "duration_ms": outcome.get("duration_ms"),
+            })
+            if outcome["passed"]:
+                passed += 1
 
         total_tests = len(test_cases) or 1
         test_score = (passed / total_tests) * 100
@@ -424,11 +327,9 @@ IMPORTANT: Return ONLY the JSON object, nothing else.
 """
         
         print(f"[AssessmentAgent] 💻 Requesting LLM feedback for CODE (test score: {test_score:.1f}%)...")
-        llm_response = self.call_llm(prompt)
+        review = self.call_llm_structured(prompt, ReviewFeedback)
 
         try:
-            review = self._extract_json_from_llm_response(llm_response)
-            
             if not review:
                 raise ValueError("Empty review data")
             
@@ -547,11 +448,9 @@ IMPORTANT: Return ONLY the JSON object, nothing else.
 """
 
         print(f"[AssessmentAgent] 📄 Requesting LLM feedback for ASSIGNMENT ({word_count} words)...")
-        llm_response = self.call_llm(prompt)
+        review = self.call_llm_structured(prompt, ReviewFeedback, task="assignment_scoring")
 
         try:
-            review = self._extract_json_from_llm_response(llm_response)
-            
             if not review:
                 raise ValueError("Empty review data")
             
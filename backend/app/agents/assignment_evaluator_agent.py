@@ -5,10 +5,11 @@ Focuses on communication skills, depth of analysis, and professional presentatio
 """
 
 import json
+from typing import Any, Callable, Optional
 from datetime import datetime, timezone
 from app.agents.base import BaseAgent
+from app.schemas.agent_outputs import AssignmentHRFeedback
 from app.models.assessment import Assessment, Submission
-from app.config import settings
 
 
 class AssignmentEvaluatorAgent(BaseAgent):
@@ -21,13 +22,16 @@ class AssignmentEvaluatorAgent(BaseAgent):
     - Provides comprehensive developmental feedback
     """
 
+    use_llm_cache = True
+    llm_task = "assignment_scoring"
+
     def __init__(self):
-        super().__init__(model_name=settings.OLLAMA_CODE_MODEL)
+        super().__init__()
 
     def execute(self, db, submission: Submission, assessment: Assessment):
         return self.evaluate(db, submission, assessment)
 
-    def evaluate(self, db, submission: Submission, assessment: Assessment):
+    def evaluate(self, db, submission: Submission, assessment: Assessment, emit: Optional[Callable[[str, Any], None]] = None):
         """Main evaluation method for assignment submissions"""
         
         submission_text = submission.submission_text or ""
@@ -47,12 +51,15 @@ class AssignmentEvaluatorAgent(BaseAgent):
             submission_text=submission_text,
             rubric=rubric,
             max_score=assessment.max_score or 100,
-            passing_score=assessment.passing_score or 70
+            passing_score=assessment.passing_score or 70,
+            on_token=(lambda t: emit("token", {"text": t})) if emit else None,
         )
 
         # Extract score from feedback
         score = feedback.get("score", 75)  # Default to 75 if not provided
         pass_status = "pass" if score >= (assessment.passing_score or 70) else "fail"
+        if emit:
+            emit("score", {"score": round(score, 2), "pass_status": pass_status})
 
         # Update submission
         submission.score = round(score, 2)
@@ -70,7 +77,7 @@ class AssignmentEvaluatorAgent(BaseAgent):
             "feedback": feedback
         }
 
-    def _generate_hr_assignment_feedback(self, assessment_title, description, submission_text, rubric, max_score, passing_score):
+    def _generate_hr_assignment_feedback(self, assessment_title, description, submission_text, rubric, max_score, passing_score, on_token=None):
         """Generate professional HR-style assignment feedback using LLM"""
         
         # Construct HR evaluation prompt
@@ -149,14 +156,9 @@ SCORING GUIDANCE:
 Be constructive, specific, and professional. Return ONLY valid JSON."""
 
         try:
-            response = self.call_llm(prompt)
-            feedback = self._extract_json_from_llm_response(response)
-            
-            # Validate required fields
-            required_fields = ["score", "overall_assessment", "competency_rating", "areas_for_improvement"]
-            if all(field in feedback for field in required_fields):
-                # Ensure score is within bounds
-                feedback["score"] = max(0, min(100, feedback.get("score", 75)))
+            # Schema validation enforces the required fields and clamps score to 0-100
+            feedback = self.call_llm_structured(prompt, AssignmentHRFeedback, on_token=on_token)
+            if feedback:
                 return feedback
             else:
                 print(f"[AssignmentEvaluatorAgent] ⚠ LLM response missing required fields")
@@ -166,33 +168,6 @@ Be constructive, specific, and professional. Return ONLY valid JSON."""
             print(f"[AssignmentEvaluatorAgent] ✗ LLM feedback error: {e}")
             return self._get_fallback_feedback(submission_text)
 
-    def _extract_json_from_llm_response(self, llm_response: str) -> dict:
-        """Extract JSON from LLM response"""
-        try:
-            response_text = llm_response.strip()
-            
-            # Remove markdown code blocks
-            if "```json" in response_text:
-                start = response_text.find("```json") + 7
-                end = response_text.find("```", start)
-                if end > start:
-                    response_text = response_text[start:end].strip()
-            elif "```" in response_text:
-                start = response_text.find("```") + 3
-                end = response_text.find("```", start)
-                if end > start:
-                    response_text = response_text[start:end].strip()
-            
-            json_start = response_text.find("{")
-            json_end = response_text.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                response_text = response_text[json_start:json_end]
-            
-            return json.loads(response_text)
-        except Exception as e:
-            print(f"[AssignmentEvaluatorAgent] ✗ JSON parse error: {e}")
-            return {}
-
     def _get_fallback_feedback(self, submission_text):
         """Generate fallback feedback if LLM fails"""
         
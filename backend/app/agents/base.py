@@ -1,20 +1,97 @@
+import time
 from abc import ABC, abstractmethod
+from typing import Callable, Optional, Type
+from pydantic import BaseModel
 from app.core.llm_client import llm_client
+from app.core.model_router import model_router
+from app.core.structured_output import JSONStreamParser, request_format, validate_output
 
 
 class BaseAgent(ABC):
     """Base class for all MaverickAI agents."""
 
+    # Agents whose prompts repeat (regrades, unchanged profiles) opt in to the LLM response cache
+    use_llm_cache = False
+
+    # Task class used for model routing when call_llm() is not given one (see core/model_router.py)
+    llm_task = "general"
+
     def __init__(self, model_name: str = None):
         self.llm = llm_client
+        # An explicit model pins every call of this agent and bypasses routing
         self.model_name = model_name
 
-    def call_llm(self, prompt: str, system: str = None) -> str:
-        return self.llm.generate(
+    def _route(self, prompt: str, task: Optional[str]) -> str:
+        if self.model_name:
+            return self.model_name
+        return model_router.resolve(task or self.llm_task, agent=type(self).__name__, prompt=prompt)
+
+    def call_llm(
+        self,
+        prompt: str,
+        system: str = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        task: Optional[str] = None,
+        format=None,
+    ) -> str:
+        """Run a completion on the model routed for ``task``. With on_token, the response is
+        streamed and each chunk is passed to the callback; the full text is still returned."""
+        model = self._route(prompt, task)
+        started = time.monotonic()
+        if on_token is not None:
+            parts = []
+            for token in self.llm.stream(
+                prompt=prompt,
+                model=model,
+                system=system,
+                use_cache=self.use_llm_cache,
+                format=format,
+            ):
+                parts.append(token)
+                on_token(token)
+            text = "".join(parts)
+        else:
+            text = self.llm.generate(
+                prompt=prompt,
+                model=model,
+                system=system,
+                use_cache=self.use_llm_cache,
+                format=format,
+            )
+        model_router.record(type(self).__name__, task or self.llm_task, model, time.monotonic() - started)
+        return text
+
+    def call_llm_structured(
+        self,
+        prompt: str,
+        schema: Type[BaseModel],
+        system: str = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        task: Optional[str] = None,
+    ) -> Optional[dict]:
+        """Ask for JSON matching ``schema``. Returns the validated dict, or None if the
+        output could not be parsed or validated (callers keep their own fallbacks)."""
+        parser = JSONStreamParser()
+        if on_token is not None:
+            def feed(token):
+                parser.feed(token)
+                on_token(token)
+            self.call_llm(prompt, system=system, on_token=feed, task=task, format=request_format(schema))
+        else:
+            parser.feed(self.call_llm(prompt, system=system, task=task, format=request_format(schema)))
+        return validate_output(parser, schema, name=f"{type(self).__name__}.{schema.__name__}")
+
+    async def acall_llm(self, prompt: str, system: str = None, task: Optional[str] = None) -> str:
+        model = self._route(prompt, task)
+        started = time.monotonic()
+        text = await self.llm.agenerate(
             prompt=prompt,
-            model=self.model_name,
+            model=model,
             system=system,
+            use_cache=self.use_llm_cache,
         )
+        model_router.record(type(self).__name__, task or self.llm_task, model, time.monotonic() - started)
+        return text
 
     @abstractmethod
     def execute(self, db, *args, **kwargs):
@@ -0,0 +1,78 @@
+"""n8n report notifications, delivered through the event bus outbox.
+
+A ``report.generated`` event is written in the same transaction that marks
+the Report ready, so a downloadable report always has its notification
+queued, n8n never hears of one that is still running, and report generation
+never waits on n8n. The ``n8n`` subscriber posts it to the
+report-email webhook over a pooled keep-alive session; non-2xx responses and
+connection errors are retried with the event bus backoff, and delivery state
+is kept in outbox_deliveries (see GET /reports/webhooks).
+"""
+import threading
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from app.config import settings
+from app.core.event_bus import EventBus, event_bus
+from app.models.report import Report
+
+REPORT_GENERATED = "report.generated"
+N8N_SUBSCRIBER = "n8n"
+REPORT_EMAIL_WEBHOOK = "send-report-email"
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def _http() -> requests.Session:
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.mount("http://", HTTPAdapter(pool_maxsize=settings.EVENT_WORKERS))
+                session.mount("https://", HTTPAdapter(pool_maxsize=settings.EVENT_WORKERS))
+                _session = session
+    return _session
+
+
+def webhook_url(name: str) -> str:
+    return f"{settings.N8N_WEBHOOK_URL.rstrip('/')}/{name}"
+
+
+def publish_report_generated(db, report: Report, content: dict):
+    """Queue the n8n email for a stored report. Commits ``db`` together with any pending report changes."""
+    db.flush()
+    return event_bus.publish(
+        db,
+        REPORT_GENERATED,
+        {
+            "report_id": report.id,
+            "title": report.title,
+            "type": report.report_type,
+            "generated_at": str(report.generated_at),
+            "summary": content.get("summary", ""),
+            "highlights": content.get("highlights", []),
+            "recommendations": content.get("recommendations", []),
+        },
+        dedupe_key=f"{REPORT_GENERATED}:{report.id}",
+    )
+
+
+def send_report_email(db, payload: dict):
+    url = webhook_url(REPORT_EMAIL_WEBHOOK)
+    response = _http().post(url, json=payload, timeout=settings.N8N_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    print(f"[Notifications] ✓ Report {payload['report_id']} sent to n8n ({response.status_code})")
+
+
+def close():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def register_subscribers(bus: EventBus = event_bus):
+    bus.subscribe(REPORT_GENERATED, N8N_SUBSCRIBER, send_report_email)
@@ -1,5 +1,5 @@
-import json
 from app.agents.base import BaseAgent
+from app.schemas.agent_outputs import SchedulePlan
 from app.models.schedule import Schedule, ScheduleItem
 from app.models.fresher import Fresher
 from app.models.curriculum import Curriculum
@@ -8,8 +8,10 @@ from app.models.curriculum import Curriculum
 class OnboardingAgent(BaseAgent):
     """The Architect — generates personalized daily schedules for trainees."""
 
+    llm_task = "schedule"
+
     def __init__(self):
-        super().__init__(model_name=None)  # uses default model
+        super().__init__()
 
     def execute(self, db, fresher: Fresher, target_date: str):
         # 1. Get curriculum
@@ -49,13 +51,12 @@ Output a JSON object with a "tasks" array. Each task should have:
 - type (one of: reading, video, coding, quiz, project, assessment)
 - duration (minutes as integer)
 """
-        response = self.call_llm(prompt, system="You are an AI training schedule planner.")
+        plan = self.call_llm_structured(prompt, SchedulePlan, system="You are an AI training schedule planner.")
 
-        # 5. Parse LLM response
-        try:
-            data = json.loads(response)
-            tasks = data.get("tasks", [])
-        except Exception:
+        # 5. Use the validated plan, or a default day if the LLM output was unusable
+        if plan:
+            tasks = plan["tasks"]
+        else:
             tasks = [
                 {"time": "09:00", "title": "Python Fundamentals", "type": "reading", "duration": 60},
                 {"time": "10:00", "title": "Coding Practice", "type": "coding", "duration": 45},
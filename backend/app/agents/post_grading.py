@@ -0,0 +1,113 @@
+"""Post-grading pipeline: derived state kept current by ``submission.graded`` subscribers.
+
+Grading only publishes the event (see publish_submission_graded). Skills and
+badges are then updated by independent subscribers on the event bus worker
+pool, each retried on its own. Risk reads both skills and PerformanceAnalytics,
+so those steps run in order, each publishing the event for the next:
+skills -> ``fresher.skills_updated`` -> analytics -> ``fresher.analytics_updated``
+-> risk. A risk level change is published in turn and raises the alert.
+"""
+from app.core.event_bus import EventBus, event_bus
+from app.models.assessment import Submission
+from app.models.fresher import Fresher
+
+SUBMISSION_GRADED = "submission.graded"
+SKILLS_UPDATED = "fresher.skills_updated"
+ANALYTICS_UPDATED = "fresher.analytics_updated"
+RISK_CHANGED = "fresher.risk_changed"
+
+
+def publish_submission_graded(db, submission: Submission):
+    """Publish ``submission.graded`` for a completed submission (once per grading). Commits ``db``."""
+    if submission.status != "completed":
+        return None
+    graded_at = submission.graded_at.isoformat() if submission.graded_at else ""
+    return event_bus.publish(
+        db,
+        SUBMISSION_GRADED,
+        {
+            "submission_id": submission.id,
+            "user_id": submission.user_id,
+            "assessment_id": submission.assessment_id,
+            "score": submission.score,
+            "pass_status": submission.pass_status,
+        },
+        dedupe_key=f"{SUBMISSION_GRADED}:{submission.id}:{graded_at}",
+    )
+
+
+def _load(db, payload: dict):
+    submission = db.query(Submission).filter(Submission.id == payload["submission_id"]).first()
+    fresher = db.query(Fresher).filter(Fresher.user_id == payload["user_id"]).first()
+    return submission, fresher
+
+
+def update_skills(db, payload: dict):
+    from app.agents.profile_agent import ProfileAgent
+    submission, fresher = _load(db, payload)
+    if submission and fresher:
+        ProfileAgent().update_after_assessment(db, fresher, submission)
+        print(f"[PostGrading] ✓ Skills & progress updated for fresher {fresher.id}")
+        # Delivered only once this handler's transaction commits
+        event_bus.publish(db, SKILLS_UPDATED, payload)
+
+
+def award_badges(db, payload: dict):
+    from app.agents.profile_agent import ProfileAgent
+    submission, fresher = _load(db, payload)
+    if submission and fresher:
+        ProfileAgent().check_badges(db, fresher, submission)
+
+
+def update_performance_analytics(db, payload: dict):
+    from app.agents.analytics_agent import AnalyticsAgent
+    submission, fresher = _load(db, payload)
+    if submission and fresher:
+        AnalyticsAgent().apply_graded_submission(db, fresher, submission)
+        event_bus.publish(db, ANALYTICS_UPDATED, payload)
+
+
+def assess_risk(db, payload: dict):
+    from app.agents.analytics_agent import AnalyticsAgent
+    _, fresher = _load(db, payload)
+    if not fresher:
+        return
+    previous_level = fresher.risk_level
+    result = AnalyticsAgent().predict_risk(db, fresher, raise_alert=False)
+    if result.get("risk_level") != previous_level:
+        event_bus.publish(
+            db,
+            RISK_CHANGED,
+            {
+                "fresher_id": fresher.id,
+                "previous_level": previous_level,
+                "risk_level": fresher.risk_level,
+                "risk_score": fresher.risk_score,
+                "factors": result.get("factors", []),
+            },
+            dedupe_key=f"{RISK_CHANGED}:{fresher.id}:{payload['submission_id']}",
+        )
+
+
+def raise_risk_alert(db, payload: dict):
+    from app.agents.risk_engine import HIGH_RISK, risk_engine
+    fresher = db.query(Fresher).filter(Fresher.id == payload["fresher_id"]).first()
+    if not fresher:
+        return
+    # Below high risk this resolves the fresher's open alert, if any
+    risk_engine.upsert_alert(db, fresher, {
+        "risk_level": payload["risk_level"],
+        "risk_score": payload["risk_score"],
+        "factors": payload.get("factors"),
+    })
+    db.commit()
+    if payload["risk_level"] in HIGH_RISK:
+        print(f"[PostGrading] ⚠ Risk alert raised for fresher {fresher.id} ({payload['risk_level']})")
+
+
+def register_subscribers(bus: EventBus = event_bus):
+    bus.subscribe(SUBMISSION_GRADED, "skills", update_skills)
+    bus.subscribe(SUBMISSION_GRADED, "badges", award_badges)
+    bus.subscribe(SKILLS_UPDATED, "performance_analytics", update_performance_analytics)
+    bus.subscribe(ANALYTICS_UPDATED, "risk", assess_risk)
+    bus.subscribe(RISK_CHANGED, "alerts", raise_risk_alert)
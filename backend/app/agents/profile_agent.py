@@ -1,34 +1,36 @@
 import json
+from sqlalchemy import case
 from app.agents.base import BaseAgent
-from app.models.fresher import Fresher, Skill
+from app.models.fresher import Fresher, Skill, SkillScoreAggregate
 from app.models.assessment import Submission, Assessment
+from app.core.assessment_cache import compiled_assessments
 
 
 class ProfileAgent(BaseAgent):
     """The Librarian — maintains fresher skill profiles and tracks progress."""
 
+    use_llm_cache = True
+
     def __init__(self):
         super().__init__()
 
     def execute(self, db, fresher: Fresher, **kwargs):
         return self.get_profile_summary(db, fresher)
 
+    @staticmethod
+    def _skills_for(assessment: Assessment) -> list:
+        skills_assessed = compiled_assessments.get(assessment).skills_assessed
+        if not skills_assessed:
+            skills_assessed = [assessment.title.split()[0] if assessment.title else "General"]
+        return skills_assessed
+
     def update_after_assessment(self, db, fresher: Fresher, submission: Submission):
         """Update skills after an assessment is graded."""
         assessment = db.query(Assessment).filter(Assessment.id == submission.assessment_id).first()
         if not assessment:
             return
 
-        # Get skills assessed
-        skills_assessed = []
-        if assessment.skills_assessed:
-            try:
-                skills_assessed = json.loads(assessment.skills_assessed)
-            except Exception:
-                pass
-
-        if not skills_assessed:
-            skills_assessed = [assessment.title.split()[0] if assessment.title else "General"]
+        skills_assessed = self._skills_for(assessment)
 
         # Update or create skill records
         for skill_name in skills_assessed:
@@ -73,9 +75,6 @@ class ProfileAgent(BaseAgent):
                 )
                 db.add(new_ach)
 
-        # Award badges based on skill performance
-        self._check_and_award_badges(db, fresher, skills_assessed)
-
         # Update overall progress
         all_subs = db.query(Submission).filter(
             Submission.user_id == fresher.user_id,
@@ -87,6 +86,21 @@ class ProfileAgent(BaseAgent):
 
         db.commit()
 
+    def check_badges(self, db, fresher: Fresher, submission: Submission):
+        """Fold a graded submission into the fresher's skill aggregates and award
+        badges they have become eligible for. Cost does not grow with history."""
+        if submission.status != "completed" or submission.score is None:
+            return
+        assessment = db.query(Assessment).filter(Assessment.id == submission.assessment_id).first()
+        if not assessment:
+            return
+        if not db.query(SkillScoreAggregate.id).filter(SkillScoreAggregate.fresher_id == fresher.id).first():
+            self._backfill_skill_aggregates(db, fresher)
+        skills = compiled_assessments.get(assessment).skills_assessed
+        self._record_skill_scores(db, fresher, submission, skills)
+        self._check_and_award_badges(db, fresher, skills)
+        db.commit()
+
     def update_profile(self, db, fresher: Fresher, data: dict):
         """Manual profile update via agent."""
         for key, val in data.items():
@@ -117,76 +131,107 @@ class ProfileAgent(BaseAgent):
             "agent": "ProfileAgent",
         }
 
-    def _check_and_award_badges(self, db, fresher: Fresher, skills_assessed: list):
-        """Check and award badges based on skill performance."""
-        from app.models.badge import Badge, FresherBadge
-        from datetime import datetime
-        
-        # Get all submissions for this fresher
-        all_subs = db.query(Submission).filter(
+    def _record_skill_scores(self, db, fresher: Fresher, submission: Submission, skills: list):
+        """Add a submission's score to the aggregates of its skills and of ALL_SKILLS.
+
+        A regraded submission replaces its earlier contribution to count and
+        total; min and max keep the extremes seen.
+        """
+        score = submission.score
+        previous = submission.aggregated_score
+        if previous is not None and previous == score:
+            return
+        names = set(skills) | {SkillScoreAggregate.ALL_SKILLS}
+        rows = {
+            a.skill_name: a
+            for a in db.query(SkillScoreAggregate).filter(
+                SkillScoreAggregate.fresher_id == fresher.id,
+                SkillScoreAggregate.skill_name.in_(names),
+            ).all()
+        }
+        for name in names:
+            agg = rows.get(name)
+            if agg is None:
+                db.add(SkillScoreAggregate(
+                    fresher_id=fresher.id, skill_name=name, count=1, total=score, min_score=score, max_score=score,
+                ))
+                continue
+            # SQL-side arithmetic so concurrent graders don't overwrite each other
+            if previous is None:
+                agg.count = SkillScoreAggregate.count + 1
+                agg.total = SkillScoreAggregate.total + score
+            else:
+                agg.total = SkillScoreAggregate.total + (score - previous)
+            agg.min_score = case(
+                (SkillScoreAggregate.min_score == None, score),
+                (SkillScoreAggregate.min_score > score, score),
+                else_=SkillScoreAggregate.min_score,
+            )
+            agg.max_score = case(
+                (SkillScoreAggregate.max_score == None, score),
+                (SkillScoreAggregate.max_score < score, score),
+                else_=SkillScoreAggregate.max_score,
+            )
+        submission.aggregated_score = score
+        db.flush()
+
+    def _backfill_skill_aggregates(self, db, fresher: Fresher):
+        """One-off build of a fresher's aggregates from graded history (e.g. pre-existing data)."""
+        subs = db.query(Submission).filter(
             Submission.user_id == fresher.user_id,
             Submission.status == "completed",
+            Submission.score != None,
         ).all()
-        
-        if not all_subs:
+        assessments = {
+            a.id: a for a in db.query(Assessment).filter(Assessment.id.in_({s.assessment_id for s in subs})).all()
+        } if subs else {}
+        for sub in subs:
+            sub.aggregated_score = None
+            assessment = assessments.get(sub.assessment_id)
+            skills = compiled_assessments.get(assessment).skills_assessed if assessment else []
+            self._record_skill_scores(db, fresher, sub, skills)
+        if subs:
+            print(f"[ProfileAgent] Built skill aggregates for fresher {fresher.id} from {len(subs)} submissions")
+
+    def _check_and_award_badges(self, db, fresher: Fresher, skills_assessed: list):
+        """Award badges for the skills just assessed (plus "General") from the running aggregates."""
+        from app.models.badge import Badge, FresherBadge
+        from datetime import datetime
+
+        # Only badges whose skill can have changed are evaluated
+        badges = db.query(Badge).filter(Badge.skill_name.in_(set(skills_assessed) | {"General"})).all()
+        if not badges:
             return
-        
-        # Group submissions by skill
-        skill_scores = {}
-        for sub in all_subs:
-            assessment = db.query(Assessment).filter(Assessment.id == sub.assessment_id).first()
-            if assessment and assessment.skills_assessed:
-                try:
-                    skills = json.loads(assessment.skills_assessed) if isinstance(assessment.skills_assessed, str) else assessment.skills_assessed
-                except Exception:
-                    skills = []
-                    
-                for skill in skills:
-                    if skill not in skill_scores:
-                        skill_scores[skill] = []
-                    if sub.score is not None:
-                        skill_scores[skill].append(sub.score)
-        
-        # Get all available badges
-        all_badges = db.query(Badge).all()
-        
-        # Check badge eligibility for each badge
-        for badge in all_badges:
-            should_award = False
-            score_achieved = 0
-            
-            if badge.skill_name in skill_scores:
-                # Skill-specific badge
-                avg_skill_score = sum(skill_scores[badge.skill_name]) / len(skill_scores[badge.skill_name])
-                if avg_skill_score >= badge.min_score:
-                    should_award = True
-                    score_achieved = avg_skill_score
-            elif badge.skill_name == "General":
-                # General badges based on overall scores
-                all_scores = [sub.score for sub in all_subs if sub.score is not None]
-                if all_scores:
-                    avg_score = sum(all_scores) / len(all_scores)
-                    if avg_score >= badge.min_score:
-                        should_award = True
-                        score_achieved = avg_score
-            
-            if should_award:
-                # Check if badge already assigned
-                existing = db.query(FresherBadge).filter(
-                    FresherBadge.fresher_id == fresher.id,
-                    FresherBadge.badge_id == badge.id
-                ).first()
-                
-                if not existing:
-                    fresher_badge = FresherBadge(
-                        fresher_id=fresher.id,
-                        badge_id=badge.id,
-                        assessment_id=None,
-                        score_achieved=round(score_achieved, 1),
-                        earned_at=datetime.utcnow()
-                    )
-                    db.add(fresher_badge)
-                    print(f"[ProfileAgent] 🏆 Awarded badge '{badge.name}' to fresher {fresher.id} (score: {score_achieved:.1f})")
+        earned = {
+            badge_id for (badge_id,) in
+            db.query(FresherBadge.badge_id).filter(FresherBadge.fresher_id == fresher.id).all()
+        }
+        aggregates = {
+            a.skill_name: a
+            for a in db.query(SkillScoreAggregate).filter(
+                SkillScoreAggregate.fresher_id == fresher.id,
+                SkillScoreAggregate.skill_name.in_({b.skill_name for b in badges} | {SkillScoreAggregate.ALL_SKILLS}),
+            ).all()
+        }
+
+        for badge in badges:
+            if badge.id in earned:
+                continue
+            # "General" badges use the overall average unless "General" is itself an assessed skill
+            agg = aggregates.get(badge.skill_name)
+            if agg is None and badge.skill_name == "General":
+                agg = aggregates.get(SkillScoreAggregate.ALL_SKILLS)
+            if agg is None or not agg.count or agg.average < badge.min_score:
+                continue
+            db.add(FresherBadge(
+                fresher_id=fresher.id,
+                badge_id=badge.id,
+                assessment_id=None,
+                score_achieved=round(agg.average, 1),
+                earned_at=datetime.utcnow()
+            ))
+            earned.add(badge.id)
+            print(f"[ProfileAgent] 🏆 Awarded badge '{badge.name}' to fresher {fresher.id} (score: {agg.average:.1f})")
 
     def generate_fresher_summary(self, fresher: Fresher, skills: list):
         """Use LLM to generate a personalized skill portrait."""
@@ -198,5 +243,5 @@ class ProfileAgent(BaseAgent):
         
         Focus on their strongest area and potential career trajectory within the company.
         """
-        response = self.call_llm(prompt, system="You are an expert technical career coach.")
+        response = self.call_llm(prompt, system="You are an expert technical career coach.", task="skill_portrait")
         return response.strip()
@@ -5,12 +5,12 @@ Focuses on knowledge assessment and learning guidance
 """
 
 import json
-import random
 from datetime import datetime, timezone, date
-from typing import Dict, List, Optional, Any
+from typing import Any, Callable, Dict, List, Optional
 from app.agents.base import BaseAgent
+from app.schemas.agent_outputs import QuizHRFeedback
+from app.core.assessment_cache import compiled_assessments, normalize_answer
 from app.models.assessment import Assessment, Submission
-from app.config import settings
 
 
 class QuizEvaluatorAgent(BaseAgent):
@@ -23,8 +23,11 @@ class QuizEvaluatorAgent(BaseAgent):
     - Fully configurable and updatable parameters
     """
 
+    use_llm_cache = True
+    llm_task = "quiz_feedback"
+
     def __init__(self, config: Optional[Dict[str, Any]] = None):
-        super().__init__(model_name=settings.OLLAMA_CODE_MODEL)
+        super().__init__()
         self.config = self._load_default_config()
         if config:
             self.config.update(config)
@@ -65,24 +68,85 @@ class QuizEvaluatorAgent(BaseAgent):
     def execute(self, db, submission: Submission, assessment: Assessment):
         return self.evaluate(db, submission, assessment)
 
-    def evaluate(self, db, submission: Submission, assessment: Assessment):
-        """Main evaluation method for quiz submissions"""
-
-        def normalize_answer(value):
-            text = str(value or "").strip().lower()
-            if text in ["true", "t", "yes", "1"]:
-                return "true"
-            if text in ["false", "f", "no", "0"]:
-                return "false"
-            return text
-
-        def select_daily_questions(question_list, count, assessment_id):
-            if not question_list or len(question_list) <= count:
-                return question_list
-            day_seed = int(date.today().strftime("%Y%m%d")) + int(assessment_id)
-            rng = random.Random(day_seed)
-            return rng.sample(question_list, count)
-        
+    def evaluate(self, db, submission: Submission, assessment: Assessment, emit: Optional[Callable[[str, Any], None]] = None):
+        """Main evaluation method for quiz submissions (score and feedback in one pass)"""
+        graded = self.score(db, submission, assessment, emit=emit)
+        return self.attach_feedback(db, submission, assessment, graded, emit=emit)
+
+    def score(self, db, submission: Submission, assessment: Assessment, emit: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """Phase one: deterministic scoring.
+
+        Commits score, pass_status and status="completed" straight away, with
+        template feedback and feedback_status="pending" until attach_feedback()
+        replaces it. Returns the grading context attach_feedback() needs.
+        """
+        graded = self._grade_answers(submission, assessment)
+        score, pass_status = graded["score"], graded["pass_status"]
+
+        # The score is deterministic, so live subscribers get it before the LLM runs
+        if emit:
+            emit("score", {
+                "score": round(score, 2),
+                "pass_status": pass_status,
+                "correct": graded["total_questions"] - len(graded["incorrect_questions"]),
+                "total": graded["total_questions"],
+            })
+
+        fallback = self._get_fallback_feedback(score, len(graded["incorrect_questions"]), graded["total_questions"])
+        submission.score = round(score, 2)
+        submission.pass_status = pass_status
+        submission.status = "completed"
+        submission.feedback = json.dumps(self._build_feedback(graded, fallback))
+        submission.feedback_status = "pending" if self.config.get("enable_llm_feedback", True) else "ready"
+        submission.graded_at = datetime.now(timezone.utc)
+        db.commit()
+
+        print(f"[QuizEvaluatorAgent] ✓ Scored quiz: {score:.1f}% ({pass_status})")
+        return graded
+
+    def attach_feedback(self, db, submission: Submission, assessment: Assessment, graded: Optional[Dict[str, Any]] = None,
+                        emit: Optional[Callable[[str, Any], None]] = None):
+        """Phase two: generate HR feedback for an already-scored submission and mark it ready.
+
+        Without ``graded`` (e.g. resumed after a restart) the deterministic grading
+        is recomputed using the question set served on the submission date.
+        """
+        if graded is None:
+            graded_on = submission.submitted_at.date() if submission.submitted_at else None
+            graded = self._grade_answers(submission, assessment, on_date=graded_on)
+        score = graded["score"]
+        incorrect_questions = graded["incorrect_questions"]
+
+        # Generate HR-style feedback using LLM (if enabled)
+        if self.config.get("enable_llm_feedback", True):
+            hr_feedback = self._generate_hr_feedback(
+                assessment_title=assessment.title,
+                score=score,
+                total_questions=graded["total_questions"],
+                incorrect_count=len(incorrect_questions),
+                incorrect_details=incorrect_questions[:self.config.get("max_incorrect_details", 5)],
+                passing_score=graded["passing_threshold"],
+                on_token=(lambda t: emit("token", {"text": t})) if emit else None,
+            )
+        else:
+            hr_feedback = self._get_fallback_feedback(score, len(incorrect_questions), graded["total_questions"])
+
+        feedback = self._build_feedback(graded, hr_feedback)
+        submission.feedback = json.dumps(feedback)
+        submission.feedback_status = "ready"
+        db.commit()
+
+        print(f"[QuizEvaluatorAgent] ✓ Evaluated quiz: {score:.1f}% ({graded['pass_status']})")
+
+        return {
+            "score": round(score, 2),
+            "pass_status": graded["pass_status"],
+            "feedback": feedback
+        }
+
+    def _grade_answers(self, submission: Submission, assessment: Assessment, on_date: Optional[date] = None) -> Dict[str, Any]:
+        """Deterministic part of grading: match answers against the day's question set."""
+
         # Parse answers
         answers = {}
         if submission.answers:
@@ -91,58 +155,35 @@ class QuizEvaluatorAgent(BaseAgent):
             except Exception:
                 pass
 
-        # Parse questions for correct answers
-        questions = []
-        if assessment.questions:
-            try:
-                questions = json.loads(assessment.questions)
-            except Exception:
-                pass
-
-        if assessment.assessment_type == "quiz":
-            daily_count = self.config.get("daily_question_count", 5)
-            questions = select_daily_questions(questions, daily_count, assessment.id)
+        # The day's question set with its precomputed answer key
+        daily_count = self.config.get("daily_question_count", 5)
+        answer_key = compiled_assessments.get(assessment).answer_key(daily_count, on_date)
+        default_points = self.config.get("default_question_points", 10)
 
         # Auto-grade against correct answers
         total_points = 0
         earned_points = 0
         incorrect_questions = []
         
-        for q_index, q in enumerate(questions):
-            q_id_raw = q.get("id", "")
-            q_id = str(q_id_raw).strip()
-            points = q.get("points", self.config.get("default_question_points", 10))
+        for kq in answer_key:
+            q = kq.question
+            points = default_points if kq.points is None else kq.points
             total_points += points
-            correct = q.get("correct_answer", "")
-
-            candidate_keys = [
-                q_id_raw,
-                q_id,
-                f"q{q_index + 1}",
-                str(q_index),
-                str(q_index + 1),
-            ]
-
-            user_answer = ""
-            matched_key = None
-            for key in candidate_keys:
-                if key in answers:
-                    user_answer = answers.get(key, "")
-                    matched_key = key
-                    break
+            matched_key, user_answer = kq.lookup(answers)
+            user_normalized = normalize_answer(user_answer)
 
             print(
-                f"[QuizEvaluatorAgent] Q{q_index + 1} id={q_id} key={matched_key} "
-                f"user={normalize_answer(user_answer)!r} correct={normalize_answer(correct)!r}"
+                f"[QuizEvaluatorAgent] Q{kq.index + 1} id={kq.candidate_keys[1]} key={matched_key} "
+                f"user={user_normalized!r} correct={kq.correct_normalized!r}"
             )
             
-            if normalize_answer(user_answer) == normalize_answer(correct):
+            if user_normalized == kq.correct_normalized:
                 earned_points += points
             else:
                 # Store incorrect question with details for HR feedback
                 incorrect_questions.append({
                     "question": q.get("question", "N/A"),
-                    "correct_answer": correct,
+                    "correct_answer": kq.correct,
                     "user_answer": user_answer,
                     "topic": q.get("topic", "General"),
                     "points": points
@@ -153,21 +194,19 @@ class QuizEvaluatorAgent(BaseAgent):
         passing_threshold = assessment.passing_score or self.config.get("default_passing_score", 70)
         pass_status = "pass" if score >= passing_threshold else "fail"
 
-        # Generate HR-style feedback using LLM (if enabled)
-        if self.config.get("enable_llm_feedback", True):
-            hr_feedback = self._generate_hr_feedback(
-                assessment_title=assessment.title,
-                score=score,
-                total_questions=len(questions),
-                incorrect_count=len(incorrect_questions),
-                incorrect_details=incorrect_questions[:self.config.get("max_incorrect_details", 5)],
-                passing_score=passing_threshold
-            )
-        else:
-            hr_feedback = self._get_fallback_feedback(score, len(incorrect_questions), len(questions))
+        return {
+            "score": score,
+            "pass_status": pass_status,
+            "passing_threshold": passing_threshold,
+            "total_questions": len(answer_key),
+            "incorrect_questions": incorrect_questions,
+        }
 
-        # Normalize to the frontend's expected feedback schema
-        feedback = {
+    def _build_feedback(self, graded: Dict[str, Any], hr_feedback: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize to the frontend's expected feedback schema"""
+        score = graded["score"]
+        incorrect_questions = graded["incorrect_questions"]
+        return {
             "overall_comment": hr_feedback.get("overall_assessment") or hr_feedback.get("overall_comment") or "Assessment evaluated successfully.",
             "strengths": hr_feedback.get("strengths", []),
             "weaknesses": hr_feedback.get("development_areas", hr_feedback.get("weaknesses", [])),
@@ -179,26 +218,10 @@ class QuizEvaluatorAgent(BaseAgent):
             ],
             "improvements": hr_feedback.get("recommended_actions", hr_feedback.get("improvements", [])),
             "accuracy_score": round(score, 2),
-            "risk_level": hr_feedback.get("risk_level", "low" if score >= passing_threshold else "medium"),
+            "risk_level": hr_feedback.get("risk_level", "low" if score >= graded["passing_threshold"] else "medium"),
         }
 
-        # Update submission
-        submission.score = round(score, 2)
-        submission.pass_status = pass_status
-        submission.status = "completed"
-        submission.feedback = json.dumps(feedback)
-        submission.graded_at = datetime.now(timezone.utc)
-        db.commit()
-
-        print(f"[QuizEvaluatorAgent] ✓ Evaluated quiz: {score:.1f}% ({pass_status})")
-
-        return {
-            "score": round(score, 2),
-            "pass_status": pass_status,
-            "feedback": feedback
-        }
-
-    def _generate_hr_feedback(self, assessment_title, score, total_questions, incorrect_count, incorrect_details, passing_score):
+    def _generate_hr_feedback(self, assessment_title, score, total_questions, incorrect_count, incorrect_details, passing_score, on_token=None):
         """Generate professional HR-style feedback using LLM"""
         
         # Construct HR evaluation prompt
@@ -241,12 +264,8 @@ Provide your evaluation as a JSON object with this structure:
 IMPORTANT: Return ONLY valid JSON, no additional text or markdown."""
 
         try:
-            response = self.call_llm(prompt)
-            feedback = self._extract_json_from_llm_response(response)
-            
-            # Validate required fields
-            required_fields = ["overall_assessment", "competency_level", "development_areas", "recommended_actions"]
-            if all(field in feedback for field in required_fields):
+            feedback = self.call_llm_structured(prompt, QuizHRFeedback, on_token=on_token)
+            if feedback:
                 return feedback
             else:
                 print(f"[QuizEvaluatorAgent] ⚠ LLM response missing required fields")
@@ -262,35 +281,6 @@ IMPORTANT: Return ONLY valid JSON, no additional text or markdown."""
             else:
                 raise e
 
-    def _extract_json_from_llm_response(self, llm_response: str) -> dict:
-        """Extract JSON from LLM response, handling markdown code blocks"""
-        try:
-            response_text = llm_response.strip()
-            
-            # Remove markdown code blocks
-            if "```json" in response_text:
-                start = response_text.find("```json") + 7
-                end = response_text.find("```", start)
-                if end > start:
-                    response_text = response_text[start:end].strip()
-            elif "```" in response_text:
-                start = response_text.find("```") + 3
-                end = response_text.find("```", start)
-                if end > start:
-                    response_text = response_text[start:end].strip()
-            
-            # Extract JSON object
-            json_start = response_text.find("{")
-            json_end = response_text.rfind("}") + 1
-            if json_start >= 0 and json_end > json_start:
-                response_text = response_text[json_start:json_end]
-            
-            parsed = json.loads(response_text)
-            return parsed
-        except Exception as e:
-            print(f"[QuizEvaluatorAgent] ✗ JSON parse error: {e}")
-            return {}
-
     def _get_fallback_feedback(self, score, incorrect_count, total_questions):
         """Generate fallback feedback if LLM fails"""
         thresholds = self.config.get("competency_thresholds", {})
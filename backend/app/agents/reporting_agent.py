@@ -1,5 +1,9 @@
 import json
+from typing import Callable
+import numpy as np
 from app.agents.base import BaseAgent
+from app.core.cohort_stats import AT_RISK_LEVELS, CohortStats
+from app.schemas.agent_outputs import CohortInsights, CohortReport, IndividualHRReport
 from app.models.report import Report
 from app.models.fresher import Fresher
 from app.models.user import User
@@ -13,45 +17,97 @@ class ReportingAgent(BaseAgent):
 
     RECENT_ATTEMPTS_LIMIT = 3  # Only consider the last N quiz attempts per person per assessment
 
+    llm_task = "report"
+
     def __init__(self):
         super().__init__()
 
-    def _get_recent_submissions(self, db, user_id: int = None, assessment_id: int = None, limit: int = None):
+    def _recent_attempts(self, db, user_id: int = None, assessment_id: int = None, limit: int = None):
         """
-        Get only the most recent N submissions per assessment per user.
-        This ensures reports reflect current performance, not ancient history.
+        Subquery of the most recent N scored submissions per (user, assessment).
+        Ranked with ROW_NUMBER() over ix_submissions_recent_attempts, so every
+        slice a report needs comes back from one indexed query.
         """
-        from app.models.assessment import Submission, Assessment
-        from collections import defaultdict
+        from app.models.assessment import Submission
+        from sqlalchemy import func
 
         n = limit or self.RECENT_ATTEMPTS_LIMIT
-        query = db.query(Submission)
+        ranked = db.query(
+            Submission.id.label("id"),
+            Submission.user_id.label("user_id"),
+            Submission.assessment_id.label("assessment_id"),
+            Submission.score.label("score"),
+            Submission.pass_status.label("pass_status"),
+            func.row_number().over(
+                partition_by=(Submission.user_id, Submission.assessment_id),
+                order_by=(Submission.submitted_at.desc(), Submission.id.desc()),
+            ).label("rn"),
+        ).filter(Submission.score != None)
         if user_id:
-            query = query.filter(Submission.user_id == user_id)
+            ranked = ranked.filter(Submission.user_id == user_id)
         if assessment_id:
-            query = query.filter(Submission.assessment_id == assessment_id)
-        query = query.filter(Submission.score != None)
-        query = query.order_by(Submission.submitted_at.desc())
-        all_subs = query.all()
-
-        # Group by (user_id, assessment_id) and keep only the last N
-        grouped = defaultdict(list)
-        for s in all_subs:
-            key = (s.user_id, s.assessment_id)
-            if len(grouped[key]) < n:
-                grouped[key].append(s)
-
-        # Flatten back to a list
-        recent = []
-        for subs in grouped.values():
-            recent.extend(subs)
-        return recent
+            ranked = ranked.filter(Submission.assessment_id == assessment_id)
+        ranked = ranked.subquery()
+        return db.query(ranked).filter(ranked.c.rn <= n).subquery()
+
+    def _get_recent_submissions(self, db, user_id: int = None, assessment_id: int = None, limit: int = None):
+        """
+        Get only the most recent N submissions per assessment per user.
+        This ensures reports reflect current performance, not ancient history.
+        """
+        from app.models.assessment import Submission
+
+        recent = self._recent_attempts(db, user_id, assessment_id, limit)
+        return db.query(Submission).join(recent, recent.c.id == Submission.id).order_by(
+            Submission.user_id, Submission.assessment_id, recent.c.rn
+        ).all()
+
+    def _recent_assessment_stats(self, db, limit: int = None) -> dict:
+        """assessment_id -> attempts, avg_score and pass_rate over the last N attempts per person."""
+        from app.models.assessment import Assessment
+        from sqlalchemy import case, func
+
+        recent = self._recent_attempts(db, limit=limit)
+        rows = db.query(
+            recent.c.assessment_id,
+            func.count(recent.c.id),
+            func.avg(recent.c.score),
+            func.sum(case((recent.c.score >= Assessment.passing_score, 1), else_=0)),
+        ).join(Assessment, Assessment.id == recent.c.assessment_id).group_by(recent.c.assessment_id).all()
+        return {
+            assessment_id: {"attempts": count, "avg_score": avg or 0.0, "pass_rate": (passing or 0) / count * 100}
+            for assessment_id, count, avg, passing in rows
+        }
+
+    def _recent_user_stats(self, db, limit: int = None) -> dict:
+        """user_id -> attempts, avg_score and passed count over their last N attempts per assessment."""
+        from sqlalchemy import case, func
+
+        recent = self._recent_attempts(db, limit=limit)
+        rows = db.query(
+            recent.c.user_id,
+            func.count(recent.c.id),
+            func.avg(recent.c.score),
+            func.sum(case((recent.c.pass_status == "pass", 1), else_=0)),
+        ).group_by(recent.c.user_id).all()
+        return {
+            user_id: {"attempts": count, "avg_score": avg or 0.0, "passed": passed or 0}
+            for user_id, count, avg, passed in rows
+        }
 
     def execute(self, db, **kwargs):
         return self.generate_report(db, "overall")
 
-    def generate_report(self, db, report_type: str, user_id: int = None, filters: dict = None):
-        """Generate a professionally styled AI report using deep context."""
+    def generate_report(self, db, report_type: str, user_id: int = None, filters: dict = None,
+                        report: Report = None, on_progress: Callable[[int, str], None] = None):
+        """Generate a professionally styled AI report using deep context.
+
+        Fills ``report`` when given (a row queued by the reports route) instead
+        of inserting a new one; ``on_progress(percent, stage)`` is called as
+        each stage starts.
+        """
+        progress = on_progress or (lambda percent, stage: None)
+        progress(5, "gathering")
         # Query freshers and join with User to get department and details
         query = db.query(Fresher, User).join(User, Fresher.user_id == User.id)
         
@@ -69,9 +125,15 @@ class ReportingAgent(BaseAgent):
             dept_filter = None
 
         freshers = [r[0] for r in results] # List of Fresher objects for backward compat logic if needed
-        total = len(results)
-        avg_progress = sum((f.overall_progress or 0.0) for f, u in results) / total if total else 0
-        at_risk_list = [(f, u) for f, u in results if f.risk_level in ("high", "critical")]
+        cohort = CohortStats.from_records(
+            results,
+            labels={"department": lambda r: r[1].department or "Unassigned", "risk_level": lambda r: r[0].risk_level},
+            columns={"progress": lambda r: r[0].overall_progress},
+        )
+        total = cohort.size
+        avg_progress = cohort.mean("progress")
+        at_risk_mask = cohort.mask_in("risk_level", AT_RISK_LEVELS)
+        at_risk_list = [results[i] for i in np.flatnonzero(at_risk_mask)]
         at_risk_count = len(at_risk_list)
         
         # Detailed Freshers Data
@@ -84,21 +146,15 @@ class ReportingAgent(BaseAgent):
                 "progress": f.overall_progress or 0,
                 "risk_level": f.risk_level
             })
+        top_progress = [freshers_details_list[i] for i in cohort.top_k("progress", 3)]
 
         # Group by Department (if not filtered)
         dept_breakdown = {}
         if not dept_filter:
-            for f, u in results:
-                d = u.department if u.department else "Unassigned"
-                
-                if d not in dept_breakdown: dept_breakdown[d] = {"count": 0, "avg": 0.0, "risk": 0}
-                dept_breakdown[d]["count"] += 1
-                dept_breakdown[d]["avg"] += (f.overall_progress or 0.0)
-                if f.risk_level in ("high", "critical"): dept_breakdown[d]["risk"] += 1
-            
-            for d in dept_breakdown:
-                if dept_breakdown[d]["count"] > 0:
-                    dept_breakdown[d]["avg"] = round(dept_breakdown[d]["avg"] / dept_breakdown[d]["count"], 1)
+            dept_breakdown = {
+                d: {"count": g["count"], "avg": round(g["mean"], 1), "risk": g["flagged"]}
+                for d, g in cohort.group_by("department", "progress", flag=at_risk_mask).items()
+            }
 
         # Enhanced Data Gathering based on Report Type
         recent_alerts = []
@@ -116,30 +172,25 @@ class ReportingAgent(BaseAgent):
             from sqlalchemy import func
             
             # Aggregate skills (all available data)
-            all_skills = db.query(Skill).all()
-            for s in all_skills:
-                if s.name not in skill_summary: skill_summary[s.name] = []
-                skill_summary[s.name].append(s.level)
-            
-            # Average out
-            skill_summary = {k: round(sum(v)/len(v), 1) for k, v in skill_summary.items()}
+            skills = CohortStats.from_records(
+                db.query(Skill.name, Skill.level).all(),
+                labels={"skill": lambda r: r.name},
+                columns={"level": lambda r: r.level},
+            )
+            skill_summary = {k: round(g["mean"], 1) for k, g in skills.group_by("skill", "level").items()}
             
             # Get Assessment Statistics (only last 3 attempts per person per assessment)
             assessments = db.query(Assessment).filter(Assessment.is_active == True).all()
+            by_assessment = self._recent_assessment_stats(db)
             for assessment in assessments:
-                submissions = self._get_recent_submissions(db, assessment_id=assessment.id)
-                
-                if submissions:
-                    avg_score = sum(s.score for s in submissions) / len(submissions)
-                    passing_count = sum(1 for s in submissions if s.score >= assessment.passing_score)
-                    pass_rate = (passing_count / len(submissions)) * 100 if submissions else 0
-                    
+                group = by_assessment.get(assessment.id)
+                if group:
                     assessment_stats.append({
                         "title": assessment.title,
                         "type": assessment.assessment_type,
-                        "avg_score": round(avg_score, 1),
-                        "pass_rate": round(pass_rate, 1),
-                        "total_attempts": len(submissions),
+                        "avg_score": round(group["avg_score"], 1),
+                        "pass_rate": round(group["pass_rate"], 1),
+                        "total_attempts": group["attempts"],
                         "max_score": assessment.max_score,
                         "note": f"Based on last {self.RECENT_ATTEMPTS_LIMIT} attempts per person"
                     })
@@ -184,32 +235,13 @@ Return valid JSON object with these fields:
 
 Start response with {{ and end with }}. No markdown, just raw JSON."""
         
+        progress(40, "writing")
         print(f"[ReportingAgent] Calling LLM for {report_type} report...")
-        response = self.call_llm(prompt, system=system_prompt)
-        print(f"[ReportingAgent] LLM Response length: {len(response)} chars")
+        content = self.call_llm_structured(prompt, CohortReport, system=system_prompt)
         
         try:
-            # Clean LLM response (robust JSON extraction)
-            cleaned_response = response.strip()
-            print(f"[ReportingAgent] Response preview: {cleaned_response[:200]}...")
-            
-            # Remove markdown code blocks if present
-            if "```" in cleaned_response:
-                import re
-                match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", cleaned_response, re.DOTALL)
-                if match:
-                    cleaned_response = match.group(1)
-                    print("[ReportingAgent] Extracted JSON from markdown")
-            
-            # Fallback: Find first { and last }
-            if "{" in cleaned_response:
-                start = cleaned_response.find("{")
-                end = cleaned_response.rfind("}") + 1
-                cleaned_response = cleaned_response[start:end]
-                print(f"[ReportingAgent] Extracted JSON substring: {start} to {end}")
-            
-            print(f"[ReportingAgent] Attempting JSON parse...")
-            content = json.loads(cleaned_response)
+            if content is None:
+                raise ValueError("LLM returned no usable report JSON")
             print(f"[ReportingAgent] JSON parsed successfully")
             
             # Ensure assessment_stats are included
@@ -236,16 +268,13 @@ Start response with {{ and end with }}. No markdown, just raw JSON."""
                     f"Focus areas: {', '.join(f'{k}' for k, v in list(skill_summary.items())[:3])}" if skill_summary else "Limited data"
                 ]) if isinstance(content.get("detailed_analysis"), dict) else [],
                 "top_performers": [
-                    f"{f['name']} ({f['progress']}%)" for f in sorted(freshers_details_list, key=lambda x: x['progress'], reverse=True)[:3]
+                    f"{f['name']} ({f['progress']}%)" for f in top_progress
                 ]
             }
             print(f"[ReportingAgent] Overrode fresher data with real DB names")
                 
         except Exception as e:
             print(f"[ReportingAgent] LLM JSON failure: {e}")
-            print(f"[ReportingAgent] Raw response: {response[:500]}")
-            import traceback
-            traceback.print_exc()
             
             # Generate content with actual data
             content = {
@@ -281,25 +310,27 @@ Start response with {{ and end with }}. No markdown, just raw JSON."""
                         f"Focus areas: {', '.join(f'{k}' for k, v in list(skill_summary.items())[:3])}" if skill_summary else "Limited data"
                     ],
                     "top_performers": [
-                         f"{f['name']} ({f['progress']}%)" for f in sorted(freshers_details_list, key=lambda x: x['progress'], reverse=True)[:3]
+                         f"{f['name']} ({f['progress']}%)" for f in top_progress
                     ]
                 }
             }
 
         # Store report record
-        report = Report(
-            title=content.get("title", f"{report_type.title()} Report"),
-            report_type=report_type,
-            format="pdf",
-            generated_by=user_id,
-            content=json.dumps(content)
-        )
-        db.add(report)
-        db.commit()
+        progress(90, "storing")
+        queued = report is not None
+        if report is None:
+            report = Report(report_type=report_type, format="pdf", generated_by=user_id)
+            db.add(report)
+        report.title = content.get("title", f"{report_type.title()} Report")
+        report.content = json.dumps(content)
+        if queued:
+            # The reports route publishes the n8n email once the report is marked ready
+            db.commit()
+        else:
+            # The n8n email is queued in the outbox in the same commit as the report
+            from app.agents.notifications import publish_report_generated
+            publish_report_generated(db, report, content)
         db.refresh(report)
-        
-        # Trigger n8n Webhook for Email
-        self.send_to_n8n(report, content)
 
         return {
             "id": str(report.id),
@@ -328,11 +359,12 @@ Start response with {{ and end with }}. No markdown, just raw JSON."""
         fresher, user = result
         
         # Gather only the last 3 assessment submissions per quiz (recent performance)
-        recent_sub_ids = {s.id for s in self._get_recent_submissions(db, user_id=user.id)}
-        all_submissions = db.query(Submission, Assessment).join(
+        recent = self._recent_attempts(db, user_id=user.id)
+        submissions = db.query(Submission, Assessment).join(
+            recent, recent.c.id == Submission.id
+        ).join(
             Assessment, Submission.assessment_id == Assessment.id
-        ).filter(Submission.user_id == user.id).order_by(Submission.submitted_at.desc()).all()
-        submissions = [(sub, assess) for sub, assess in all_submissions if sub.id in recent_sub_ids]
+        ).order_by(Submission.submitted_at.desc()).all()
         
         # Parse feedback from each submission (last 3 attempts per quiz only)
         assessment_details = []
@@ -444,22 +476,13 @@ Be thorough, professional, and constructive. Return ONLY valid JSON."""
         print(f"[ReportingAgent] Generating individual HR report for {fresher.employee_id}")
         
         try:
-            response = self.call_llm(prompt, system="You are an experienced Corporate HR Business Partner creating professional talent assessment reports.")
-            
-            # Parse LLM response
-            cleaned = response.strip()
-            if "```" in cleaned:
-                import re
-                match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", cleaned, re.DOTALL)
-                if match:
-                    cleaned = match.group(1)
-            
-            if "{" in cleaned:
-                start = cleaned.find("{")
-                end = cleaned.rfind("}") + 1
-                cleaned = cleaned[start:end]
-            
-            report_content = json.loads(cleaned)
+            report_content = self.call_llm_structured(
+                prompt,
+                IndividualHRReport,
+                system="You are an experienced Corporate HR Business Partner creating professional talent assessment reports.",
+            )
+            if report_content is None:
+                raise ValueError("LLM returned no usable report JSON")
             
         except Exception as e:
             print(f"[ReportingAgent] HR report generation error: {e}")
@@ -503,30 +526,6 @@ Be thorough, professional, and constructive. Return ONLY valid JSON."""
             "content": report_content
         }
 
-    def send_to_n8n(self, report, content):
-        """Send report content to n8n webhook for emailing."""
-        import requests
-        import os
-        
-        # Default n8n internal URL or use configured env var
-        webhook_url = os.getenv("N8N_WEBHOOK_URL", "http://localhost:5678/webhook/send-report-email")
-        
-        try:
-            print(f"[ReportingAgent] Sending report {report.id} to n8n: {webhook_url}")
-            payload = {
-                "report_id": report.id,
-                "title": report.title,
-                "type": report.report_type,
-                "generated_at": str(report.generated_at),
-                "summary": content.get("summary", ""),
-                "highlights": content.get("highlights", []),
-                "recommendations": content.get("recommendations", [])
-            }
-            # Fire and forget (with short timeout)
-            requests.post(webhook_url, json=payload, timeout=2)
-        except Exception as e:
-            print(f"[ReportingAgent] Failed to trigger n8n webhook: {e}")
-    
     def generate_overall_performance_report(self, db):
         """
         Generate comprehensive overall performance report for all freshers with HR insights.
@@ -545,23 +544,30 @@ Be thorough, professional, and constructive. Return ONLY valid JSON."""
                 "generated_at": datetime.utcnow().isoformat()
             }
         
-        total_freshers = len(results)
+        cohort = CohortStats.from_records(
+            results,
+            labels={"risk_level": lambda r: r[0].risk_level},
+            columns={"progress": lambda r: r[0].overall_progress},
+        )
+        total_freshers = cohort.size
         
         # Overall statistics
-        avg_progress = sum(f.overall_progress or 0 for f, u in results) / total_freshers
-        at_risk = [(f, u) for f, u in results if f.risk_level in ("high", "critical")]
-        at_risk_count = len(at_risk)
+        avg_progress = cohort.mean("progress")
+        at_risk_count = int(cohort.mask_in("risk_level", AT_RISK_LEVELS).sum())
+        
+        # Only the last 3 submissions per quiz, aggregated per fresher in one query
+        per_user = self._recent_user_stats(db)
+        failure_warnings = self._failure_warnings(db)
         
         # Performance standings
         freshers_performance = []
         warnings_list = []
         
         for f, u in results:
-            # Get only last 3 submissions per quiz for this fresher
-            submissions = self._get_recent_submissions(db, user_id=u.id)
+            user_stats = per_user.get(u.id, {"attempts": 0, "avg_score": 0.0, "passed": 0})
             
             # Check for repeated quiz failures
-            warning_info = self.check_repeated_failures(db, f.id)
+            warning_info = failure_warnings.get(u.id)
             
             if warning_info:
                 warnings_list.append({
@@ -576,10 +582,10 @@ Be thorough, professional, and constructive. Return ONLY valid JSON."""
                 })
             
             # Calculate individual metrics
-            total_submissions = len(submissions)
-            passed = sum(1 for s in submissions if s.pass_status == "pass")
+            total_submissions = user_stats["attempts"]
+            passed = user_stats["passed"]
             failed = total_submissions - passed
-            avg_score = sum(s.score for s in submissions) / total_submissions if total_submissions > 0 else 0
+            avg_score = user_stats["avg_score"]
             
             freshers_performance.append({
                 "fresher_id": f.id,
@@ -598,7 +604,8 @@ Be thorough, professional, and constructive. Return ONLY valid JSON."""
             })
         
         # Sort by performance (average score descending)
-        freshers_performance.sort(key=lambda x: x["average_score"], reverse=True)
+        standings = CohortStats(columns={"score": [p["average_score"] for p in freshers_performance]})
+        freshers_performance = [freshers_performance[i] for i in standings.order_by("score")]
         
         # Generate LLM-powered executive summary
         context = {
@@ -639,19 +646,9 @@ Generate a professional executive summary report with the following structure in
 Use professional corporate HR terminology. Be constructive but honest about performance gaps."""
         
         try:
-            llm_response = self.call_llm(prompt)
-            # Clean and parse response
-            cleaned = llm_response.strip()
-            if "```" in cleaned:
-                import re
-                match = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", cleaned, re.DOTALL)
-                if match:
-                    cleaned = match.group(1)
-            if "{" in cleaned:
-                start = cleaned.find("{")
-                end = cleaned.rfind("}") + 1
-                cleaned = cleaned[start:end]
-            llm_insights = json.loads(cleaned)
+            llm_insights = self.call_llm_structured(prompt, CohortInsights)
+            if llm_insights is None:
+                raise ValueError("LLM returned no usable insights JSON")
         except Exception as e:
             print(f"[WARNING] LLM generation failed for overall report: {e}")
             llm_insights = {
@@ -712,49 +709,57 @@ Use professional corporate HR terminology. Be constructive but honest about perf
         - 2 failures: Warning issued with development plan
         - 3+ failures: Critical warning - recommend review for program continuation
         """
-        from app.models.assessment import Submission, Assessment
         from app.models.fresher import Fresher
-        from app.models.user import User
         
-        # Get fresher details
         fresher = db.query(Fresher).filter(Fresher.id == fresher_id).first()
         if not fresher:
             return None
+        return self._failure_warnings(db, [fresher.user_id]).get(fresher.user_id)
+    
+    def _failure_warnings(self, db, user_ids=None) -> dict:
+        """check_repeated_failures for many users at once: {user_id: warning} from one grouped query."""
+        from sqlalchemy import func
+        from app.models.assessment import Submission, Assessment
         
-        user = db.query(User).filter(User.id == fresher.user_id).first()
-        
-        # Get all failed quiz submissions
-        failed_submissions = db.query(Submission).filter(
-            Submission.user_id == user.id,
+        query = db.query(
+            Submission.user_id,
+            Submission.assessment_id,
+            func.count(Submission.id),
+            func.min(Submission.submitted_at),
+            func.min(Submission.id),
+        ).filter(
             Submission.pass_status == "fail",
             Submission.status.in_(["completed", "graded"])
-        ).order_by(Submission.submitted_at).all()
-        
-        if not failed_submissions:
-            return None
-        
-        # Group failures by assessment
-        assessment_failures = {}
-        for sub in failed_submissions:
-            assessment_id = sub.assessment_id
-            if assessment_id not in assessment_failures:
-                assessment_failures[assessment_id] = []
-            assessment_failures[assessment_id].append(sub)
-        
-        # Check for repeated failures on same assessment
-        max_failures = 0
-        critical_assessment = None
-        
-        for assessment_id, failures in assessment_failures.items():
-            if len(failures) > max_failures:
-                max_failures = len(failures)
-                critical_assessment = db.query(Assessment).filter(Assessment.id == assessment_id).first()
-        
-        if max_failures < 2:
-            return None
+        )
+        if user_ids is not None:
+            query = query.filter(Submission.user_id.in_(list(user_ids)))
+        
+        per_user = {}
+        for user_id, assessment_id, count, first_failed_at, first_id in query.group_by(
+            Submission.user_id, Submission.assessment_id
+        ).all():
+            per_user.setdefault(user_id, []).append((first_failed_at, first_id, assessment_id, count))
+        
+        # Most failures on one assessment; ties go to the assessment failed first
+        worst = {}
+        for user_id, groups in per_user.items():
+            groups.sort(key=lambda g: (g[0] is not None, g[0], g[1]))
+            _, _, assessment_id, max_failures = max(groups, key=lambda g: g[3])
+            if max_failures >= 2:
+                worst[user_id] = (assessment_id, max_failures, sum(g[3] for g in groups))
+        titles = dict(db.query(Assessment.id, Assessment.title).filter(
+            Assessment.id.in_({assessment_id for assessment_id, _, _ in worst.values()})
+        ).all()) if worst else {}
         
+        return {
+            user_id: self._failure_warning(assessment_id, titles.get(assessment_id), max_failures, total_failures)
+            for user_id, (assessment_id, max_failures, total_failures) in worst.items()
+        }
+    
+    @staticmethod
+    def _failure_warning(assessment_id, title, max_failures: int, total_failures: int) -> dict:
         # Generate professional HR warning
-        assessment_title = critical_assessment.title if critical_assessment else "Assessment"
+        assessment_title = title or "Assessment"
         
         if max_failures == 2:
             warning_level = "warning"
@@ -769,10 +774,10 @@ Use professional corporate HR terminology. Be constructive but honest about perf
             "warning_level": warning_level,
             "failed_count": max_failures,
             "assessment_title": assessment_title,
-            "assessment_id": critical_assessment.id if critical_assessment else None,
+            "assessment_id": assessment_id if title is not None else None,
             "reason": reason,
             "recommendation": recommendation,
-            "total_failures": len(failed_submissions)
+            "total_failures": total_failures
         }
     
     def generate_warnings_report(self, db):
@@ -786,9 +791,10 @@ Use professional corporate HR terminology. Be constructive but honest about perf
         # Get all freshers
         results = db.query(Fresher, User).join(User, Fresher.user_id == User.id).all()
         
+        failure_warnings = self._failure_warnings(db)
         warnings = []
         for f, u in results:
-            warning_info = self.check_repeated_failures(db, f.id)
+            warning_info = failure_warnings.get(u.id)
             if warning_info:
                 warnings.append({
                     "fresher_id": f.id,
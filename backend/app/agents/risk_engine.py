@@ -0,0 +1,444 @@
+"""Batch risk scoring: cohort feature vectors, a local logistic model, LLM only where it adds something.
+
+Features for every fresher come from a few grouped queries: average score,
+fail rate, score trend slope (points per attempt), average skill level and
+schedule completion. A logistic regression is fitted with NumPy on submission
+history (the features as of each attempt against whether that attempt
+failed); until there are enough labelled attempts of both outcomes a fixed
+prior that mirrors the old score thresholds is used instead.
+
+Risk level and score come from the model, and every fresher gets factors
+derived from the model's feature contributions. The LLM only writes
+explanations: for a single borderline or high-risk prediction, and, after a
+cohort sweep, in a background job for the highest-risk open alerts (capped
+per sweep), whose reason it replaces.
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy import case, func
+from app.config import settings
+from app.core.periodic import PeriodicTask
+from app.core.snapshot_cache import dashboard_snapshots
+from app.models.analytics import PerformanceAnalytics
+from app.models.assessment import Submission
+from app.models.fresher import Fresher, Skill
+from app.models.report import Alert
+from app.models.schedule import Schedule, ScheduleItem
+from app.models.user import User
+
+FEATURES = ("avg_score", "fail_rate", "trend_slope", "skill_level", "schedule_completion")
+# Lower bound of each level's risk_score band
+LEVEL_BOUNDS = (("critical", 75.0), ("high", 50.0), ("medium", 25.0), ("low", 0.0))
+HIGH_RISK = ("high", "critical")
+OPEN_ALERT_STATUSES = ("new", "acknowledged")
+
+
+def risk_level_for(score: float) -> str:
+    for level, bound in LEVEL_BOUNDS:
+        if score >= bound:
+            return level
+    return "low"
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+@dataclass
+class RiskModel:
+    """Logistic model over standardized features; ``defaults`` fill in missing features."""
+    weights: np.ndarray
+    bias: float
+    mean: np.ndarray
+    scale: np.ndarray
+    defaults: np.ndarray
+    source: str  # "prior" or "fitted"
+    samples: int = 0
+
+    def logits(self, X: np.ndarray) -> np.ndarray:
+        return ((X - self.mean) / self.scale) @ self.weights + self.bias
+
+    def risk_scores(self, X: np.ndarray) -> np.ndarray:
+        return np.round(_sigmoid(self.logits(X)) * 100, 1)
+
+    def contributions(self, X: np.ndarray) -> np.ndarray:
+        """Per-feature push towards risk, relative to the model's reference point."""
+        return ((X - self.defaults) / self.scale) * self.weights
+
+
+# Roughly the old thresholds on average score (75 -> ~15, 60 -> ~40, 40 -> ~75,
+# 30 -> ~90) for a fresher at the defaults, with smaller nudges from the other
+# features. Works on raw feature values (mean 0, scale 1).
+PRIOR_MODEL = RiskModel(
+    weights=np.array([-0.081, 1.0, -0.05, -0.01, -0.6]),
+    bias=4.84,
+    mean=np.zeros(len(FEATURES)),
+    scale=np.ones(len(FEATURES)),
+    defaults=np.array([60.0, 0.3, 0.0, 50.0, 0.5]),
+    source="prior",
+)
+
+
+def _group_positions(keys: np.ndarray) -> np.ndarray:
+    """Index of each row within its run of equal ``keys`` (keys must be sorted)."""
+    if not keys.size:
+        return np.zeros(0, dtype=int)
+    starts = np.r_[0, np.flatnonzero(keys[1:] != keys[:-1]) + 1]
+    run_start = np.repeat(starts, np.diff(np.r_[starts, keys.size]))
+    return np.arange(keys.size) - run_start
+
+
+def _slope(n, sx, sxx, sy, sxy) -> np.ndarray:
+    """Least-squares slope from per-group sums; 0 where fewer than two points."""
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (n * sxy - sx * sy) / denominator
+    return np.where((n >= 2) & (denominator > 0), slope, 0.0)
+
+
+class RiskEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._model: Optional[RiskModel] = None
+
+    # ---- features ----
+
+    def _history(self, db, user_ids: Optional[Sequence[int]] = None):
+        """Graded attempts sorted by (user, time): user ids, scores and failure flags."""
+        query = db.query(Submission.user_id, Submission.score, Submission.pass_status).filter(
+            Submission.status == "completed", Submission.score != None
+        )
+        if user_ids is not None:
+            query = query.filter(Submission.user_id.in_(list(user_ids)))
+        rows = query.order_by(Submission.user_id, Submission.submitted_at, Submission.id).all()
+        users = np.array([r[0] for r in rows], dtype=np.int64)
+        scores = np.array([r[1] for r in rows], dtype=float)
+        failed = np.array([r[2] == "fail" for r in rows], dtype=float)
+        return users, scores, failed
+
+    def features(self, db, freshers: Sequence[Fresher], model: RiskModel) -> Dict[str, np.ndarray]:
+        """Feature matrix (one row per fresher, columns FEATURES) plus the raw counts behind it."""
+        n = len(freshers)
+        fresher_ids = [f.id for f in freshers]
+        fresher_users = np.array([f.user_id for f in freshers], dtype=np.int64)
+        restrict = n < 500  # filtering by id only pays off for small batches
+
+        users, scores, failed = self._history(db, fresher_users.tolist() if restrict else None)
+        # Map each attempt to its fresher's row
+        order = np.argsort(fresher_users, kind="stable")
+        slot = np.minimum(np.searchsorted(fresher_users[order], users), n - 1)
+        keep = fresher_users[order][slot] == users
+        users, scores, failed = users[keep], scores[keep], failed[keep]
+        row = order[slot[keep]]
+        x = _group_positions(users).astype(float)
+
+        attempts = np.bincount(row, minlength=n).astype(float)
+        score_sum = np.bincount(row, weights=scores, minlength=n)
+        fails = np.bincount(row, weights=failed, minlength=n)
+        slope = _slope(
+            attempts,
+            np.bincount(row, weights=x, minlength=n),
+            np.bincount(row, weights=x * x, minlength=n),
+            score_sum,
+            np.bincount(row, weights=x * scores, minlength=n),
+        )
+
+        skill_query = db.query(Skill.fresher_id, func.avg(Skill.level)).group_by(Skill.fresher_id)
+        schedule_query = db.query(
+            Schedule.fresher_id,
+            func.count(ScheduleItem.id),
+            func.sum(case((ScheduleItem.status == "completed", 1), else_=0)),
+        ).join(ScheduleItem, ScheduleItem.schedule_id == Schedule.id).group_by(Schedule.fresher_id)
+        if restrict:
+            skill_query = skill_query.filter(Skill.fresher_id.in_(fresher_ids))
+            schedule_query = schedule_query.filter(Schedule.fresher_id.in_(fresher_ids))
+        position = {fid: i for i, fid in enumerate(fresher_ids)}
+        skill_level = np.full(n, np.nan)
+        for fid, level in skill_query.all():
+            if fid in position:
+                skill_level[position[fid]] = level
+        completion = np.full(n, np.nan)
+        for fid, total, done in schedule_query.all():
+            if fid in position and total:
+                completion[position[fid]] = (done or 0) / total
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            X = np.column_stack([
+                np.where(attempts > 0, score_sum / attempts, np.nan),
+                np.where(attempts > 0, fails / attempts, np.nan),
+                slope,
+                skill_level,
+                completion,
+            ])
+        # Freshers without data on a feature sit at the model's reference value
+        X = np.where(np.isnan(X), model.defaults, X)
+        return {"X": X, "attempts": attempts, "fails": fails}
+
+    # ---- model ----
+
+    def fit(self, db) -> RiskModel:
+        """Fit on history: features as of each attempt (from earlier attempts) vs. whether it failed."""
+        users, scores, failed = self._history(db)
+        x = _group_positions(users).astype(float)
+        samples = x >= 1
+        if samples.sum() < settings.RISK_MODEL_MIN_SAMPLES or len(np.unique(failed[samples])) < 2:
+            model = PRIOR_MODEL
+        else:
+            # Exclusive prefix sums within each user's run of attempts
+            run_start = np.arange(users.size) - x.astype(int)
+
+            def prefix(values):
+                total = np.r_[0.0, np.cumsum(values)]
+                return total[np.arange(values.size)] - total[run_start]
+
+            m = x  # attempts before this one
+            sy, sf, sxy = prefix(scores), prefix(failed), prefix(x * scores)
+            sx, sxx = m * (m - 1) / 2, (m - 1) * m * (2 * m - 1) / 6
+            with np.errstate(divide="ignore", invalid="ignore"):
+                history = np.column_stack([sy / m, sf / m, _slope(m, sx, sxx, sy, sxy)])[samples]
+            # Skill level and schedule completion have no history; use each user's current values
+            fresher_rows = db.query(Fresher).filter(Fresher.user_id.in_(np.unique(users).tolist())).all()
+            current = self.features(db, fresher_rows, PRIOR_MODEL)["X"] if fresher_rows else np.zeros((0, len(FEATURES)))
+            by_user = {f.user_id: current[i, 3:] for i, f in enumerate(fresher_rows)}
+            static = np.array([by_user.get(u, PRIOR_MODEL.defaults[3:]) for u in users[samples].tolist()]).reshape(-1, 2)
+            model = self._fit_logistic(np.column_stack([history, static]), failed[samples])
+        with self._lock:
+            self._model = model
+        return model
+
+    @staticmethod
+    def _fit_logistic(X: np.ndarray, y: np.ndarray, iterations: int = 500, rate: float = 0.5, l2: float = 0.01) -> RiskModel:
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+        Z = (X - mean) / scale
+        weights = np.zeros(X.shape[1])
+        bias = float(np.log(y.mean() / (1 - y.mean())))
+        for _ in range(iterations):
+            error = _sigmoid(Z @ weights + bias) - y
+            weights -= rate * (Z.T @ error / y.size + l2 * weights)
+            bias -= rate * float(error.mean())
+        return RiskModel(weights, bias, mean, scale, defaults=mean, source="fitted", samples=int(y.size))
+
+    def model(self, db) -> RiskModel:
+        with self._lock:
+            model = self._model
+        return model or self.fit(db)
+
+    # ---- scoring ----
+
+    def assess(self, db, freshers: Sequence[Fresher], model: Optional[RiskModel] = None) -> List[dict]:
+        """Score ``freshers`` in one vectorized pass; nothing is written."""
+        if not freshers:
+            return []
+        model = model or self.model(db)
+        data = self.features(db, freshers, model)
+        X = data["X"]
+        scores = model.risk_scores(X)
+        contributions = model.contributions(X)
+        margin = settings.RISK_BORDERLINE_MARGIN
+        bounds = np.array([bound for _, bound in LEVEL_BOUNDS if bound > 0])
+        borderline = np.abs(scores[:, None] - bounds[None, :]).min(axis=1) <= margin
+        results = []
+        for i, fresher in enumerate(freshers):
+            level = risk_level_for(float(scores[i]))
+            results.append({
+                "fresher_id": fresher.id,
+                "risk_level": level,
+                "risk_score": float(scores[i]),
+                "factors": self._factors(X[i], contributions[i], data["attempts"][i], data["fails"][i]),
+                "recommendations": self._recommendations(level, X[i]),
+                "borderline": bool(borderline[i]),
+                "features": {name: round(float(v), 2) for name, v in zip(FEATURES, X[i])},
+                "model": model.source,
+            })
+        return results
+
+    @staticmethod
+    def _factors(x, contribution, attempts, fails) -> List[str]:
+        text = {
+            "avg_score": f"Average score: {x[0]:.0f}%" if attempts else "No graded assessments yet",
+            "fail_rate": f"Failed {int(fails)} of {int(attempts)} assessments",
+            "trend_slope": f"Scores trending {'up' if x[2] >= 0 else 'down'} ({x[2]:+.1f} pts per attempt)",
+            "skill_level": f"Average skill level: {x[3]:.0f}",
+            "schedule_completion": f"Schedule completion: {x[4] * 100:.0f}%",
+        }
+        order = np.argsort(-contribution, kind="stable")
+        factors = [text[FEATURES[j]] for j in order if contribution[j] > 0][:3]
+        return factors or [text["avg_score"]]
+
+    @staticmethod
+    def _recommendations(level: str, x) -> List[str]:
+        recommendations = ["Review weak skill areas" if x[3] < 60 else "Keep practising across skill areas"]
+        if level in HIGH_RISK:
+            recommendations.append("Schedule mentoring session")
+        if x[4] < 0.5:
+            recommendations.append("Catch up on scheduled learning items")
+        if len(recommendations) == 1:
+            recommendations.append("Continue current pace")
+        return recommendations
+
+    def explain(self, db, result: dict) -> dict:
+        """Replace templated factors/recommendations with an LLM explanation when it parses."""
+        from app.agents.analytics_agent import AnalyticsAgent
+        from app.schemas.agent_outputs import RiskExplanation
+        prompt = f"""
+A statistical model scored a trainee's onboarding risk as {result['risk_level']} ({result['risk_score']:.0f}/100).
+Model inputs: {result['features']}
+Strongest signals: {'; '.join(result['factors'])}
+
+Explain this risk to the trainee's manager. Return JSON with factors (list of short reasons) and recommendations (list of concrete actions).
+"""
+        explanation = AnalyticsAgent().call_llm_structured(prompt, RiskExplanation)
+        if explanation:
+            result["factors"] = explanation.get("factors") or result["factors"]
+            result["recommendations"] = explanation.get("recommendations") or result["recommendations"]
+            result["explained_by"] = "llm"
+        return result
+
+    # ---- writes ----
+
+    def upsert_alert(self, db, fresher: Fresher, result: dict, open_alert: Optional[Alert] = None, name: str = None) -> Optional[Alert]:
+        """Keep at most one open alert per fresher, updated in place. Does not commit.
+
+        A result below high risk resolves the fresher's open alert, so the
+        open alert always reflects the current score. Returns the open alert,
+        or None once there is none.
+        """
+        if open_alert is None:
+            open_alert = db.query(Alert).filter(
+                Alert.fresher_id == fresher.id, Alert.status.in_(OPEN_ALERT_STATUSES)
+            ).order_by(Alert.id.desc()).first()
+        if result["risk_level"] not in HIGH_RISK:
+            if open_alert is not None:
+                open_alert.status = "resolved"
+                open_alert.reason = (
+                    f"{open_alert.reason or ''} (resolved: risk now {result['risk_level']}, "
+                    f"{result['risk_score']:.0f}/100)"
+                ).strip()
+            return None
+        reason = "; ".join(result.get("factors") or ["High risk detected"])
+        if open_alert is not None:
+            open_alert.risk_level = result["risk_level"]
+            open_alert.risk_score = result["risk_score"]
+            open_alert.reason = reason
+            return open_alert
+        if name is None:
+            user = db.query(User).filter(User.id == fresher.user_id).first()
+            name = f"{user.first_name} {user.last_name}" if user else "Unknown"
+        alert = Alert(
+            fresher_id=fresher.id,
+            fresher_name=name,
+            risk_level=result["risk_level"],
+            risk_score=result["risk_score"],
+            reason=reason,
+            status="new",
+        )
+        db.add(alert)
+        return alert
+
+    def refresh_cohort(self, db) -> dict:
+        """Refit, rescore every fresher and upsert alerts; LLM explanations are queued, not awaited."""
+        started = time.perf_counter()
+        model = self.fit(db)
+        rows = db.query(Fresher, User).outerjoin(User, User.id == Fresher.user_id).order_by(Fresher.id).all()
+        freshers = [f for f, _ in rows]
+        names = {f.id: f"{u.first_name} {u.last_name}" if u else "Unknown" for f, u in rows}
+        results = self.assess(db, freshers, model)
+
+        open_alerts: Dict[int, Alert] = {}
+        for alert in db.query(Alert).filter(Alert.status.in_(OPEN_ALERT_STATUSES)).order_by(Alert.id):
+            open_alerts[alert.fresher_id] = alert  # newest wins
+        analytics_ids = dict(db.query(PerformanceAnalytics.fresher_id, PerformanceAnalytics.id).all())
+
+        changed = 0
+        fresher_updates, analytics_updates = [], []
+        for fresher, result in zip(freshers, results):
+            if (fresher.risk_level, fresher.risk_score) != (result["risk_level"], result["risk_score"]):
+                changed += fresher.risk_level != result["risk_level"]
+                fresher_updates.append({"id": fresher.id, "risk_level": result["risk_level"], "risk_score": result["risk_score"]})
+                if fresher.id in analytics_ids:
+                    analytics_updates.append({"id": analytics_ids[fresher.id], "risk_level": result["risk_level"], "risk_score": result["risk_score"]})
+            result["alert"] = self.upsert_alert(db, fresher, result, open_alerts.get(fresher.id), names[fresher.id])
+        if fresher_updates:
+            db.bulk_update_mappings(Fresher, fresher_updates)
+        if analytics_updates:
+            db.bulk_update_mappings(PerformanceAnalytics, analytics_updates)
+        db.commit()
+        if fresher_updates:
+            dashboard_snapshots.invalidate()  # bulk updates skip the session events it watches
+        scored_ms = (time.perf_counter() - started) * 1000
+
+        # Explanations are only kept on open alerts, so only high-risk freshers get one, highest first
+        candidates = sorted(
+            (r for r in results if r["alert"] is not None and r["risk_level"] in HIGH_RISK),
+            key=lambda r: r["risk_score"],
+            reverse=True,
+        )[:settings.RISK_EXPLAIN_LIMIT]
+        queued = 0
+        if candidates:
+            from app.core.job_queue import feedback_queue
+            jobs = [
+                {key: r[key] for key in ("risk_level", "risk_score", "factors", "features")} | {"alert_id": r["alert"].id}
+                for r in candidates
+            ]
+            if feedback_queue.submit("risk-explanations", self.explain_alerts, jobs):
+                queued = len(jobs)
+
+        levels: Dict[str, int] = {}
+        for r in results:
+            levels[r["risk_level"]] = levels.get(r["risk_level"], 0) + 1
+        return {
+            "scored": len(results),
+            "level_changes": changed,
+            "risk_distribution": levels,
+            "explanations_queued": queued,
+            "model": model.source,
+            "training_samples": model.samples,
+            "scoring_ms": round(scored_ms, 1),
+        }
+
+
+    def explain_alerts(self, jobs: List[dict]):
+        """Background job: LLM explanations for swept high-risk results, written to their open alerts."""
+        from app.database import SessionLocal
+        db = SessionLocal()
+        explained = 0
+        try:
+            for result in jobs:
+                self.explain(db, result)
+                if result.get("explained_by") != "llm":
+                    continue
+                # Skip alerts resolved or rescored since the sweep
+                alert = db.query(Alert).filter(
+                    Alert.id == result["alert_id"],
+                    Alert.status.in_(OPEN_ALERT_STATUSES),
+                    Alert.risk_level == result["risk_level"],
+                ).first()
+                if alert is not None:
+                    alert.reason = "; ".join(result["factors"])
+                    db.commit()
+                    explained += 1
+        finally:
+            db.close()
+        print(f"[RiskEngine] ✓ Explained {explained} of {len(jobs)} high-risk alerts")
+
+
+def _refresh_cohort_risk():
+    from app.database import SessionLocal
+    db = SessionLocal()
+    try:
+        summary = risk_engine.refresh_cohort(db)
+        print(f"[RiskEngine] ✓ Scored {summary['scored']} freshers in {summary['scoring_ms']}ms "
+              f"({summary['model']} model, {summary['explanations_queued']} explanations queued)")
+    finally:
+        db.close()
+
+
+risk_engine = RiskEngine()
+
+# Periodic cohort-wide risk refresh (started in app startup)
+risk_refresher = PeriodicTask("RiskRefresh", settings.RISK_REFRESH_INTERVAL_SECONDS, _refresh_cohort_risk)
@@ -0,0 +1,250 @@
+"""Trends engine: daily and weekly activity rollups behind /analytics/trends.
+
+Graded submissions and completed schedule items are bucketed into TrendRollup
+rows per (granularity, bucket, department, cohort), where the cohort is the
+fresher's join month. Rows are kept current by event subscribers that rebuild
+only the week (and its days) an event falls in, for that fresher's slice, so
+trend queries read a handful of pre-bucketed rows instead of raw history.
+"""
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, func, or_
+from app.core.event_bus import EventBus, event_bus
+from app.core.snapshot_cache import dashboard_snapshots
+from app.models.analytics import TrendRollup
+from app.models.assessment import Submission
+from app.models.fresher import Fresher
+from app.models.schedule import Schedule, ScheduleItem
+from app.models.user import User
+
+DAY = "day"
+WEEK = "week"
+GRANULARITIES = (DAY, WEEK)
+
+SCHEDULE_ITEM_COMPLETED = "schedule_item.completed"
+
+# Serializes rebuilds of one (week, department, cohort) slice across event workers
+_slice_locks = [threading.Lock() for _ in range(64)]
+
+Slice = Tuple[str, str]  # (department, cohort)
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    return day - timedelta(days=day.weekday()) if granularity == WEEK else day
+
+
+def _day_of(value) -> Optional[date]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date()
+
+
+def _slice_of(join_date: Optional[str], department: Optional[str]) -> Slice:
+    return (department or "General", (join_date or "")[:7] or "unknown")
+
+
+def _fresher_slices(db) -> Dict[int, Tuple[int, Slice]]:
+    """fresher_id -> (user_id, (department, cohort))."""
+    query = db.query(Fresher.id, Fresher.user_id, Fresher.join_date, User.department).outerjoin(
+        User, User.id == Fresher.user_id
+    )
+    return {fid: (user_id, _slice_of(join_date, dept)) for fid, user_id, join_date, dept in query.all()}
+
+
+def _collect(db, freshers: Dict[int, Tuple[int, Slice]], start: Optional[date] = None, end: Optional[date] = None):
+    """Roll up activity of ``freshers`` in [start, end) into {(granularity, bucket, dept, cohort): counters}."""
+    by_user = {user_id: fid for fid, (user_id, _) in freshers.items()}
+    rollups: Dict[tuple, dict] = {}
+
+    def add(fresher_id: int, day: date, score=None, passed=None, item=False):
+        _, (department, cohort) = freshers[fresher_id]
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(day, granularity).isoformat(), department, cohort)
+            row = rollups.setdefault(key, {"submissions": 0, "score_total": 0.0, "passed": 0, "items_completed": 0, "freshers": set()})
+            if item:
+                row["items_completed"] += 1
+            else:
+                row["submissions"] += 1
+                row["score_total"] += score or 0
+                row["passed"] += 1 if passed else 0
+            row["freshers"].add(fresher_id)
+
+    graded_at = func.coalesce(Submission.graded_at, Submission.submitted_at)
+    subs = db.query(Submission.user_id, graded_at, Submission.score, Submission.pass_status).filter(
+        Submission.status == "completed", Submission.user_id.in_(list(by_user))
+    )
+    if start is not None:
+        lo, hi = datetime.combine(start, time.min), datetime.combine(end, time.min)
+        subs = subs.filter(graded_at >= lo, graded_at < hi)
+    for user_id, at, score, pass_status in subs.all():
+        day = _day_of(at)
+        if day is not None:
+            add(by_user[user_id], day, score=score, passed=pass_status == "pass")
+
+    # Items completed before completed_at existed are dated by their schedule day
+    items = db.query(Schedule.fresher_id, ScheduleItem.completed_at, Schedule.schedule_date).join(
+        Schedule, Schedule.id == ScheduleItem.schedule_id
+    ).filter(ScheduleItem.status == "completed", Schedule.fresher_id.in_(list(freshers)))
+    if start is not None:
+        items = items.filter(or_(
+            and_(ScheduleItem.completed_at >= lo, ScheduleItem.completed_at < hi),
+            and_(ScheduleItem.completed_at.is_(None),
+                 Schedule.schedule_date >= start.isoformat(), Schedule.schedule_date < end.isoformat()),
+        ))
+    for fresher_id, completed_at, schedule_date in items.all():
+        day = _day_of(completed_at or schedule_date)
+        if day is not None:
+            add(fresher_id, day, item=True)
+    return rollups
+
+
+def _rollup_rows(rollups: Dict[tuple, dict]) -> List[dict]:
+    return [
+        {
+            "granularity": granularity,
+            "bucket_start": bucket,
+            "department": department,
+            "cohort": cohort,
+            "submissions": row["submissions"],
+            "score_total": row["score_total"],
+            "passed": row["passed"],
+            "items_completed": row["items_completed"],
+            "active_freshers": len(row["freshers"]),
+        }
+        for (granularity, bucket, department, cohort), row in rollups.items()
+    ]
+
+
+def rebuild(db) -> int:
+    """Recompute every rollup row from raw history. Returns the number of rows written."""
+    rows = _rollup_rows(_collect(db, _fresher_slices(db)))
+    db.query(TrendRollup).delete(synchronize_session=False)
+    if rows:
+        db.bulk_insert_mappings(TrendRollup, rows)
+    db.commit()
+    dashboard_snapshots.invalidate()
+    print(f"[Trends] ✓ Rebuilt {len(rows)} rollup rows")
+    return len(rows)
+
+
+def ensure_backfilled(db):
+    """Build rollups on first start against a database that already has history."""
+    if db.query(TrendRollup.id).first() is None and (
+        db.query(Submission.id).filter(Submission.status == "completed").first()
+        or db.query(ScheduleItem.id).filter(ScheduleItem.status == "completed").first()
+    ):
+        rebuild(db)
+
+
+def refresh_week(db, day: date, fresher_id: int):
+    """Rebuild the week containing ``day`` (and its day rows) for ``fresher_id``'s slice. Commits ``db``."""
+    slices = _fresher_slices(db)
+    if fresher_id not in slices:
+        return
+    department, cohort = slices[fresher_id][1]
+    members = {fid: entry for fid, entry in slices.items() if entry[1] == (department, cohort)}
+    week = bucket_start(day, WEEK)
+    days = [(week + timedelta(days=i)).isoformat() for i in range(7)]
+    lock = _slice_locks[hash((week, department, cohort)) % len(_slice_locks)]
+    with lock:
+        rows = _rollup_rows(_collect(db, members, week, week + timedelta(days=7)))
+        db.query(TrendRollup).filter(
+            TrendRollup.department == department,
+            TrendRollup.cohort == cohort,
+            or_(
+                and_(TrendRollup.granularity == WEEK, TrendRollup.bucket_start == week.isoformat()),
+                and_(TrendRollup.granularity == DAY, TrendRollup.bucket_start.in_(days)),
+            ),
+        ).delete(synchronize_session=False)
+        if rows:
+            db.bulk_insert_mappings(TrendRollup, rows)
+        db.commit()
+    dashboard_snapshots.invalidate()
+
+
+def trend_series(
+    db,
+    start: date,
+    end: date,
+    granularity: str = DAY,
+    department: Optional[str] = None,
+    cohort: Optional[str] = None,
+) -> List[dict]:
+    """One point per bucket in [start, end] (inclusive), empty buckets included."""
+    first = bucket_start(start, granularity)
+    query = db.query(
+        TrendRollup.bucket_start,
+        func.sum(TrendRollup.submissions),
+        func.sum(TrendRollup.score_total),
+        func.sum(TrendRollup.passed),
+        func.sum(TrendRollup.items_completed),
+        func.sum(TrendRollup.active_freshers),
+    ).filter(
+        TrendRollup.granularity == granularity,
+        TrendRollup.bucket_start >= first.isoformat(),
+        TrendRollup.bucket_start <= end.isoformat(),
+    )
+    if department:
+        query = query.filter(TrendRollup.department == department)
+    if cohort:
+        query = query.filter(TrendRollup.cohort == cohort)
+    found = {row[0]: row[1:] for row in query.group_by(TrendRollup.bucket_start).all()}
+
+    series = []
+    step = timedelta(days=7 if granularity == WEEK else 1)
+    bucket = first
+    while bucket <= end:
+        submissions, score_total, passed, items, active = found.get(bucket.isoformat(), (0, 0, 0, 0, 0))
+        avg_score = round(score_total / submissions, 1) if submissions else None
+        series.append({
+            "date": bucket.isoformat(),
+            "avg_progress": avg_score,
+            "completions": submissions + items,
+            "avg_score": avg_score,
+            "pass_rate": round(passed / submissions * 100, 1) if submissions else None,
+            "submissions": submissions,
+            "items_completed": items,
+            "active_freshers": active,
+        })
+        bucket += step
+    return series
+
+
+def _on_submission_graded(db, payload: dict):
+    submission = db.query(Submission).filter(Submission.id == payload["submission_id"]).first()
+    fresher = db.query(Fresher).filter(Fresher.user_id == payload["user_id"]).first()
+    if not submission or not fresher:
+        return
+    day = _day_of(submission.graded_at or submission.submitted_at) or datetime.now(timezone.utc).date()
+    previous = submission.trend_day
+    submission.trend_day = day.isoformat()
+    refresh_week(db, day, fresher.id)
+    # A regrade on another week must also leave the week it used to count in
+    if previous and bucket_start(date.fromisoformat(previous), WEEK) != bucket_start(day, WEEK):
+        refresh_week(db, date.fromisoformat(previous), fresher.id)
+
+
+def _on_schedule_item_completed(db, payload: dict):
+    refresh_week(db, date.fromisoformat(payload["day"]), payload["fresher_id"])
+
+
+def publish_schedule_item_completed(db, item: ScheduleItem, fresher_id: int):
+    """Publish ``schedule_item.completed`` for a just-completed item. Commits ``db``."""
+    day = _day_of(item.completed_at)
+    return event_bus.publish(
+        db,
+        SCHEDULE_ITEM_COMPLETED,
+        {"item_id": item.id, "fresher_id": fresher_id, "day": day.isoformat()},
+        dedupe_key=f"{SCHEDULE_ITEM_COMPLETED}:{item.id}:{item.completed_at.isoformat()}",
+    )
+
+
+def register_subscribers(bus: EventBus = event_bus):
+    from app.agents.post_grading import SUBMISSION_GRADED
+    bus.subscribe(SUBMISSION_GRADED, "trends", _on_submission_graded)
+    bus.subscribe(SCHEDULE_ITEM_COMPLETED, "trends", _on_schedule_item_completed)
@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.database import get_db
@@ -6,13 +6,33 @@ from app.core.security import decode_access_token
 from app.models.user import User
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db),
 ) -> User:
-    token = credentials.credentials
+    return _user_from_token(credentials.credentials, db)
+
+
+def get_current_user_or_query_token(
+    credentials: HTTPAuthorizationCredentials = Depends(optional_security),
+    token: str = Query(None, description="JWT token (for EventSource/browser clients that cannot set headers)"),
+    db: Session = Depends(get_db),
+) -> User:
+    """Like get_current_user, but also accepts ?token=<jwt>."""
+    if credentials:
+        return _user_from_token(credentials.credentials, db)
+    if token:
+        return _user_from_token(token, db)
+    raise HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Token required. Pass ?token=<jwt> or Authorization header.",
+    )
+
+
+def _user_from_token(token: str, db: Session) -> User:
     print(f"[AUTH] Validating token, length={len(token)}, first_20_chars={token[:20]}")
     payload = decode_access_token(token)
     if payload is None:
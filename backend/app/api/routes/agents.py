@@ -48,7 +48,10 @@ def grade_submission(data: dict, db: Session = Depends(get_db), current_user: Us
         from app.agents.assessment_agent import AssessmentAgent
         agent = AssessmentAgent()
     
-    return agent.evaluate(db, sub, assessment)
+    result = agent.evaluate(db, sub, assessment)
+    from app.agents.post_grading import publish_submission_graded
+    publish_submission_graded(db, sub)
+    return result
 
 
 @router.post("/predict-risk")
@@ -62,6 +65,12 @@ def predict_risk(data: dict, db: Session = Depends(get_db), current_user: User =
     return agent.predict_risk(db, fresher)
 
 
+@router.post("/risk/refresh")
+def refresh_cohort_risk(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    from app.agents.risk_engine import risk_engine
+    return risk_engine.refresh_cohort(db)
+
+
 @router.post("/update-profile")
 def update_profile(data: dict, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     from app.agents.profile_agent import ProfileAgent
@@ -83,6 +92,57 @@ def get_metrics(db: Session = Depends(get_db), current_user: User = Depends(get_
     }
 
 
+@router.get("/llm-cache")
+def get_llm_cache_stats(current_user: User = Depends(get_current_user)):
+    from app.core.llm_cache import llm_cache
+    return llm_cache.stats()
+
+
+@router.delete("/llm-cache")
+def clear_llm_cache(current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only administrators can clear the LLM cache")
+    from app.core.llm_cache import llm_cache
+    llm_cache.clear()
+    return {"status": "cleared"}
+
+
+@router.get("/llm-health")
+def get_llm_health(current_user: User = Depends(get_current_user)):
+    from app.core.llm_client import llm_client
+    return llm_client.breaker.stats()
+
+
+@router.get("/llm-routes")
+def get_llm_routes(current_user: User = Depends(get_current_user)):
+    from app.core.model_router import model_router
+    return model_router.stats()
+
+
+@router.get("/structured-output")
+def get_structured_output_stats(current_user: User = Depends(get_current_user)):
+    from app.core.structured_output import structured_metrics
+    return structured_metrics.stats()
+
+
+@router.get("/events")
+def get_event_bus_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    from app.core.event_bus import event_bus
+    return event_bus.stats(db)
+
+
+@router.get("/code-sandbox")
+def get_code_sandbox_stats(current_user: User = Depends(get_current_user)):
+    from app.core.code_sandbox import code_sandbox
+    return code_sandbox.stats()
+
+
+@router.get("/pdf-renderer")
+def get_pdf_renderer_stats(current_user: User = Depends(get_current_user)):
+    from app.core.pdf_renderer import pdf_renderer
+    return pdf_renderer.stats()
+
+
 @router.get("/{agent_name}/status")
 def get_agent_status(agent_name: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     agent_statuses = {
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends
+from datetime import date, datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import and_, case, func
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.api.deps import get_current_user
+from app.agents import trends
+from app.core.snapshot_cache import dashboard_snapshots
 from app.models.user import User
 from app.models.fresher import Fresher, Skill
 from app.models.assessment import Submission
@@ -12,42 +16,53 @@ router = APIRouter(tags=["Analytics"])
 
 @router.get("/dashboard")
 def get_dashboard(manager_id: str = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    freshers = db.query(Fresher).all()
-    total = len(freshers)
-    at_risk = sum(1 for f in freshers if f.risk_level in ("high", "critical"))
-    completed = sum(1 for f in freshers if f.overall_progress >= 100)
-    avg_progress = sum(f.overall_progress for f in freshers) / total if total else 0
-    avg_risk = sum(f.risk_score for f in freshers) / total if total else 0
+    return dashboard_snapshots.get_or_build("dashboard", lambda: _build_dashboard(db))
 
+
+RISK_COLORS = (("low", "Low", "#10B981"), ("medium", "Medium", "#F59E0B"), ("high", "High", "#EF4444"), ("critical", "Critical", "#7C3AED"))
+
+
+def _build_dashboard(db: Session) -> dict:
+    """Assemble the manager dashboard from a fixed number of grouped queries."""
+    today = datetime.now(timezone.utc).date()
+    at_risk_expr = case((Fresher.risk_level.in_(("high", "critical")), 1), else_=0)
+    total, at_risk, completed, avg_progress, avg_risk = db.query(
+        func.count(Fresher.id),
+        func.coalesce(func.sum(at_risk_expr), 0),
+        func.coalesce(func.sum(case((Fresher.overall_progress >= 100, 1), else_=0)), 0),
+        func.coalesce(func.avg(Fresher.overall_progress), 0),
+        func.coalesce(func.avg(Fresher.risk_score), 0),
+    ).one()
+
+    risk_counts = dict(db.query(Fresher.risk_level, func.count(Fresher.id)).group_by(Fresher.risk_level).all())
     alerts = db.query(Alert).order_by(Alert.created_at.desc()).limit(10).all()
-    dept_stats = {}
-    for f in freshers:
-        user = db.query(User).filter(User.id == f.user_id).first()
-        dept = user.department or "General" if user else "General"
-        if dept not in dept_stats:
-            dept_stats[dept] = {"name": dept, "freshers": 0, "avg_progress": 0, "at_risk": 0, "total_progress": 0}
-        dept_stats[dept]["freshers"] += 1
-        dept_stats[dept]["total_progress"] += f.overall_progress
-        if f.risk_level in ("high", "critical"):
-            dept_stats[dept]["at_risk"] += 1
-
-    for d in dept_stats.values():
-        d["avg_progress"] = d["total_progress"] / d["freshers"] if d["freshers"] else 0
-        del d["total_progress"]
-
-    top_freshers = sorted(freshers, key=lambda f: f.overall_progress, reverse=True)[:5]
-    top_performers = []
-    for f in top_freshers:
-        user = db.query(User).filter(User.id == f.user_id).first()
-        if user:
-            top_performers.append({
-                "id": str(f.id),
-                "name": f"{user.first_name} {user.last_name}",
-                "progress": f.overall_progress,
-                "trend": "up",
-                "assessment_score": 85,
-                "department": user.department,
-            })
+
+    # Each fresher with their user and highest-level skill, in one query
+    top_skill = db.query(
+        Skill.fresher_id.label("fresher_id"),
+        Skill.name.label("name"),
+        func.row_number().over(partition_by=Skill.fresher_id, order_by=(Skill.level.desc(), Skill.id)).label("rn"),
+    ).subquery()
+    rows = (
+        db.query(Fresher, User, top_skill.c.name)
+        .outerjoin(User, User.id == Fresher.user_id)
+        .outerjoin(top_skill, and_(top_skill.c.fresher_id == Fresher.id, top_skill.c.rn == 1))
+        .order_by(Fresher.id)
+        .all()
+    )
+
+    top_performers = [
+        {
+            "id": str(f.id),
+            "name": f"{u.first_name} {u.last_name}",
+            "progress": f.overall_progress,
+            "trend": "up",
+            "assessment_score": 85,
+            "department": u.department,
+        }
+        for f, u, _ in sorted(rows, key=lambda r: r[0].overall_progress, reverse=True)[:5]
+        if u
+    ]
 
     return {
         "summary": {
@@ -59,18 +74,13 @@ def get_dashboard(manager_id: str = None, db: Session = Depends(get_db), current
             "average_risk_score": round(avg_risk, 1),
         },
         "alerts": [_alert_dict(a) for a in alerts],
-        "progress_trend": [
-            {"date": f"2026-02-{i:02d}", "avg_progress": 40 + i * 2, "completions": i}
-            for i in range(1, 15)
-        ],
+        "progress_trend": trends.trend_series(db, today - timedelta(days=13), today),
         "risk_distribution": [
-            {"name": "Low", "value": sum(1 for f in freshers if f.risk_level == "low"), "color": "#10B981"},
-            {"name": "Medium", "value": sum(1 for f in freshers if f.risk_level == "medium"), "color": "#F59E0B"},
-            {"name": "High", "value": sum(1 for f in freshers if f.risk_level == "high"), "color": "#EF4444"},
-            {"name": "Critical", "value": sum(1 for f in freshers if f.risk_level == "critical"), "color": "#7C3AED"},
+            {"name": name, "value": risk_counts.get(level, 0), "color": color}
+            for level, name, color in RISK_COLORS
         ],
         "top_performers": top_performers,
-        "department_stats": list(dept_stats.values()),
+        "department_stats": _department_stats(db, round_avg=False),
         "recent_activity": _build_recent_activity(db),
         "agent_metrics": {
             "onboarding_agent": {"name": "Onboarding Agent", "status": "active", "tasks_completed": 145, "tasks_pending": 3, "avg_latency_ms": 1200, "error_rate": 0.02, "last_active": "2026-02-14T10:00:00Z"},
@@ -84,6 +94,7 @@ def get_dashboard(manager_id: str = None, db: Session = Depends(get_db), current
                 "title": r.title,
                 "type": r.report_type,
                 "generated_at": str(r.generated_at) if r.generated_at else "",
+                "status": r.status or "ready",
             }
             for r in db.query(Report).order_by(Report.generated_at.desc()).limit(10).all()
         ],
@@ -96,14 +107,39 @@ def get_dashboard(manager_id: str = None, db: Session = Depends(get_db), current
                 "progress": f.overall_progress,
                 "riskLevel": f.risk_level,
                 "status": "at_risk" if f.risk_level in ("high", "critical") else ("completed" if f.overall_progress >= 100 else "active"),
-                "skill": (db.query(Skill).filter(Skill.fresher_id == f.id).order_by(Skill.level.desc()).first() or type('S', (), {'name': 'General'})).name,
+                "skill": skill_name or "General",
             }
-            for f in freshers
-            for u in [db.query(User).filter(User.id == f.user_id).first()]
+            for f, u, skill_name in rows
         ],
     }
 
 
+def _department_stats(db: Session, round_avg: bool = True) -> list:
+    """Fresher count, average progress and at-risk count per department in one grouped query."""
+    dept = func.coalesce(User.department, "General")
+    rows = (
+        db.query(
+            dept,
+            func.count(Fresher.id),
+            func.avg(Fresher.overall_progress),
+            func.sum(case((Fresher.risk_level.in_(("high", "critical")), 1), else_=0)),
+        )
+        .outerjoin(User, User.id == Fresher.user_id)
+        .group_by(dept)
+        .order_by(func.min(Fresher.id))
+        .all()
+    )
+    return [
+        {
+            "name": name,
+            "freshers": count,
+            "avg_progress": (round(avg or 0, 1) if round_avg else (avg or 0)),
+            "at_risk": at_risk or 0,
+        }
+        for name, count, avg, at_risk in rows
+    ]
+
+
 @router.get("/alerts")
 def get_alerts(status: str = None, level: str = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     query = db.query(Alert)
@@ -146,30 +182,36 @@ def get_cohort(cohort_type: str, cohort_value: str, db: Session = Depends(get_db
 
 
 @router.get("/trends")
-def get_trends(days: int = 30, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return [
-        {"date": f"2026-02-{i:02d}", "avg_progress": 35 + i * 1.5, "completions": i // 3}
-        for i in range(1, min(days + 1, 29))
-    ]
+def get_trends(
+    days: int = 30,
+    granularity: str = "day",
+    department: str = None,
+    cohort: str = None,
+    start: str = None,
+    end: str = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Daily or weekly trend series read from the rollup table.
+
+    The window is ``start``..``end`` (ISO dates) when given, else the last
+    ``days`` days. ``department`` and ``cohort`` (join month, YYYY-MM) narrow it.
+    """
+    if granularity not in trends.GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(trends.GRANULARITIES)}")
+    try:
+        end_day = date.fromisoformat(end) if end else datetime.now(timezone.utc).date()
+        start_day = date.fromisoformat(start) if start else end_day - timedelta(days=max(days, 1) - 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be ISO dates (YYYY-MM-DD)")
+    if start_day > end_day:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    return trends.trend_series(db, start_day, end_day, granularity, department=department, cohort=cohort)
 
 
 @router.get("/departments")
 def get_department_stats(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    freshers = db.query(Fresher).all()
-    dept_stats = {}
-    for f in freshers:
-        user = db.query(User).filter(User.id == f.user_id).first()
-        dept = user.department or "General" if user else "General"
-        if dept not in dept_stats:
-            dept_stats[dept] = {"name": dept, "freshers": 0, "avg_progress": 0, "at_risk": 0, "total_progress": 0}
-        dept_stats[dept]["freshers"] += 1
-        dept_stats[dept]["total_progress"] += f.overall_progress
-        if f.risk_level in ("high", "critical"):
-            dept_stats[dept]["at_risk"] += 1
-    for d in dept_stats.values():
-        d["avg_progress"] = round(d["total_progress"] / d["freshers"], 1) if d["freshers"] else 0
-        del d["total_progress"]
-    return list(dept_stats.values())
+    return dashboard_snapshots.get_or_build("departments", lambda: _department_stats(db))
 
 
 def _alert_dict(a: Alert) -> dict:
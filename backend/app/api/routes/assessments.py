@@ -1,10 +1,9 @@
 import json
-import random
-from datetime import date
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.api.deps import get_current_user
+from app.core.assessment_cache import compiled_assessments
 from app.models.user import User
 from app.models.assessment import Assessment, Submission
 
@@ -197,26 +196,7 @@ def get_latest_result(assessment_id: str, db: Session = Depends(get_db), current
 
 
 def _assessment_detail(a: Assessment) -> dict:
-    def _parse_json(val):
-        if not val:
-            return []
-        try:
-            return json.loads(val)
-        except Exception:
-            return []
-
-    def _select_daily_questions(questions: list, count: int, assessment_id: int):
-        if not questions:
-            return []
-        if len(questions) <= count:
-            return questions
-        day_seed = int(date.today().strftime("%Y%m%d")) + int(assessment_id)
-        rng = random.Random(day_seed)
-        return rng.sample(questions, count)
-
-    questions = _parse_json(a.questions)
-    if a.assessment_type == "quiz":
-        questions = _select_daily_questions(questions, 5, a.id)
+    compiled = compiled_assessments.get(a)
 
     return {
         "id": a.id,
@@ -230,11 +210,11 @@ def _assessment_detail(a: Assessment) -> dict:
         "instructions": a.instructions,
         "module_id": a.module_id,
         "weight": a.weight,
-        "rubric": _parse_json(a.rubric) if a.rubric else {},
+        "rubric": compiled.rubric,
         "starter_code": a.starter_code,
-        "test_cases": _parse_json(a.test_cases),
-        "questions": questions,
-        "skills_assessed": _parse_json(a.skills_assessed),
+        "test_cases": compiled.test_cases,
+        "questions": compiled.daily_questions(5),
+        "skills_assessed": compiled.skills_assessed,
         "language": a.language,
         "is_active": a.is_active,
         "is_published": a.is_published,
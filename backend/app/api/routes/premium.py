@@ -1,5 +1,7 @@
 """API routes for badges, scheduling, analytics, and reports."""
-from fastapi import APIRouter, Depends, HTTPException, Response
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.api.deps import get_db, get_current_user
 from app.models.badge import Badge, FresherBadge
@@ -7,8 +9,11 @@ from app.models.schedule_assessment import AssessmentSchedule
 from app.models.analytics import PerformanceAnalytics
 from app.models.fresher import Fresher
 from app.models.assessment import Submission, Assessment
+from app.models.user import User
+from app.core.cohort_stats import CohortStats
 from app.utils.feedback_generator import feedback_generator
-from app.utils.pdf_generator_v2 import pdf_generator
+from app.utils.zip_stream import iter_zip
+from app.core.pdf_renderer import PERFORMANCE, SUBMISSION, pdf_renderer
 from datetime import datetime, timedelta
 import json
 
@@ -235,37 +240,37 @@ def get_fresher_analytics(fresher_id: int, db: Session = Depends(get_db)):
 
 @router.get("/analytics/cohort-comparison")
 def get_cohort_comparison(db: Session = Depends(get_db)):
-    """Get fresher comparison dashboard data."""
-    analytics_list = db.query(PerformanceAnalytics).all()
-    
-    freshers_data = []
-    for analytics in analytics_list:
-        fresher = db.query(Fresher).get(analytics.fresher_id)
-        if fresher and fresher.user_id:
-            user = fresher.user_id  # Simplified for brevity
-            freshers_data.append({
-                "fresher_id": analytics.fresher_id,
-                "fresher_name": f"Fresher {analytics.fresher_id}",
-                "overall_score": analytics.overall_score,
-                "pass_rate": analytics.pass_rate,
-                "engagement_score": analytics.engagement_score,
-                "risk_level": analytics.risk_level,
-                "assessments_completed": analytics.assessment_count,
-                "cohort_percentile": analytics.cohort_percentile,
-            })
-    
-    # Sort by overall score
-    freshers_data.sort(key=lambda x: x['overall_score'], reverse=True)
-    
-    # Add rank
-    for idx, fresher in enumerate(freshers_data, 1):
-        fresher['cohort_rank'] = idx
-    
-    cohort_avg = sum(f['overall_score'] for f in freshers_data) / len(freshers_data) if freshers_data else 0
+    """Get fresher comparison dashboard data (ranks are precomputed by the cohort rank pass)."""
+    rows = db.query(PerformanceAnalytics).join(
+        Fresher, Fresher.id == PerformanceAnalytics.fresher_id
+    ).filter(Fresher.user_id != None).all()
+    
+    cohort = CohortStats.from_records(rows, columns={"score": lambda a: a.overall_score})
+    zscores = cohort.zscores("score")
+    freshers_data = [
+        {
+            "fresher_id": analytics.fresher_id,
+            "fresher_name": f"Fresher {analytics.fresher_id}",
+            "overall_score": analytics.overall_score,
+            "pass_rate": analytics.pass_rate,
+            "engagement_score": analytics.engagement_score,
+            "risk_level": analytics.risk_level,
+            "assessments_completed": analytics.assessment_count,
+            "cohort_rank": analytics.cohort_rank,
+            "cohort_percentile": analytics.cohort_percentile,
+            "score_zscore": round(float(z), 2),
+        }
+        for analytics, z in zip(rows, zscores)
+    ]
+    
+    # Rows not ranked yet sort after ranked ones, by score
+    freshers_data.sort(key=lambda x: (x['cohort_rank'] is None, x['cohort_rank'] or 0, -(x['overall_score'] or 0)))
     
     return {
-        "total_freshers": len(freshers_data),
-        "cohort_average_score": cohort_avg,
+        "total_freshers": cohort.size,
+        "cohort_average_score": cohort.mean("score"),
+        "score_percentiles": cohort.percentiles("score"),
+        "score_distribution": cohort.histogram("score"),
         "freshers": freshers_data
     }
 
@@ -277,46 +282,16 @@ def update_fresher_analytics(fresher_id: int, db: Session = Depends(get_db)):
     if not fresher:
         raise HTTPException(status_code=404, detail="Fresher not found")
     
-    # Get all submissions for this fresher
-    submissions = db.query(Submission).filter(Submission.user_id == fresher.user_id).all()
-    
-    if not submissions:
-        return {"status": "no_submissions"}
-    
-    # Calculate metrics
-    total_score = sum(s.score for s in submissions)
-    avg_score = total_score / len(submissions) if submissions else 0
-    
-    quiz_subs = [s for s in submissions if s.submission_type == 'quiz']
-    quiz_avg = sum(s.score for s in quiz_subs) / len(quiz_subs) if quiz_subs else 0
-    
-    passed = sum(1 for s in submissions if s.pass_status == 'pass')
-    pass_rate = (passed / len(submissions) * 100) if submissions else 0
-    
-    # Update or create analytics
-    analytics = db.query(PerformanceAnalytics).filter(
-        PerformanceAnalytics.fresher_id == fresher_id
-    ).first()
-    
+    from app.agents.analytics_agent import AnalyticsAgent
+    analytics = AnalyticsAgent().update_performance_analytics(db, fresher)
     if not analytics:
-        analytics = PerformanceAnalytics(fresher_id=fresher_id)
-    
-    analytics.overall_score = avg_score
-    analytics.quiz_average = quiz_avg
-    analytics.assessment_count = len(submissions)
-    analytics.passed_count = passed
-    analytics.failed_count = len(submissions) - passed
-    analytics.pass_rate = pass_rate
-    analytics.updated_at = datetime.utcnow()
-    
-    db.add(analytics)
-    db.commit()
+        return {"status": "no_submissions"}
     
     return {
         "status": "analytics_updated",
         "fresher_id": fresher_id,
-        "overall_score": avg_score,
-        "pass_rate": pass_rate,
+        "overall_score": analytics.overall_score,
+        "pass_rate": analytics.pass_rate,
     }
 
 
@@ -335,22 +310,10 @@ def export_submission_pdf(submission_id: int, db: Session = Depends(get_db)):
     if not assessment or not fresher:
         raise HTTPException(status_code=404, detail="Related data not found")
     
-    submission_data = {
-        "score": submission.score,
-        "max_score": submission.max_score,
-        "passing_score": submission.passing_score,
-        "type": submission.submission_type,
-        "feedback": submission.feedback,
-    }
-    
-    pdf_buffer = pdf_generator.generate_submission_pdf(
-        submission_data,
-        fresher_name=f"Fresher {fresher.id}",
-        assessment_title=assessment.title
-    )
+    pdf_bytes = pdf_renderer.render(SUBMISSION, _submission_pdf_payload(submission, assessment, fresher))
     
     return Response(
-        content=pdf_buffer.getvalue(),
+        content=pdf_bytes,
         media_type="application/pdf",
         headers={"Content-Disposition": "attachment; filename=submission_report.pdf"}
     )
@@ -370,31 +333,171 @@ def export_performance_report_pdf(fresher_id: int, db: Session = Depends(get_db)
     if not analytics:
         raise HTTPException(status_code=404, detail="Analytics not found")
     
-    fresher_data = {
-        "name": f"Fresher {fresher_id}",
-        "employee_id": fresher.employee_id,
-    }
-    
-    analytics_data = {
-        "overall_score": analytics.overall_score,
-        "quiz_average": analytics.quiz_average,
-        "pass_rate": analytics.pass_rate,
-        "assessment_count": analytics.assessment_count,
-        "risk_level": analytics.risk_level,
-        "engagement_score": analytics.engagement_score,
-        "cohort_percentile": analytics.cohort_percentile,
-        "skills_breakdown": analytics.skills_breakdown or {},
-    }
-    
-    pdf_buffer = pdf_generator.generate_performance_report_pdf(fresher_data, analytics_data)
+    pdf_bytes = pdf_renderer.render(PERFORMANCE, _performance_pdf_payload(fresher, analytics))
     
     return Response(
-        content=pdf_buffer.getvalue(),
+        content=pdf_bytes,
         media_type="application/pdf",
         headers={"Content-Disposition": "attachment; filename=performance_report.pdf"}
     )
 
 
+@router.get("/exports/performance-reports")
+def export_performance_reports_zip(
+    department: Optional[str] = None,
+    cohort: Optional[str] = Query(None, description="Join month, YYYY-MM"),
+    include_submissions: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Export performance PDFs (and optionally submission PDFs) for many freshers as one ZIP.
+
+    Only ids are fetched up front; rows are loaded in chunks as the stream
+    needs them, PDFs are rendered in parallel by the PDF worker pool and each
+    is written into the archive as it finishes, so memory stays flat however
+    many freshers match. PDFs that fail to render are listed in ``errors.txt``
+    at the end of the archive instead of aborting the download.
+    """
+    query = db.query(Fresher.id).join(User, User.id == Fresher.user_id).join(
+        PerformanceAnalytics, PerformanceAnalytics.fresher_id == Fresher.id
+    )
+    if department:
+        query = query.filter(User.department == department)
+    if cohort:
+        query = query.filter(Fresher.join_date.like(f"{cohort}%"))
+    fresher_ids = [fresher_id for fresher_id, in query.order_by(Fresher.id)]
+    if not fresher_ids:
+        raise HTTPException(status_code=404, detail="No freshers with analytics match the filter")
+
+    submission_ids = []
+    if include_submissions:
+        submission_ids = [submission_id for submission_id, in db.query(Submission.id).join(
+            Fresher, Fresher.user_id == Submission.user_id
+        ).filter(
+            Fresher.id.in_(fresher_ids), Submission.status == "completed"
+        ).order_by(Submission.user_id, Submission.id)]
+    # get_db teardown only runs after the stream ends; hand the connection back now
+    db.close()
+
+    label = "_".join(_safe_name(part) for part in (department, cohort) if part) or "all"
+    total = len(fresher_ids) + len(submission_ids)
+    print(f"[Export] Streaming {total} PDFs for {len(fresher_ids)} freshers ({label})")
+    return StreamingResponse(
+        iter_zip(_export_entries(fresher_ids, submission_ids)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=performance_reports_{label}.zip"},
+    )
+
+
+EXPORT_CHUNK_SIZE = 100
+
+
+def _export_jobs(fresher_ids: list, submission_ids: list, names: dict):
+    """Yield ``(kind, payload)`` render jobs, loading rows a chunk at a time.
+
+    Each chunk uses its own short-lived session, closed before its jobs are
+    yielded, so no connection is held while PDFs render. ``names`` is filled
+    with each job's archive path, keyed by job index.
+    """
+    from app.database import SessionLocal
+    index = 0
+    for start in range(0, len(fresher_ids), EXPORT_CHUNK_SIZE):
+        db = SessionLocal()
+        try:
+            rows = db.query(Fresher, PerformanceAnalytics).join(
+                PerformanceAnalytics, PerformanceAnalytics.fresher_id == Fresher.id
+            ).filter(Fresher.id.in_(fresher_ids[start:start + EXPORT_CHUNK_SIZE])).order_by(Fresher.id).all()
+            chunk = [(_fresher_folder(fresher), _performance_pdf_payload(fresher, analytics)) for fresher, analytics in rows]
+        finally:
+            db.close()
+        for folder, payload in chunk:
+            names[index] = f"{folder}/performance_report.pdf"
+            index += 1
+            yield PERFORMANCE, payload
+
+    for start in range(0, len(submission_ids), EXPORT_CHUNK_SIZE):
+        db = SessionLocal()
+        try:
+            rows = db.query(Submission, Assessment, Fresher).join(
+                Assessment, Assessment.id == Submission.assessment_id
+            ).join(Fresher, Fresher.user_id == Submission.user_id).filter(
+                Submission.id.in_(submission_ids[start:start + EXPORT_CHUNK_SIZE])
+            ).order_by(Submission.user_id, Submission.id).all()
+            chunk = [
+                (_fresher_folder(fresher), submission.id, _submission_pdf_payload(submission, assessment, fresher))
+                for submission, assessment, fresher in rows
+            ]
+        finally:
+            db.close()
+        for folder, submission_id, payload in chunk:
+            names[index] = f"{folder}/submissions/submission_{submission_id}.pdf"
+            index += 1
+            yield SUBMISSION, payload
+
+
+def _export_entries(fresher_ids: list, submission_ids: list):
+    """``(name, pdf)`` archive entries, ending with ``errors.txt`` if anything failed."""
+    names, errors = {}, []
+    try:
+        for index, result in pdf_renderer.render_iter(_export_jobs(fresher_ids, submission_ids, names), return_exceptions=True):
+            name = names.pop(index)
+            if isinstance(result, Exception):
+                print(f"[Export] ✗ {name}: {result!r}")
+                errors.append(f"{name}: {result!r}")
+                continue
+            yield name, result
+    except Exception as e:
+        # Loading the next chunk failed; keep what was already written
+        print(f"[Export] ✗ Export stopped early: {e!r}")
+        errors.append(f"Export stopped early, remaining PDFs were skipped: {e!r}")
+    if errors:
+        yield "errors.txt", ("\n".join(errors) + "\n").encode("utf-8")
+
+
+def _fresher_folder(fresher: Fresher) -> str:
+    return _safe_name(fresher.employee_id or f"fresher_{fresher.id}")
+
+
+def _safe_name(value: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in str(value))
+
+
+def _submission_pdf_payload(submission: Submission, assessment: Assessment, fresher: Fresher) -> dict:
+    return {
+        "submission_data": {
+            "score": submission.score,
+            "max_score": submission.max_score,
+            "passing_score": submission.passing_score,
+            "type": submission.submission_type,
+            "feedback": submission.feedback,
+        },
+        "fresher_name": f"Fresher {fresher.id}",
+        "assessment_title": assessment.title,
+    }
+
+
+def _performance_pdf_payload(fresher: Fresher, analytics: PerformanceAnalytics) -> dict:
+    return {
+        "fresher_data": {
+            "name": f"Fresher {fresher.id}",
+            "employee_id": fresher.employee_id,
+        },
+        "analytics_data": {
+            "overall_score": analytics.overall_score,
+            "quiz_average": analytics.quiz_average,
+            "pass_rate": analytics.pass_rate,
+            "assessment_count": analytics.assessment_count,
+            "risk_level": analytics.risk_level,
+            "engagement_score": analytics.engagement_score,
+            "cohort_percentile": analytics.cohort_percentile or 0,
+            "cohort_rank": analytics.cohort_rank,
+            "skills_breakdown": analytics.skills_breakdown or {},
+            "score_trend": analytics.score_trend or {},
+            "improvement_rate": analytics.improvement_rate,
+        },
+    }
+
+
 # ============= FEEDBACK ROUTES =============
 
 @router.post("/submissions/{submission_id}/ai-feedback")
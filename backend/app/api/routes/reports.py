@@ -1,7 +1,10 @@
 import json
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import SessionLocal, get_db
+from app.core.job_queue import report_queue
+from app.core.report_artifacts import file_download, report_artifacts, report_data
 from app.api.deps import get_current_user
 from app.models.user import User
 from app.models.report import Report
@@ -10,22 +13,96 @@ from app.core.security import decode_access_token
 router = APIRouter(tags=["Reports"])
 
 
-@router.post("/generate/{report_type}")
+@router.post("/generate/{report_type}", status_code=202)
 def generate_report(report_type: str, filters: dict = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    print(f"[DEBUG] Generating report: type={report_type}, user={current_user.id}, filters={filters}")
+    """Queue a report; poll GET /reports/{id}/status until it is ready, then download it."""
+    return _queue_report(db, report_type, current_user.id, filters)
+
+
+def _job_id(report_id: int) -> str:
+    return f"report-{report_id}"
+
+
+def _queue_report(db: Session, report_type: str, user_id: int = None, filters: dict = None) -> dict:
+    report = Report(
+        title=f"{report_type.replace('_', ' ').title()} Report",
+        report_type=report_type,
+        format="pdf",
+        generated_by=user_id,
+        status="queued",
+        progress=0,
+        params=json.dumps({"report_type": report_type, "user_id": user_id, "filters": filters}),
+    )
+    db.add(report)
+    db.commit()
+    db.refresh(report)
+    report_queue.submit(_job_id(report.id), _run_report_job, report.id)
+    return _report_dict(report)
+
+
+def _run_report_job(report_id: int):
+    """Generate one queued report on a report worker, with its own DB session."""
+    from app.agents.notifications import publish_report_generated
     from app.agents.reporting_agent import ReportingAgent
-    agent = ReportingAgent()
+    db = SessionLocal()
+    job_id = _job_id(report_id)
     try:
-        result = agent.generate_report(db, report_type, current_user.id, filters)
-        print(f"[DEBUG] Report generated successfully: id={result.get('id')}")
-        return result
-    except Exception as e:
-        print(f"[DEBUG] Report generation failed: {str(e)}")
-        import traceback
-        with open("last_error.txt", "w") as f:
-            traceback.print_exc(file=f)
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+        report = db.query(Report).filter(Report.id == report_id).first()
+        if not report or report.status not in ("queued", "running"):
+            return
+        params = json.loads(report.params or "{}")
+        report.status = "running"
+        report.error = None
+        db.commit()
+
+        def on_progress(percent: int, stage: str):
+            report_queue.set_progress(job_id, percent, stage)
+            report.progress = percent
+            db.commit()
+
+        try:
+            ReportingAgent().generate_report(
+                db,
+                params.get("report_type", report.report_type),
+                params.get("user_id"),
+                params.get("filters"),
+                report=report,
+                on_progress=on_progress,
+            )
+        except Exception as e:
+            db.rollback()
+            report.status = "failed"
+            report.error = str(e)[:1000]
+            report.completed_at = datetime.now(timezone.utc)
+            db.commit()
+            raise
+        if report.format == "pdf":
+            # Render once now; a failure here only defers rendering to the first download
+            try:
+                report_artifacts.ensure_pdf(report)
+            except Exception as e:
+                print(f"[REPORTS] PDF pre-render failed for report {report_id}: {e}")
+        report.status = "ready"
+        report.progress = 100
+        report.completed_at = datetime.now(timezone.utc)
+        # Queue the n8n email in the same commit that makes the report downloadable
+        publish_report_generated(db, report, report_data(report))
+        print(f"[REPORTS] ✅ Report {report_id} ready: {report.title}")
+    finally:
+        db.close()
+
+
+def resume_pending_reports():
+    """Re-queue reports left queued or running by a previous process (called on startup)."""
+    db = SessionLocal()
+    try:
+        pending = db.query(Report.id).filter(Report.status.in_(("queued", "running"))).order_by(Report.id).all()
+    finally:
+        db.close()
+    for (report_id,) in pending:
+        report_queue.submit(_job_id(report_id), _run_report_job, report_id)
+    if pending:
+        print(f"[REPORTS] Re-queued {len(pending)} unfinished report(s)")
 
 
 @router.post("/individual")
@@ -54,38 +131,20 @@ def generate_individual(data: dict, db: Session = Depends(get_db), current_user:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/department")
+@router.post("/department", status_code=202)
 def generate_department(data: dict, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     department = data.get("department")
     if not department:
         raise HTTPException(status_code=400, detail="department is required")
-    from app.agents.reporting_agent import ReportingAgent
-    agent = ReportingAgent()
-    try:
-        result = agent.generate_report(db, f"department_{department}", current_user.id)
-        return result
-    except Exception as e:
-        print(f"[ERROR] Department report generation failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+    return _queue_report(db, f"department_{department}", current_user.id)
 
 
-@router.post("/cohort")
+@router.post("/cohort", status_code=202)
 def generate_cohort(data: dict, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     cohort_id = data.get("cohort_id")
     if not cohort_id:
         raise HTTPException(status_code=400, detail="cohort_id is required")
-    from app.agents.reporting_agent import ReportingAgent
-    agent = ReportingAgent()
-    try:
-        result = agent.generate_report(db, f"cohort_{cohort_id}", current_user.id)
-        return result
-    except Exception as e:
-        print(f"[ERROR] Cohort report generation failed: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+    return _queue_report(db, f"cohort_{cohort_id}", current_user.id)
 
 
 @router.get("")
@@ -94,9 +153,51 @@ def list_reports(db: Session = Depends(get_db), current_user: User = Depends(get
     return [_report_dict(r) for r in reports]
 
 
+@router.get("/webhooks")
+def list_webhook_deliveries(
+    status: str = Query(None, description="pending, done or failed"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Delivery state of report notifications to n8n, newest first."""
+    from app.agents.notifications import N8N_SUBSCRIBER, REPORT_GENERATED
+    from app.models.event import OutboxDelivery, OutboxEvent
+    query = db.query(OutboxEvent, OutboxDelivery).join(OutboxDelivery, OutboxDelivery.event_id == OutboxEvent.id).filter(
+        OutboxEvent.event_type == REPORT_GENERATED, OutboxDelivery.subscriber == N8N_SUBSCRIBER
+    )
+    if status:
+        query = query.filter(OutboxDelivery.status == status)
+    deliveries = []
+    for event, delivery in query.order_by(OutboxEvent.id.desc()).limit(limit).all():
+        deliveries.append({
+            "report_id": str(json.loads(event.payload).get("report_id")),
+            "status": delivery.status,
+            "attempts": delivery.attempts or 0,
+            "last_error": delivery.last_error,
+            "next_attempt_at": str(delivery.next_attempt_at) if delivery.next_attempt_at else None,
+            "completed_at": str(delivery.completed_at) if delivery.completed_at else None,
+            "queued_at": str(event.created_at),
+        })
+    return deliveries
+
+
+@router.get("/{report_id}/status")
+def report_status(report_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    report = db.query(Report).filter(Report.id == report_id).first()
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    result = _report_dict(report)
+    job = report_queue.status(_job_id(report.id))
+    if job and report.status in ("queued", "running") and job["state"] in ("queued", "running"):
+        result.update(status=job["state"], stage=job["stage"], progress=job["progress"], queue_position=job["queue_position"])
+    return result
+
+
 @router.get("/{report_id}/download")
 def download_report(
     report_id: str,
+    request: Request,
     token: str = Query(None, description="JWT token (alternative to Authorization header for browser downloads)"),
     db: Session = Depends(get_db),
 ):
@@ -121,10 +222,10 @@ def download_report(
         # but we let FastAPI/the deps handle that naturally
         raise HTTPException(status_code=401, detail="Token required. Pass ?token=<jwt> or Authorization header.")
     
-    return _do_download(report_id, db)
+    return _do_download(report_id, db, request)
 
 
-def _do_download(report_id: str, db: Session):
+def _do_download(report_id: str, db: Session, request: Request):
     """Shared logic for report PDF download."""
     try:
         print(f"[DEBUG] Download request for report {report_id}")
@@ -133,39 +234,28 @@ def _do_download(report_id: str, db: Session):
 
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
+        if report.status in ("queued", "running"):
+            raise HTTPException(status_code=409, detail="Report is still being generated")
+        if report.status == "failed":
+            raise HTTPException(status_code=409, detail=f"Report generation failed: {report.error}")
         if not report.content:
             raise HTTPException(status_code=404, detail="Report generation in progress or content empty")
 
-        from fastapi.responses import JSONResponse, Response
-
-        # Parse content safely
-        try:
-            report_data = json.loads(report.content) if isinstance(report.content, str) else report.content
-            if not isinstance(report_data, dict):
-                report_data = {"summary": str(report_data)}
-        except Exception as e:
-            print(f"[ERROR] JSON parse error for report {report_id}: {e}")
-            report_data = {"summary": "Error parsing report content."}
+        from fastapi.responses import JSONResponse
 
         # Clean title for filename
         safe_title = "".join(c for c in report.title if c.isalnum() or c in (' ', '_')).rstrip()
         safe_title = safe_title.replace(' ', '_').lower()
 
         if report.format == "pdf":
-            from app.utils.pdf_generator import generate_pdf_report
-            print(f"[DEBUG] Generating PDF for report {report_id}: {report.title}")
-            pdf_bytes = generate_pdf_report(report.title, report_data)
-            print(f"[DEBUG] PDF generated, size: {len(pdf_bytes) if pdf_bytes else 0} bytes")
+            # Rendered once per content hash; repeat downloads stream the stored file
+            path, digest = report_artifacts.ensure_pdf(report)
             filename = f"{safe_title}_{report_id}.pdf"
-            return Response(
-                content=bytes(pdf_bytes),
-                media_type="application/pdf",
-                headers={"Content-Disposition": f"attachment; filename={filename}"}
-            )
+            return file_download(path, digest, filename, request.headers)
 
         filename = f"{safe_title}_{report_id}.json"
         return JSONResponse(
-            content=report_data,
+            content=report_data(report),
             headers={"Content-Disposition": f"attachment; filename={filename}"}
         )
     except HTTPException:
@@ -184,5 +274,9 @@ def _report_dict(r: Report) -> dict:
         "type": r.report_type,
         "format": r.format,
         "generated_at": str(r.generated_at) if r.generated_at else "",
+        "status": r.status or "ready",
+        "progress": 100 if r.status in (None, "ready") else (r.progress or 0),
+        "error": r.error,
+        "status_url": f"/api/v1/reports/{r.id}/status",
         "download_url": f"/api/v1/reports/{r.id}/download",
     }
@@ -1,4 +1,4 @@
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
@@ -80,8 +80,13 @@ def complete_item(item_id: str, db: Session = Depends(get_db), current_user: Use
     item = db.query(ScheduleItem).filter(ScheduleItem.id == int(item_id)).first()
     if not item:
         raise HTTPException(status_code=404, detail="Schedule item not found")
-    item.status = "completed"
-    db.commit()
+    if item.status != "completed":
+        from app.agents.trends import publish_schedule_item_completed
+        schedule = db.query(Schedule).filter(Schedule.id == item.schedule_id).first()
+        item.status = "completed"
+        item.completed_at = datetime.now(timezone.utc)
+        db.commit()
+        publish_schedule_item_completed(db, item, schedule.fresher_id)
     return {"status": "completed"}
 
 
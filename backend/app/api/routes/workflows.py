@@ -2,9 +2,14 @@ import json
 import uuid
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.api.deps import get_current_user
+from app.database import get_db, SessionLocal
+from app.config import settings
+from app.core.job_queue import grading_queue, feedback_queue
+from app.core.event_stream import grading_streams, format_sse
+from app.agents.post_grading import publish_submission_graded
+from app.api.deps import get_current_user, get_current_user_or_query_token
 from app.models.user import User
 from app.models.assessment import Assessment, Submission
 
@@ -47,66 +52,261 @@ def submit_workflow(data: dict, db: Session = Depends(get_db), current_user: Use
 
     print(f"[SUBMIT] Created submission ID: {sub.id}, trace_id: {trace_id}, initial status: {sub.status}")
 
-    # Run grading synchronously with specialized HR-focused evaluators
+    # Grading runs on the bounded grading worker pool; the client polls /status/{trace_id}
+    # or follows /stream/{trace_id}
+    grading_streams.open(trace_id)
+    grading_queue.submit(trace_id, _run_grading_job, sub.id)
+
+    response = {
+        "submission_id": str(sub.id),
+        "trace_id": trace_id,
+        "status": sub.status,
+        "queue": _queue_info(trace_id),
+    }
+    print(f"[SUBMIT] Returning response: {response}")
+    return response
+
+
+def _select_evaluator(assessment: Assessment):
+    """Pick the specialized HR-focused evaluator for an assessment type."""
     # Only quiz and assignment types supported (code challenges removed)
+    if assessment.assessment_type == "quiz":
+        from app.agents.quiz_evaluator_agent import QuizEvaluatorAgent
+        return QuizEvaluatorAgent()
+    if assessment.assessment_type == "assignment":
+        from app.agents.assignment_evaluator_agent import AssignmentEvaluatorAgent
+        return AssignmentEvaluatorAgent()
+    # Fallback to generic agent for unknown types
+    from app.agents.assessment_agent import AssessmentAgent
+    return AssessmentAgent()
+
+
+def _run_grading_job(submission_id: int):
+    """Grade one submission on a grading worker, with its own DB session."""
+    db = SessionLocal()
     try:
-        # Select appropriate evaluator based on assessment type
-        if assessment.assessment_type == "quiz":
-            from app.agents.quiz_evaluator_agent import QuizEvaluatorAgent
-            agent = QuizEvaluatorAgent()
-            print(f"[SUBMIT] Starting QUIZ evaluation for submission {sub.id} with HR assessment framework...")
-        elif assessment.assessment_type == "assignment":
-            from app.agents.assignment_evaluator_agent import AssignmentEvaluatorAgent
-            agent = AssignmentEvaluatorAgent()
-            print(f"[SUBMIT] Starting ASSIGNMENT evaluation for submission {sub.id} with professional document assessment...")
-        else:
-            # Fallback to generic agent for unknown types
-            from app.agents.assessment_agent import AssessmentAgent
-            agent = AssessmentAgent()
-            print(f"[SUBMIT] Starting grading for submission {sub.id} with generic agent (type: {assessment.assessment_type})...")
-        
-        result = agent.evaluate(db, sub, assessment)
-        
-        # Refresh submission to get updated status
-        db.refresh(sub)
-        
-        print(f"[SUBMIT] ✅ Grading complete!")
-        print(f"[SUBMIT]   - Score: {sub.score}/{sub.max_score}")
-        print(f"[SUBMIT]   - Pass Status: {sub.pass_status}")
-        print(f"[SUBMIT]   - Status: {sub.status}")
-        print(f"[SUBMIT]   - Feedback length: {len(sub.feedback) if sub.feedback else 0} chars")
+        sub = db.query(Submission).filter(Submission.id == submission_id).first()
+        if not sub:
+            print(f"[GRADER ERROR] Submission {submission_id} vanished before grading")
+            return
+        trace_id = sub.trace_id
+        grading_streams.open(trace_id)
+        graded = None
+
+        def emit(event, data=None):
+            grading_streams.publish(trace_id, event, data)
 
-        # Automatically update Fresher Profile
         try:
-            from app.models.fresher import Fresher
-            from app.agents.profile_agent import ProfileAgent
-            
-            fresher = db.query(Fresher).filter(Fresher.user_id == current_user.id).first()
-            if fresher and sub.status == "completed":
-                print(f"[SUBMIT] Updating profile for fresher strategy...")
-                profile_agent = ProfileAgent()
-                profile_agent.update_after_assessment(db, fresher, sub)
-                print(f"[SUBMIT] ✅ Profile updated successfully (Skills & Progress)")
-        except Exception as pe:
-            print(f"[SUBMIT WARNING] Profile update failed: {pe}")
-            # Don't fail the whole request just because profile update failed
+            assessment = db.query(Assessment).filter(Assessment.id == sub.assessment_id).first()
+            if not assessment:
+                raise ValueError(f"Assessment {sub.assessment_id} not found")
 
-    except Exception as e:
-        print(f"[SUBMIT ERROR] Grading failed: {e}")
-        import traceback
-        traceback.print_exc()
-        sub.status = "failed"
-        sub.feedback = json.dumps({"error": str(e)})
-        db.commit()
-        db.refresh(sub)
+            agent = _select_evaluator(assessment)
+            print(f"[GRADER] Starting {type(agent).__name__} for submission {sub.id} (type: {assessment.assessment_type})...")
+            grading_queue.set_progress(trace_id, 10, "evaluating")
+            emit("status", {"status": "grading", "stage": "evaluating"})
 
-    response = {
+            # Two-phase: commit the deterministic score now, queue LLM feedback separately
+            two_phase = settings.GRADING_TWO_PHASE and hasattr(agent, "attach_feedback")
+            if two_phase:
+                graded = agent.score(db, sub, assessment, emit=emit)
+            else:
+                agent.evaluate(db, sub, assessment, emit=emit)
+            db.refresh(sub)
+
+            print(f"[GRADER] ✅ Grading complete for submission {sub.id}!")
+            print(f"[GRADER]   - Score: {sub.score}/{sub.max_score}")
+            print(f"[GRADER]   - Pass Status: {sub.pass_status}")
+            print(f"[GRADER]   - Status: {sub.status}")
+            print(f"[GRADER]   - Feedback length: {len(sub.feedback) if sub.feedback else 0} chars")
+            grading_queue.set_progress(trace_id, 80, "publishing")
+
+            # Skills, badges, analytics and risk are updated by event subscribers
+            try:
+                if publish_submission_graded(db, sub):
+                    print(f"[GRADER] ✅ Published submission.graded for submission {sub.id}")
+            except Exception as pe:
+                db.rollback()
+                print(f"[GRADER WARNING] Publishing submission.graded failed: {pe}")
+                # Don't fail the grade just because the event could not be recorded
+
+        except Exception as e:
+            print(f"[GRADER ERROR] Grading failed: {e}")
+            import traceback
+            traceback.print_exc()
+            db.rollback()
+            sub.status = "failed"
+            sub.feedback = json.dumps({"error": str(e)})
+            sub.feedback_status = None
+            db.commit()
+
+        if sub.feedback_status == "pending":
+            # The feedback job finishes the live stream
+            emit("status", {"status": sub.status, "stage": "feedback"})
+            feedback_queue.submit(trace_id, _run_feedback_job, sub.id, graded)
+            return
+        emit("done", {"status": sub.status, "feedback_status": sub.feedback_status, "state": _submission_state(sub)})
+        grading_streams.close(trace_id)
+    finally:
+        db.close()
+
+
+def _run_feedback_job(submission_id: int, graded: dict = None):
+    """Phase two of two-phase grading: attach LLM feedback to a scored submission."""
+    db = SessionLocal()
+    try:
+        sub = db.query(Submission).filter(Submission.id == submission_id).first()
+        if not sub or sub.feedback_status != "pending":
+            return
+        trace_id = sub.trace_id
+        grading_streams.open(trace_id)
+
+        def emit(event, data=None):
+            grading_streams.publish(trace_id, event, data)
+
+        try:
+            assessment = db.query(Assessment).filter(Assessment.id == sub.assessment_id).first()
+            if not assessment:
+                raise ValueError(f"Assessment {sub.assessment_id} not found")
+            feedback_queue.set_progress(trace_id, 10, "generating")
+            _select_evaluator(assessment).attach_feedback(db, sub, assessment, graded, emit=emit)
+            print(f"[GRADER] ✅ Feedback attached for submission {sub.id}")
+        except Exception as e:
+            # The phase-one score and template feedback stay in place
+            print(f"[GRADER WARNING] Feedback generation failed for submission {submission_id}: {e}")
+            db.rollback()
+            sub.feedback_status = "failed"
+            db.commit()
+
+        emit("done", {"status": sub.status, "feedback_status": sub.feedback_status, "state": _submission_state(sub)})
+        grading_streams.close(trace_id)
+    finally:
+        db.close()
+
+
+def resume_pending_grading():
+    """Re-queue submissions left in 'grading' or awaiting feedback by a previous process (called on startup)."""
+    db = SessionLocal()
+    try:
+        pending = db.query(Submission).filter(
+            Submission.status == "grading",
+            Submission.trace_id != None,
+        ).order_by(Submission.submitted_at).all()
+        for sub in pending:
+            grading_streams.open(sub.trace_id)
+            grading_queue.submit(sub.trace_id, _run_grading_job, sub.id)
+        if pending:
+            print(f"[GRADER] Re-queued {len(pending)} submission(s) left in grading")
+
+        awaiting_feedback = db.query(Submission).filter(
+            Submission.status == "completed",
+            Submission.feedback_status == "pending",
+            Submission.trace_id != None,
+        ).order_by(Submission.submitted_at).all()
+        for sub in awaiting_feedback:
+            grading_streams.open(sub.trace_id)
+            feedback_queue.submit(sub.trace_id, _run_feedback_job, sub.id)
+        if awaiting_feedback:
+            print(f"[GRADER] Re-queued feedback for {len(awaiting_feedback)} scored submission(s)")
+    finally:
+        db.close()
+
+
+def _queue_info(trace_id: str) -> dict:
+    job = grading_queue.status(trace_id)
+    if not job:
+        return {"state": None, "queue_position": None, "queue_length": None, "progress": None, "stage": None}
+    return {
+        "state": job["state"],
+        "queue_position": job["queue_position"],
+        "queue_length": job["queue_length"],
+        "progress": job["progress"],
+        "stage": job["stage"],
+    }
+
+
+def _submission_state(sub: Submission) -> dict:
+    """Frontend-safe snapshot of a graded submission (shared by /status and /stream)."""
+    feedback = {}
+    if sub.feedback:
+        try:
+            raw_feedback = json.loads(sub.feedback)
+            if isinstance(raw_feedback, dict):
+                # Ensure no nested objects for keys that React renders as children
+                def clean_val(v):
+                    if isinstance(v, (dict, list)): return str(v)
+                    return v
+
+                def clean_list(l):
+                    if not isinstance(l, list): return []
+                    return [str(v) if isinstance(v, (dict, list)) else v for v in l]
+
+                feedback = {
+                    "overall_comment": str(raw_feedback.get("overall_comment", raw_feedback.get("overall_assessment", raw_feedback.get("overall", raw_feedback.get("feedback", ""))))),
+                    "strengths": clean_list(raw_feedback.get("strengths", [])),
+                    "weaknesses": clean_list(raw_feedback.get("weaknesses", [])),
+                    "suggestions": clean_list(raw_feedback.get("suggestions", [])),
+                    "missing_points": clean_list(raw_feedback.get("missing_points", [])),
+                    "errors": clean_list(raw_feedback.get("errors", [])),
+                    "improvements": clean_list(raw_feedback.get("improvements", [])),
+                    "risk_level": str(raw_feedback.get("risk_level", "low")),
+                    "risk_factors": clean_list(raw_feedback.get("risk_factors", [])),
+                    "accuracy_score": raw_feedback.get("accuracy_score") if raw_feedback.get("accuracy_score") not in [None, ""] else None,
+                    "test_score": raw_feedback.get("test_score") if raw_feedback.get("test_score") not in [None, ""] else None,
+                    "style_score": raw_feedback.get("style_score") if raw_feedback.get("style_score") not in [None, ""] else None,
+                    "rubric_scores": {
+                        str(k): (v if isinstance(v, (int, float)) else 0)
+                        for k, v in (raw_feedback.get("rubric_scores", {}) if isinstance(raw_feedback.get("rubric_scores"), dict) else {}).items()
+                    }
+                }
+            else:
+                feedback = {"overall_comment": str(raw_feedback)}
+        except Exception:
+            feedback = {"overall_comment": str(sub.feedback)}
+
+    test_results = []
+    if sub.test_results:
+        try:
+            test_results = json.loads(sub.test_results)
+        except Exception:
+            pass
+
+    # Deep Recursive Sanitizer to prevent "Object as React Child"
+    def make_safe(obj):
+        if obj is None: return ""
+        if isinstance(obj, (int, float, bool)): return obj
+        if isinstance(obj, str): return obj
+        if isinstance(obj, list): return [make_safe(item) for item in obj]
+        if isinstance(obj, dict):
+            return {str(k): make_safe(v) for k, v in obj.items()}
+        return str(obj)
+
+    # Safe float conversion
+    score_val = float(sub.score) if sub.score is not None else 0.0
+    max_score_val = float(sub.max_score) if sub.max_score is not None else 100.0
+    percentage_val = (score_val / max_score_val * 100) if max_score_val > 0 else 0.0
+    
+    pass_status_val = str(sub.pass_status) if sub.pass_status in ["pass", "fail"] else None
+
+    state = {
         "submission_id": str(sub.id),
-        "trace_id": trace_id,
-        "status": sub.status,  # Return actual status (completed/graded)
+        "assessment_id": str(sub.assessment_id),
+        "score": score_val,
+        "max_score": max_score_val,
+        "percentage": percentage_val,
+        "pass_status": pass_status_val,
+        "passed": pass_status_val == "pass",
+        "feedback_status": sub.feedback_status,
+        "feedback": make_safe(feedback),
+        "test_results": make_safe(test_results),
+        "rubric_scores": make_safe(feedback.get("rubric_scores", {
+            "correctness": float(feedback.get("accuracy_score") or 0) if isinstance(feedback.get("accuracy_score"), (int, float)) else 0,
+            "quality": 0,
+        })),
+        "risk_level": str(feedback.get("risk_level", "low")),
+        "risk_factors": make_safe(feedback.get("risk_factors", [])),
     }
-    print(f"[SUBMIT] Returning response: {response}")
-    return response
+    return state
 
 
 @router.get("/status/{trace_id}")
@@ -121,89 +321,14 @@ def get_workflow_status(trace_id: str, db: Session = Depends(get_db), current_us
         
         print(f"[STATUS] Found submission {sub.id}, status: {sub.status}, score: {sub.score}")
 
-        feedback = {}
-        if sub.feedback:
-            try:
-                raw_feedback = json.loads(sub.feedback)
-                if isinstance(raw_feedback, dict):
-                    # Ensure no nested objects for keys that React renders as children
-                    def clean_val(v):
-                        if isinstance(v, (dict, list)): return str(v)
-                        return v
-
-                    def clean_list(l):
-                        if not isinstance(l, list): return []
-                        return [str(v) if isinstance(v, (dict, list)) else v for v in l]
-
-                    feedback = {
-                        "overall_comment": str(raw_feedback.get("overall_comment", raw_feedback.get("overall_assessment", raw_feedback.get("overall", raw_feedback.get("feedback", ""))))),
-                        "strengths": clean_list(raw_feedback.get("strengths", [])),
-                        "weaknesses": clean_list(raw_feedback.get("weaknesses", [])),
-                        "suggestions": clean_list(raw_feedback.get("suggestions", [])),
-                        "missing_points": clean_list(raw_feedback.get("missing_points", [])),
-                        "errors": clean_list(raw_feedback.get("errors", [])),
-                        "improvements": clean_list(raw_feedback.get("improvements", [])),
-                        "risk_level": str(raw_feedback.get("risk_level", "low")),
-                        "risk_factors": clean_list(raw_feedback.get("risk_factors", [])),
-                        "accuracy_score": raw_feedback.get("accuracy_score") if raw_feedback.get("accuracy_score") not in [None, ""] else None,
-                        "test_score": raw_feedback.get("test_score") if raw_feedback.get("test_score") not in [None, ""] else None,
-                        "style_score": raw_feedback.get("style_score") if raw_feedback.get("style_score") not in [None, ""] else None,
-                        "rubric_scores": {
-                            str(k): (v if isinstance(v, (int, float)) else 0)
-                            for k, v in (raw_feedback.get("rubric_scores", {}) if isinstance(raw_feedback.get("rubric_scores"), dict) else {}).items()
-                        }
-                    }
-                else:
-                    feedback = {"overall_comment": str(raw_feedback)}
-            except Exception:
-                feedback = {"overall_comment": str(sub.feedback)}
-
-        test_results = []
-        if sub.test_results:
-            try:
-                test_results = json.loads(sub.test_results)
-            except Exception:
-                pass
-
-        # Deep Recursive Sanitizer to prevent "Object as React Child"
-        def make_safe(obj):
-            if obj is None: return ""
-            if isinstance(obj, (int, float, bool)): return obj
-            if isinstance(obj, str): return obj
-            if isinstance(obj, list): return [make_safe(item) for item in obj]
-            if isinstance(obj, dict):
-                return {str(k): make_safe(v) for k, v in obj.items()}
-            return str(obj)
-
-        # Safe float conversion
-        score_val = float(sub.score) if sub.score is not None else 0.0
-        max_score_val = float(sub.max_score) if sub.max_score is not None else 100.0
-        percentage_val = (score_val / max_score_val * 100) if max_score_val > 0 else 0.0
-        
-        pass_status_val = str(sub.pass_status) if sub.pass_status in ["pass", "fail"] else None
-
-        state = {
-            "submission_id": str(sub.id),
-            "assessment_id": str(sub.assessment_id),
-            "score": score_val,
-            "max_score": max_score_val,
-            "percentage": percentage_val,
-            "pass_status": pass_status_val,
-            "passed": pass_status_val == "pass",
-            "feedback": make_safe(feedback),
-            "test_results": make_safe(test_results),
-            "rubric_scores": make_safe(feedback.get("rubric_scores", {
-                "correctness": float(feedback.get("accuracy_score") or 0) if isinstance(feedback.get("accuracy_score"), (int, float)) else 0,
-                "quality": 0,
-            })),
-            "risk_level": str(feedback.get("risk_level", "low")),
-            "risk_factors": make_safe(feedback.get("risk_factors", [])),
-        }
+        state = _submission_state(sub)
 
         print(f"[STATUS] Returning response with status={sub.status}")
         return {
             "trace_id": trace_id,
             "status": sub.status,
+            "feedback_status": sub.feedback_status,
+            "queue": _queue_info(trace_id),
             "state": state,
         }
     except HTTPException:
@@ -215,6 +340,63 @@ def get_workflow_status(trace_id: str, db: Session = Depends(get_db), current_us
         raise HTTPException(status_code=500, detail=f"Error processing status: {str(e)}")
 
 
+@router.get("/stream/{trace_id}")
+def stream_workflow(trace_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user_or_query_token)):
+    """Server-sent events for one submission's grading.
+
+    Events: ``status`` (queue/stage), ``score`` (deterministic score, sent
+    before any LLM call), ``token`` (feedback text as the model produces it)
+    and a final ``done`` carrying the same state as /status once feedback
+    is attached. Clients that
+    connect after grading finished get ``score`` and ``done`` straight away.
+    Auth accepts ?token=<jwt> since EventSource cannot set headers.
+    """
+    sub = db.query(Submission).filter(Submission.trace_id == trace_id).first()
+    if not sub:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+
+    def in_progress():
+        return sub.status == "grading" or sub.feedback_status == "pending"
+
+    live = grading_streams.has(trace_id)
+    if not live and in_progress():
+        # Re-queued after a restart, or the channel was purged; the worker will publish into it
+        grading_streams.open(trace_id)
+        db.refresh(sub)
+        live = in_progress()
+        if not live:
+            grading_streams.close(trace_id)
+
+    queue = _queue_info(trace_id)
+    status = sub.status
+    snapshot = None if live else {
+        "status": status,
+        "feedback_status": sub.feedback_status,
+        "state": _submission_state(sub),
+    }
+    print(f"[STREAM] {current_user.email} following {trace_id} ({'live' if live else 'replay'})")
+    # get_db teardown only runs after the stream ends; hand the connection back now
+    db.close()
+
+    async def event_source():
+        yield format_sse("status", {"status": status, "queue": queue})
+        if snapshot is not None:
+            yield format_sse("score", {
+                "score": snapshot["state"]["score"],
+                "pass_status": snapshot["state"]["pass_status"],
+            })
+            yield format_sse("done", snapshot)
+            return
+        async for event, data in grading_streams.subscribe(trace_id):
+            yield format_sse(event, data)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/fresher-dashboard")
 def fresher_dashboard(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     from app.api.routes.freshers import _build_dashboard
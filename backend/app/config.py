@@ -19,9 +19,80 @@ class Settings(BaseSettings):
     OLLAMA_MODEL: str = "phi3:latest"
     OLLAMA_CODE_MODEL: str = "phi3:latest"
     OLLAMA_FAST_MODEL: str = "phi3:latest"
+    OLLAMA_TIMEOUT_SECONDS: float = 120
+    OLLAMA_MAX_CONNECTIONS: int = 16
+
+    # Model routing (see app/core/model_router.py). Overrides map "Agent.task", "Agent"
+    # or "task" to a tier (fast/default/code) or a model tag. Nothing uses the fast tier
+    # unless routed here, e.g. '{"explanation": "fast", "ProfileAgent.skill_portrait": "fast"}'
+    LLM_ROUTE_OVERRIDES: dict = {}
+    LLM_FAST_MAX_PROMPT_CHARS: int = 6000
+
+    # Structured output: Ollama "format" for JSON-producing prompts. "json", "schema"
+    # (send the pydantic JSON schema; needs Ollama >= 0.5) or "" to disable
+    LLM_STRUCTURED_FORMAT: str = "json"
+
+    # Max concurrent per-question explanation calls (AssessmentAgent quiz fallback)
+    LLM_EXPLANATION_CONCURRENCY: int = 5
+
+    # LLM circuit breaker (fail fast to mock/fallback output while Ollama is unhealthy)
+    LLM_BREAKER_FAILURE_RATE: float = 0.5
+    LLM_BREAKER_SLOW_CALL_SECONDS: float = 30
+    LLM_BREAKER_SLOW_CALL_RATE: float = 0.8
+    LLM_BREAKER_WINDOW: int = 20
+    LLM_BREAKER_MIN_CALLS: int = 5
+    LLM_BREAKER_OPEN_SECONDS: float = 30
+    LLM_BREAKER_PROBE_INTERVAL_SECONDS: float = 10
+
+    # LLM response cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "./llm_cache.db"
+    LLM_CACHE_MAX_ENTRIES: int = 2048
+    LLM_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Background grading
+    GRADING_WORKERS: int = 4
+    # Commit deterministic quiz scores first and attach LLM feedback afterwards
+    GRADING_TWO_PHASE: bool = True
+    FEEDBACK_WORKERS: int = 2
+    REPORT_WORKERS: int = 2
+    REPORT_ARTIFACT_DIR: str = "./report_artifacts"
+
+    # Post-grading event bus and outbox (see app/core/event_bus.py)
+    EVENT_WORKERS: int = 2
+    EVENT_MAX_ATTEMPTS: int = 5
+    EVENT_RETRY_BASE_SECONDS: float = 5
+
+    # PerformanceAnalytics materialization: weeks kept in score_trend, cohort rank refresh period
+    ANALYTICS_TREND_WEEKS: int = 12
+    ANALYTICS_RANK_INTERVAL_SECONDS: float = 300
+
+    # Batch risk engine (see app/agents/risk_engine.py): cohort refresh period, attempts
+    # needed before fitting the model, score distance from a level boundary that counts as
+    # borderline, and LLM explanations per refresh
+    RISK_REFRESH_INTERVAL_SECONDS: float = 3600
+    RISK_MODEL_MIN_SAMPLES: int = 30
+    RISK_BORDERLINE_MARGIN: float = 5
+    RISK_EXPLAIN_LIMIT: int = 10
+
+    # Manager dashboard snapshot TTL (also invalidated on writes); 0 disables caching
+    DASHBOARD_CACHE_TTL_SECONDS: float = 30
+
+    # Code-challenge sandbox (see app/core/code_sandbox.py)
+    CODE_SANDBOX_WORKERS: int = 2
+    CODE_SANDBOX_CPU_SECONDS: int = 5
+    CODE_SANDBOX_WALL_SECONDS: float = 10
+    CODE_SANDBOX_MEMORY_MB: int = 256
+    # Test suites longer than this are split across workers
+    CODE_SANDBOX_CHUNK_SIZE: int = 50
+
+    # PDF rendering process pool (see app/core/pdf_renderer.py); 0 renders in-process
+    PDF_RENDER_WORKERS: int = 2
+    PDF_RENDER_TIMEOUT_SECONDS: float = 120
 
     # n8n
     N8N_WEBHOOK_URL: str = "http://localhost:5678/webhook"
+    N8N_TIMEOUT_SECONDS: float = 10
 
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000,http://localhost:3001,http://localhost:8000"
@@ -0,0 +1,119 @@
+import json
+import random
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from app.core.llm_cache import LRUCache
+from app.models.assessment import Assessment
+
+
+def normalize_answer(value) -> str:
+    """Canonical form used when comparing a submitted answer with the answer key."""
+    text = str(value or "").strip().lower()
+    if text in ["true", "t", "yes", "1"]:
+        return "true"
+    if text in ["false", "f", "no", "0"]:
+        return "false"
+    return text
+
+
+def _parse_json(val, default):
+    if not val:
+        return default
+    try:
+        return json.loads(val)
+    except Exception:
+        return default
+
+
+class KeyedQuestion:
+    """One question of a day's selection, with everything grading needs precomputed."""
+
+    __slots__ = ("question", "index", "candidate_keys", "correct", "correct_normalized", "points")
+
+    def __init__(self, question: dict, index: int):
+        q_id_raw = question.get("id", "")
+        self.question = question
+        self.index = index
+        # Frontends have submitted answers keyed by id, "q1", 0-based or 1-based index
+        self.candidate_keys = (q_id_raw, str(q_id_raw).strip(), f"q{index + 1}", str(index), str(index + 1))
+        self.correct = question.get("correct_answer", "")
+        self.correct_normalized = normalize_answer(self.correct)
+        self.points = question.get("points")
+
+    def lookup(self, answers: dict) -> Tuple[Optional[str], object]:
+        """(matched key, raw answer) for this question; (None, "") if unanswered."""
+        for key in self.candidate_keys:
+            if key in answers:
+                return key, answers.get(key, "")
+        return None, ""
+
+
+class CompiledAssessment:
+    """Parsed, read-only view of an Assessment row. Callers must not mutate the lists."""
+
+    def __init__(self, assessment: Assessment):
+        self.id = assessment.id
+        self.version = assessment.updated_at
+        self.assessment_type = assessment.assessment_type
+        self.questions: List[dict] = _parse_json(assessment.questions, [])
+        self.rubric = _parse_json(assessment.rubric, {})
+        self.test_cases = _parse_json(assessment.test_cases, [])
+        self.skills_assessed = _parse_json(assessment.skills_assessed, [])
+        self._daily: Dict[Tuple[date, int], Tuple[List[dict], List[KeyedQuestion]]] = {}
+
+    def _selection(self, count: int, on_date: Optional[date]):
+        day = on_date or date.today()
+        key = (day, count)
+        selection = self._daily.get(key)
+        if selection is None:
+            questions = self.questions
+            if self.assessment_type == "quiz" and len(questions) > count:
+                rng = random.Random(int(day.strftime("%Y%m%d")) + int(self.id))
+                questions = rng.sample(questions, count)
+            selection = (questions, [KeyedQuestion(q, i) for i, q in enumerate(questions)])
+            if day == date.today():
+                # Only today's selections are worth keeping
+                self._daily = {k: v for k, v in self._daily.items() if k[0] == day}
+                self._daily[key] = selection
+        return selection
+
+    def daily_questions(self, count: int, on_date: Optional[date] = None) -> List[dict]:
+        """The questions served on ``on_date`` (default today); quizzes sample ``count`` per day."""
+        return self._selection(count, on_date)[0]
+
+    def answer_key(self, count: int, on_date: Optional[date] = None) -> List[KeyedQuestion]:
+        return self._selection(count, on_date)[1]
+
+
+class CompiledAssessmentCache:
+    """Process-wide cache of CompiledAssessment keyed by (id, updated_at).
+
+    A stale version is recompiled on access; ORM updates/deletes also evict
+    the entry eagerly (see the mapper events below).
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self._entries = LRUCache(max_entries)
+
+    def get(self, assessment: Assessment) -> CompiledAssessment:
+        compiled = self._entries.get(assessment.id)
+        if compiled is None or compiled.version != assessment.updated_at:
+            compiled = CompiledAssessment(assessment)
+            self._entries.set(assessment.id, compiled)
+        return compiled
+
+    def invalidate(self, assessment_id: int):
+        self._entries.invalidate(assessment_id)
+
+    def clear(self):
+        self._entries.clear()
+
+
+compiled_assessments = CompiledAssessmentCache()
+
+
+@event.listens_for(Assessment, "after_update")
+@event.listens_for(Assessment, "after_delete")
+def _evict_compiled_assessment(mapper, connection, target):
+    compiled_assessments.invalidate(target.id)
@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker driven by failure rate and slow-call rate.
+
+    While closed, the last ``window_size`` call outcomes are kept; once at
+    least ``min_calls`` are recorded and either the failure rate or the rate of
+    calls slower than ``slow_call_seconds`` reaches its threshold, the breaker
+    opens and allow_request() fails fast. While open, a daemon thread runs
+    ``probe`` every ``probe_interval_seconds``; the first success (or
+    ``open_seconds`` elapsing) moves to half-open, where up to
+    ``half_open_max_calls`` trial calls decide between closing and re-opening.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        slow_call_seconds: float = 30,
+        slow_call_rate_threshold: float = 0.8,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30,
+        half_open_max_calls: int = 2,
+        probe: Optional[Callable[[], bool]] = None,
+        probe_interval_seconds: float = 10,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.probe = probe
+        self.probe_interval_seconds = probe_interval_seconds
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._window: deque = deque(maxlen=window_size)
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._probe_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._counters = {"rejected": 0, "opened": 0, "successes": 0, "failures": 0, "slow_calls": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open_locked()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """True if a call may go to the backend. In half-open this reserves a trial slot."""
+        with self._lock:
+            self._maybe_half_open_locked()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def record_success(self, duration: float):
+        with self._lock:
+            slow = duration >= self.slow_call_seconds
+            self._counters["successes"] += 1
+            if slow:
+                self._counters["slow_calls"] += 1
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if slow:
+                    self._open_locked("slow trial call")
+                    return
+                self._half_open_successes += 1
+                if self._half_open_successes >= self.half_open_max_calls:
+                    self._close_locked()
+                return
+            if self._state == CLOSED:
+                self._window.append((True, slow))
+                self._evaluate_locked()
+
+    def record_failure(self):
+        with self._lock:
+            self._counters["failures"] += 1
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                self._open_locked("trial call failed")
+                return
+            if self._state == CLOSED:
+                self._window.append((False, False))
+                self._evaluate_locked()
+
+    def release(self):
+        """Give back a half-open trial slot whose call ended without an outcome (abandoned)."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def trip(self, reason: str = "forced"):
+        """Open immediately, e.g. when the startup probe finds the backend down."""
+        with self._lock:
+            if self._state != OPEN:
+                self._open_locked(reason)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._maybe_half_open_locked()
+            calls = len(self._window)
+            failures = sum(1 for ok, _ in self._window if not ok)
+            slow = sum(1 for _, s in self._window if s)
+            return {
+                "name": self.name,
+                "state": self._state,
+                "window_calls": calls,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "slow_call_rate": round(slow / calls, 3) if calls else 0.0,
+                "open_for_seconds": round(time.monotonic() - self._opened_at, 1) if self._state != CLOSED else 0,
+                **self._counters,
+            }
+
+    def shutdown(self):
+        self._stop.set()
+
+    def _evaluate_locked(self):
+        calls = len(self._window)
+        if calls < self.min_calls:
+            return
+        failure_rate = sum(1 for ok, _ in self._window if not ok) / calls
+        slow_rate = sum(1 for _, s in self._window if s) / calls
+        if failure_rate >= self.failure_rate_threshold:
+            self._open_locked(f"failure rate {failure_rate:.0%}")
+        elif slow_rate >= self.slow_call_rate_threshold:
+            self._open_locked(f"slow call rate {slow_rate:.0%}")
+
+    def _open_locked(self, reason: str):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        self._counters["opened"] += 1
+        print(f"[{self.name}] ✗ Circuit OPEN ({reason}); failing fast")
+        self._start_probe_locked()
+
+    def _close_locked(self):
+        self._state = CLOSED
+        self._window.clear()
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        print(f"[{self.name}] ✓ Circuit CLOSED; backend healthy again")
+
+    def _half_open_locked(self):
+        self._state = HALF_OPEN
+        self._half_open_in_flight = 0
+        self._half_open_successes = 0
+        print(f"[{self.name}] Circuit HALF-OPEN; allowing trial calls")
+
+    def _maybe_half_open_locked(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._half_open_locked()
+
+    def _start_probe_locked(self):
+        if self.probe is None or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, name=f"{self.name}-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval_seconds):
+            with self._lock:
+                self._maybe_half_open_locked()
+                if self._state != OPEN:
+                    return
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    if self._state == OPEN:
+                        self._half_open_locked()
+                return
@@ -0,0 +1,180 @@
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from app.config import settings
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+
+class CodeSandbox:
+    """Pool of pre-started worker subprocesses that run code-challenge test cases.
+
+    Each worker (app/core/sandbox_worker.py) takes exactly one submission,
+    runs it in a forked child with CPU-time, address-space and file-size
+    limits, grades the child's results itself and exits, so no state leaks
+    between submissions and a submission cannot write its own verdict. The pool keeps ``workers`` processes warm
+    and bounds how many run at once; the parent kills any that exceed the
+    wall-clock limit. Suites longer than ``chunk_size`` are split and fanned
+    out across workers, each compiling the submission once for its chunk.
+    """
+
+    def __init__(self, workers: int, cpu_seconds: int, wall_seconds: float, memory_mb: int, chunk_size: int = 50):
+        self.workers = max(1, workers)
+        self.wall_seconds = wall_seconds
+        self.chunk_size = max(1, chunk_size)
+        self._fanout = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="CodeSandboxFanout")
+        self._limits = json.dumps({"cpu_seconds": cpu_seconds, "memory_mb": memory_mb})
+        self._idle: "queue.Queue[subprocess.Popen]" = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._stats = {"runs": 0, "timeouts": 0, "crashes": 0}
+
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen(
+            [sys.executable, "-I", "-S", WORKER_SCRIPT, self._limits],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            start_new_session=True,
+            # Submissions must not see the server's secrets (SECRET_KEY, DATABASE_URL, ...)
+            env={"PATH": os.defpath, "LANG": "C.UTF-8"},
+        )
+
+    def start(self):
+        with self._lock:
+            if self._started or self._closed:
+                return
+            self._started = True
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+        print(f"[CodeSandbox] ✓ {self.workers} workers ready")
+
+    def _take(self) -> subprocess.Popen:
+        self.start()
+        while True:
+            try:
+                proc = self._idle.get_nowait()
+            except queue.Empty:
+                return self._spawn()
+            if proc.poll() is None:
+                return proc
+
+    @staticmethod
+    def _kill(proc: subprocess.Popen):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, AttributeError):
+            proc.kill()
+
+    def run(self, code: str, tests: List[dict], entry_point: Optional[str] = None) -> List[dict]:
+        """Run ``tests`` against ``code``: one worker round-trip per chunk of tests.
+
+        Returns one ``{"passed", "actual", "error", "duration_ms"}`` dict per
+        test, in order. If a worker does not return exactly one outcome per
+        test (timeout, crash), every test in its chunk is reported as failed
+        with no duration.
+        """
+        if len(tests) <= self.chunk_size:
+            return self._run_chunk(code, tests, entry_point)
+        chunks = [tests[i:i + self.chunk_size] for i in range(0, len(tests), self.chunk_size)]
+        futures = [self._fanout.submit(self._run_chunk, code, chunk, entry_point) for chunk in chunks]
+        return [outcome for future in futures for outcome in future.result()]
+
+    def _run_chunk(self, code: str, tests: List[dict], entry_point: Optional[str]) -> List[dict]:
+        # The expected outputs go last, after the length-prefixed task: the worker
+        # reads them only once the process running the submission has forked
+        task = json.dumps({
+            "code": code,
+            "entry_point": entry_point,
+            "inputs": [tc.get("input", "") for tc in tests],
+        }).encode()
+        expected = json.dumps([str(tc.get("expected_output", "")) for tc in tests]).encode()
+        request = b"%d\n" % len(task) + task + expected + b"\n"
+
+        with self._slots:
+            proc = self._take()
+            if not self._closed:
+                # Replace the worker now so the next submission finds a warm one
+                self._idle.put(self._spawn())
+            timed_out = False
+            try:
+                stdout, _ = proc.communicate(request, timeout=self.wall_seconds)
+            except subprocess.TimeoutExpired:
+                timed_out = True
+                self._kill(proc)
+                stdout, _ = proc.communicate()
+
+        lines = []
+        for line in stdout.decode(errors="replace").splitlines():
+            try:
+                lines.append(json.loads(line))
+            except ValueError:
+                break  # Cut off mid-write
+        header, outcomes = (lines[0], lines[1:]) if lines else ({}, [])
+
+        with self._lock:
+            self._stats["runs"] += 1
+            if timed_out:
+                self._stats["timeouts"] += 1
+            elif proc.returncode != 0:
+                self._stats["crashes"] += 1
+
+        if header.get("error"):
+            return [
+                {"passed": False, "actual": header.get("actual", "Error"), "error": header["error"], "duration_ms": None}
+                for _ in tests
+            ]
+
+        if timed_out:
+            reason = f"Time limit exceeded ({self.wall_seconds:g}s)"
+        elif proc.returncode == -signal.SIGXCPU or proc.returncode == -signal.SIGKILL:
+            reason = "CPU time limit exceeded"
+        elif proc.returncode != 0:
+            reason = f"Execution aborted (exit code {proc.returncode})"
+        else:
+            reason = "No result returned"
+        if len(outcomes) == len(tests):
+            return outcomes
+        # A short or padded chunk is never partially trusted: every test in it fails
+        print(f"[CodeSandbox] ✗ {reason} after {len(outcomes)}/{len(tests)} tests")
+        return [{"passed": False, "actual": "Error", "error": reason, "duration_ms": None} for _ in tests]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "chunk_size": self.chunk_size,
+                "idle": self._idle.qsize(),
+                "wall_seconds": self.wall_seconds,
+                "limits": json.loads(self._limits),
+                **self._stats,
+            }
+
+    def shutdown(self):
+        self._closed = True
+        self._fanout.shutdown(wait=False, cancel_futures=True)
+        while True:
+            try:
+                proc = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._kill(proc)
+            proc.wait()
+
+
+code_sandbox = CodeSandbox(
+    workers=settings.CODE_SANDBOX_WORKERS,
+    cpu_seconds=settings.CODE_SANDBOX_CPU_SECONDS,
+    wall_seconds=settings.CODE_SANDBOX_WALL_SECONDS,
+    memory_mb=settings.CODE_SANDBOX_MEMORY_MB,
+    chunk_size=settings.CODE_SANDBOX_CHUNK_SIZE,
+)
@@ -0,0 +1,114 @@
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+AT_RISK_LEVELS = ("high", "critical")
+
+
+class CohortStats:
+    """Column arrays for a cohort, loaded once and queried with vectorized NumPy.
+
+    ``labels`` are per-row keys to group by (department, risk level, ...);
+    ``columns`` are numeric metrics (progress, score, risk score, ...). Every
+    array has one entry per row, in the order rows were given.
+    """
+
+    def __init__(self, labels: Dict[str, Sequence] = None, columns: Dict[str, Sequence] = None):
+        self.labels = {name: np.asarray(values, dtype=object) for name, values in (labels or {}).items()}
+        self.columns = {name: np.asarray(values, dtype=float) for name, values in (columns or {}).items()}
+        sizes = {len(a) for a in (*self.labels.values(), *self.columns.values())}
+        if len(sizes) > 1:
+            raise ValueError("All cohort columns must have the same length")
+        self.size = sizes.pop() if sizes else 0
+
+    @classmethod
+    def from_records(cls, records: Iterable, labels: Dict[str, Callable] = None, columns: Dict[str, Callable] = None):
+        """Build from row objects with one getter per label/column, e.g. ``{"progress": lambda r: r.overall_progress}``."""
+        records = list(records)
+        return cls(
+            {name: [get(r) for r in records] for name, get in (labels or {}).items()},
+            {name: [get(r) or 0.0 for r in records] for name, get in (columns or {}).items()},
+        )
+
+    def mean(self, column: str) -> float:
+        values = self.columns[column]
+        return float(values.mean()) if values.size else 0.0
+
+    def mask_in(self, label: str, values: Sequence) -> np.ndarray:
+        return np.isin(self.labels[label], list(values))
+
+    def percentiles(self, column: str, qs: Sequence[float] = (25, 50, 75, 90)) -> Dict[str, float]:
+        values = self.columns[column]
+        if not values.size:
+            return {f"p{q:g}": 0.0 for q in qs}
+        return {f"p{q:g}": round(float(v), 2) for q, v in zip(qs, np.percentile(values, qs))}
+
+    def zscores(self, column: str) -> np.ndarray:
+        values = self.columns[column]
+        std = values.std() if values.size else 0.0
+        if not std:
+            return np.zeros_like(values)
+        return (values - values.mean()) / std
+
+    def histogram(self, column: str, bins: int = 10, value_range=(0, 100)) -> List[dict]:
+        counts, edges = np.histogram(np.clip(self.columns[column], *value_range), bins=bins, range=value_range)
+        return [
+            {"range": f"{edges[i]:g}-{edges[i + 1]:g}", "count": int(counts[i])}
+            for i in range(len(counts))
+        ]
+
+    def _codes(self, label: str):
+        """(distinct values in first-seen order, per-row group code).
+
+        Built with a dict rather than np.unique, which sorts and so fails on
+        mixed labels such as ``None`` next to strings.
+        """
+        index: Dict[object, int] = {}
+        codes = np.fromiter(
+            (index.setdefault(value, len(index)) for value in self.labels[label]), dtype=np.intp, count=self.size
+        )
+        return list(index), codes
+
+    def value_counts(self, label: str) -> Dict[str, int]:
+        """Rows per distinct label value, in first-seen order."""
+        if not self.size:
+            return {}
+        keys, codes = self._codes(label)
+        counts = np.bincount(codes, minlength=len(keys))
+        return {key: int(counts[g]) for g, key in enumerate(keys)}
+
+    def group_by(self, label: str, column: str, flag: Optional[np.ndarray] = None) -> Dict[str, dict]:
+        """Per-group count, mean of ``column`` and number of rows set in ``flag``, in first-seen order."""
+        if not self.size:
+            return {}
+        keys, inverse = self._codes(label)
+        counts = np.bincount(inverse, minlength=len(keys))
+        sums = np.bincount(inverse, weights=self.columns[column], minlength=len(keys))
+        flagged = np.bincount(inverse, weights=flag.astype(float), minlength=len(keys)) if flag is not None else None
+        groups = {}
+        for g, key in enumerate(keys):
+            groups[key] = {
+                "count": int(counts[g]),
+                "mean": float(sums[g] / counts[g]),
+                **({"flagged": int(flagged[g])} if flagged is not None else {}),
+            }
+        return groups
+
+    def top_k(self, column: str, k: int) -> np.ndarray:
+        """Row indices of the ``k`` largest values, best first (ties keep row order)."""
+        values = self.columns[column]
+        k = min(k, values.size)
+        if k <= 0:
+            return np.empty(0, dtype=int)
+        if k < values.size:
+            candidates = np.argpartition(-values, k - 1)[:k]
+            # argpartition picks arbitrarily among equal values at the cut; settle ties by row order
+            cut = values[candidates].min()
+            candidates = np.flatnonzero(values >= cut)
+        else:
+            candidates = np.arange(values.size)
+        order = np.lexsort((candidates, -values[candidates]))
+        return candidates[order][:k]
+
+    def order_by(self, column: str, descending: bool = True) -> np.ndarray:
+        values = self.columns[column]
+        return np.argsort(-values if descending else values, kind="stable")
@@ -0,0 +1,220 @@
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.models.event import OutboxEvent, OutboxDelivery
+
+Handler = Callable[[Session, dict], None]
+
+# Session.info key set on a handler's session; collects deliveries it published
+_IN_HANDLER = "event_bus_handler_published"
+
+
+def _begin(conn):
+    """Open ``conn``'s transaction for real. pysqlite defers BEGIN to the first write, so
+    without this a handler's first SAVEPOINT would start the transaction and its
+    RELEASE would commit it. IMMEDIATE takes the write lock up front: concurrent
+    handlers then queue on SQLite's busy timeout instead of deadlocking when a
+    reader tries to become a writer."""
+    trans = conn.begin()
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    return trans
+
+
+class EventBus:
+    """In-process publish/subscribe backed by a durable outbox.
+
+    publish() stores the event with one delivery row per subscriber; each
+    delivery then runs on the worker pool with its own DB session, so
+    subscribers fail and retry independently. The bus owns each delivery's
+    transaction: the handler's session is joined to it through a savepoint,
+    so the handler's own ``commit()``/``rollback()`` only release or roll back
+    that savepoint, and the bus commits the handler's work together with the
+    delivery's "done" mark. A handler that raises leaves nothing behind and
+    is retried. Failures back off
+    exponentially up to ``max_attempts``, and recover() re-schedules whatever
+    was still pending when the last process stopped.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_attempts: int, retry_base_seconds: float):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_seconds = retry_base_seconds
+        self._subscribers: Dict[str, Dict[str, Handler]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._timers = set()
+        self._closed = False
+
+    def subscribe(self, event_type: str, name: str, handler: Handler):
+        """Register ``handler(db, payload)`` under a stable subscriber name."""
+        self._subscribers.setdefault(event_type, {})[name] = handler
+
+    def publish(self, db: Session, event_type: str, payload: dict, dedupe_key: Optional[str] = None) -> Optional[int]:
+        """Record an event and schedule its deliveries. Commits ``db``.
+
+        Returns the event id, or None if an event with ``dedupe_key`` already exists.
+        """
+        key = dedupe_key or f"{event_type}:{uuid.uuid4()}"
+        if db.query(OutboxEvent.id).filter(OutboxEvent.dedupe_key == key).first():
+            db.commit()  # Already published; the caller's own changes still go in
+            return None
+        db.flush()
+        try:
+            # Only the event rows are undone if a concurrent publisher stored the key first
+            with db.begin_nested():
+                event = OutboxEvent(event_type=event_type, dedupe_key=key, payload=json.dumps(payload))
+                db.add(event)
+                db.flush()
+                deliveries = [
+                    OutboxDelivery(event_id=event.id, subscriber=name, status="pending", attempts=0)
+                    for name in self._subscribers.get(event_type, {})
+                ]
+                db.add_all(deliveries)
+                db.flush()
+        except IntegrityError:
+            db.commit()
+            return None
+        event_id, delivery_ids = event.id, [d.id for d in deliveries]
+        db.commit()
+        if _IN_HANDLER in db.info:
+            # Published from a handler: the rows exist only once the bus commits the delivery
+            db.info[_IN_HANDLER].extend(delivery_ids)
+        else:
+            for delivery_id in delivery_ids:
+                self._schedule(delivery_id)
+        print(f"[{self.name}] Published {event_type} #{event_id} to {len(delivery_ids)} subscribers")
+        return event_id
+
+    def _schedule(self, delivery_id: int, delay: float = 0):
+        if self._closed:
+            return
+        if delay <= 0:
+            self._executor.submit(self._deliver, delivery_id)
+            return
+        timer = threading.Timer(delay, self._fire, args=(delivery_id,))
+        timer.daemon = True
+        with self._lock:
+            self._timers.add(timer)
+        timer.start()
+
+    def _fire(self, delivery_id: int):
+        with self._lock:
+            self._timers = {t for t in self._timers if t.is_alive() and t is not threading.current_thread()}
+        self._schedule(delivery_id)
+
+    def _deliver(self, delivery_id: int):
+        db = SessionLocal()
+        try:
+            delivery = db.query(OutboxDelivery).filter(OutboxDelivery.id == delivery_id).first()
+            if not delivery or delivery.status != "pending":
+                return
+            event = db.query(OutboxEvent).filter(OutboxEvent.id == delivery.event_id).first()
+            handler = self._subscribers.get(event.event_type, {}).get(delivery.subscriber) if event else None
+            if handler is None:
+                delivery.status = "failed"
+                delivery.last_error = "No such subscriber"
+                db.commit()
+                return
+
+            try:
+                published = self._run_handler(handler, delivery_id, json.loads(event.payload))
+            except Exception as e:
+                delivery.attempts = (delivery.attempts or 0) + 1
+                delivery.last_error = str(e)[:1000]
+                if delivery.attempts >= self.max_attempts:
+                    delivery.status = "failed"
+                    db.commit()
+                    print(f"[{self.name}] ✗ {event.event_type} #{event.id} -> {delivery.subscriber} failed permanently: {e}")
+                    return
+                delay = self.retry_base_seconds * (2 ** (delivery.attempts - 1))
+                delivery.next_attempt_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                db.commit()
+                print(f"[{self.name}] ✗ {event.event_type} #{event.id} -> {delivery.subscriber} failed "
+                      f"(attempt {delivery.attempts}/{self.max_attempts}), retrying in {delay:g}s: {e}")
+                self._schedule(delivery_id, delay)
+                return
+            for published_id in published:
+                self._schedule(published_id)
+        finally:
+            db.close()
+
+    def _run_handler(self, handler: Handler, delivery_id: int, payload: dict) -> list:
+        """Run ``handler`` and mark its delivery done in one transaction; returns the
+        ids of deliveries it published, to schedule once that transaction is committed."""
+        published = []
+        with engine.connect() as conn:
+            trans = _begin(conn)
+            session = SessionLocal(bind=conn, join_transaction_mode="create_savepoint", info={_IN_HANDLER: published})
+            try:
+                handler(session, payload)
+                session.query(OutboxDelivery).filter(OutboxDelivery.id == delivery_id).update({
+                    OutboxDelivery.status: "done",
+                    OutboxDelivery.attempts: func.coalesce(OutboxDelivery.attempts, 0) + 1,
+                    OutboxDelivery.last_error: None,
+                    OutboxDelivery.completed_at: datetime.now(timezone.utc),
+                }, synchronize_session=False)
+                session.commit()
+            except BaseException:
+                session.close()
+                trans.rollback()
+                raise
+            session.close()
+            trans.commit()
+        return published
+
+    def recover(self):
+        """Re-schedule deliveries left pending by a previous process (called on startup)."""
+        db = SessionLocal()
+        try:
+            pending = db.query(OutboxDelivery.id, OutboxDelivery.next_attempt_at).filter(
+                OutboxDelivery.status == "pending"
+            ).order_by(OutboxDelivery.id).all()
+        finally:
+            db.close()
+        now = datetime.now(timezone.utc)
+        for delivery_id, due in pending:
+            if due is not None and due.tzinfo is None:
+                due = due.replace(tzinfo=timezone.utc)
+            self._schedule(delivery_id, (due - now).total_seconds() if due else 0)
+        if pending:
+            print(f"[{self.name}] Re-scheduled {len(pending)} pending deliveries")
+
+    def stats(self, db: Session) -> dict:
+        rows = db.query(
+            OutboxEvent.event_type, OutboxDelivery.subscriber, OutboxDelivery.status, func.count(OutboxDelivery.id)
+        ).join(OutboxEvent, OutboxEvent.id == OutboxDelivery.event_id).group_by(
+            OutboxEvent.event_type, OutboxDelivery.subscriber, OutboxDelivery.status
+        ).all()
+        deliveries: Dict[str, Dict[str, int]] = {}
+        for event_type, subscriber, status, count in rows:
+            deliveries.setdefault(f"{event_type}/{subscriber}", {})[status] = count
+        return {
+            "subscribers": {event_type: sorted(subs) for event_type, subs in self._subscribers.items()},
+            "deliveries": deliveries,
+            "scheduled_retries": len(self._timers),
+        }
+
+    def shutdown(self):
+        self._closed = True
+        with self._lock:
+            for timer in self._timers:
+                timer.cancel()
+            self._timers.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+event_bus = EventBus(
+    "EventBus",
+    max_workers=settings.EVENT_WORKERS,
+    max_attempts=settings.EVENT_MAX_ATTEMPTS,
+    retry_base_seconds=settings.EVENT_RETRY_BASE_SECONDS,
+)
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import threading
+import time
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+
+class _Channel:
+    __slots__ = ("events", "closed_at", "waiters")
+
+    def __init__(self):
+        self.events: list = []
+        self.closed_at: Optional[float] = None
+        self.waiters: set = set()
+
+
+class StreamHub:
+    """In-process fan-out of server-sent events, keyed by channel id (e.g. a trace_id).
+
+    Publishers are worker threads; subscribers are async generators running on
+    the event loop. Every event is kept for the channel's lifetime so a client
+    that connects late (or reconnects) replays from the start. Closed channels
+    linger for ``retention_seconds`` and are then purged.
+    """
+
+    def __init__(self, retention_seconds: float = 300):
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._channels: Dict[str, _Channel] = {}
+
+    def open(self, channel_id: str):
+        """Create the channel if needed. Re-opening a closed channel resets it."""
+        with self._lock:
+            self._purge_locked()
+            channel = self._channels.get(channel_id)
+            if channel is None or channel.closed_at is not None:
+                self._channels[channel_id] = _Channel()
+
+    def has(self, channel_id: str) -> bool:
+        with self._lock:
+            return channel_id in self._channels
+
+    def publish(self, channel_id: str, event: str, data=None):
+        with self._lock:
+            channel = self._channels.get(channel_id)
+            if channel is None or channel.closed_at is not None:
+                return
+            channel.events.append((event, data))
+            waiters = list(channel.waiters)
+        self._wake(waiters)
+
+    def close(self, channel_id: str):
+        with self._lock:
+            channel = self._channels.get(channel_id)
+            if channel is None or channel.closed_at is not None:
+                return
+            channel.closed_at = time.monotonic()
+            waiters = list(channel.waiters)
+        self._wake(waiters)
+
+    async def subscribe(self, channel_id: str, heartbeat_seconds: float = 15) -> AsyncIterator[Tuple[str, object]]:
+        """Yield (event, data) pairs until the channel closes.
+
+        Emits ("heartbeat", None) when idle so proxies keep the connection open.
+        """
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        waiter = (loop, wake)
+        with self._lock:
+            channel = self._channels.get(channel_id)
+            if channel is None:
+                return
+            channel.waiters.add(waiter)
+
+        sent = 0
+        try:
+            while True:
+                wake.clear()
+                with self._lock:
+                    pending = channel.events[sent:]
+                    closed = channel.closed_at is not None
+                sent += len(pending)
+                for item in pending:
+                    yield item
+                if closed:
+                    return
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ("heartbeat", None)
+        finally:
+            with self._lock:
+                channel.waiters.discard(waiter)
+
+    @staticmethod
+    def _wake(waiters):
+        for loop, wake in waiters:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                pass
+
+    def _purge_locked(self):
+        cutoff = time.monotonic() - self.retention_seconds
+        expired = [
+            cid for cid, ch in self._channels.items()
+            if ch.closed_at is not None and ch.closed_at < cutoff and not ch.waiters
+        ]
+        for cid in expired:
+            del self._channels[cid]
+
+
+def format_sse(event: str, data=None) -> str:
+    """Encode one server-sent event frame. Heartbeats are sent as comments."""
+    if event == "heartbeat":
+        return ": keep-alive\n\n"
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# Live grading progress, keyed by submission trace_id (see workflows.stream_workflow)
+grading_streams = StreamHub()
@@ -0,0 +1,116 @@
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+from app.config import settings
+
+
+class JobQueue:
+    """Bounded pool of background workers with per-job queue position and progress.
+
+    Jobs are keyed by a caller-supplied id (e.g. a submission trace_id). Only
+    scheduling state lives here; the durable record of a job is its DB row.
+    """
+
+    MAX_FINISHED_JOBS = 1000
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._jobs: Dict[str, dict] = {}
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+
+    def submit(self, job_id: str, fn: Callable, *args, **kwargs) -> bool:
+        """Queue a job. Returns False if a job with this id is already queued or running."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and job["state"] in ("queued", "running"):
+                return False
+            self._finished.pop(job_id, None)
+            self._pending[job_id] = None
+            self._jobs[job_id] = {
+                "state": "queued",
+                "stage": "queued",
+                "progress": 0,
+                "error": None,
+                "enqueued_at": datetime.now(timezone.utc).isoformat(),
+                "started_at": None,
+                "finished_at": None,
+            }
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        print(f"[{self.name}] Queued job {job_id} (pending={len(self._pending)})")
+        return True
+
+    def _run(self, job_id: str, fn: Callable, args: tuple, kwargs: dict):
+        with self._lock:
+            self._pending.pop(job_id, None)
+            job = self._jobs[job_id]
+            job["state"] = "running"
+            job["stage"] = "running"
+            job["started_at"] = datetime.now(timezone.utc).isoformat()
+        try:
+            fn(*args, **kwargs)
+            state, error = "done", None
+        except Exception as e:
+            print(f"[{self.name}] Job {job_id} failed: {e}")
+            traceback.print_exc()
+            state, error = "failed", str(e)
+        with self._lock:
+            job["state"] = state
+            job["stage"] = state
+            job["error"] = error
+            if state == "done":
+                job["progress"] = 100
+            job["finished_at"] = datetime.now(timezone.utc).isoformat()
+            self._finished[job_id] = None
+            while len(self._finished) > self.MAX_FINISHED_JOBS:
+                old_id, _ = self._finished.popitem(last=False)
+                self._jobs.pop(old_id, None)
+
+    def set_progress(self, job_id: str, progress: int, stage: Optional[str] = None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return
+            job["progress"] = max(0, min(100, int(progress)))
+            if stage:
+                job["stage"] = stage
+
+    def status(self, job_id: str) -> Optional[dict]:
+        """Snapshot of a job. queue_position is 1-based while queued, 0 once running."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return None
+            position = 0
+            if job["state"] == "queued":
+                position = list(self._pending).index(job_id) + 1
+            return {**job, "queue_position": position, "queue_length": len(self._pending)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            running = sum(1 for j in self._jobs.values() if j["state"] == "running")
+            return {
+                "name": self.name,
+                "workers": self.max_workers,
+                "queued": len(self._pending),
+                "running": running,
+            }
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+# Shared queue for assessment grading (see workflows.submit_workflow)
+grading_queue = JobQueue("GradingQueue", settings.GRADING_WORKERS)
+
+# Phase two of two-phase grading: LLM feedback for already-scored submissions
+feedback_queue = JobQueue("FeedbackQueue", settings.FEEDBACK_WORKERS)
+
+# Background report generation (see reports.generate_report)
+report_queue = JobQueue("ReportQueue", settings.REPORT_WORKERS)
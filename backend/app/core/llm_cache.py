@@ -0,0 +1,186 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from app.config import settings
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU map with optional per-entry expiry."""
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at: Optional[float] = None):
+        if expires_at is None and self.ttl_seconds:
+            expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LLMResponseCache:
+    """Two-tier cache of LLM completions keyed on (model, system, prompt, temperature).
+
+    Tier one is an in-process LRU; tier two is a small SQLite file so hits
+    survive restarts and are shared between worker processes. Both tiers
+    honour the same TTL.
+    """
+
+    def __init__(self, path: Optional[str], max_memory_entries: int, ttl_seconds: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.memory = LRUCache(max_memory_entries)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    @staticmethod
+    def make_key(model: str, system: Optional[str], prompt: str, temperature: float, format=None) -> str:
+        parts = [model, system or "", prompt, round(float(temperature), 3)]
+        if format:
+            parts.append(format)
+        raw = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL,"
+                " created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_expires ON llm_cache (expires_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        row = None
+        try:
+            with self._lock:
+                conn = self._db()
+                if conn is not None:
+                    row = conn.execute(
+                        "SELECT response, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                        (key, time.time()),
+                    ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[LLMCache] Disk tier read failed: {e}")
+
+        if row is None:
+            self._count("misses")
+            return None
+        self.memory.set(key, row[0], expires_at=row[1])
+        self._count("disk_hits")
+        return row[0]
+
+    def set(self, key: str, value: str, model: Optional[str] = None):
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self.memory.set(key, value, expires_at=expires_at)
+        try:
+            with self._lock:
+                self._counters["stores"] += 1
+                conn = self._db()
+                if conn is not None:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, expires_at) VALUES (?, ?, ?, ?, ?)",
+                        (key, model, value, now, expires_at),
+                    )
+                    conn.commit()
+        except sqlite3.Error as e:
+            print(f"[LLMCache] Disk tier write failed: {e}")
+
+    def purge_expired(self) -> int:
+        try:
+            with self._lock:
+                conn = self._db()
+                if conn is None:
+                    return 0
+                cur = conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                conn.commit()
+                return cur.rowcount
+        except sqlite3.Error as e:
+            print(f"[LLMCache] Disk tier purge failed: {e}")
+            return 0
+
+    def clear(self):
+        self.memory.clear()
+        with self._lock:
+            conn = self._db()
+            if conn is not None:
+                conn.execute("DELETE FROM llm_cache")
+                conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            disk_entries = 0
+            try:
+                conn = self._db()
+                if conn is not None:
+                    disk_entries = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            except sqlite3.Error:
+                pass
+        hits = counters["memory_hits"] + counters["disk_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "disk_entries": disk_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+llm_cache = LLMResponseCache(
+    path=settings.LLM_CACHE_PATH or None,
+    max_memory_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+)
@@ -1,25 +1,168 @@
+import asyncio
 import json
+import threading
+import time
+import weakref
+import httpx
 import requests
-from typing import Optional
+from requests.adapters import HTTPAdapter
+from typing import AsyncIterator, Iterator, Optional, Union
 from app.config import settings
+from app.core.llm_cache import llm_cache
+from app.core.circuit_breaker import CircuitBreaker, OPEN
+
+
+class LLMConnectionPool:
+    """Shared keep-alive connection pools to the Ollama server.
+
+    The sync side is one requests.Session whose adapter keeps up to
+    OLLAMA_MAX_CONNECTIONS sockets per host. httpx clients are bound to the
+    event loop they were created on, so the async side keeps one client per
+    loop with the same connection limit (Ollama is a single host, so the
+    client-wide limit is the per-host limit). Clients are keyed weakly by the
+    loop object itself: a loop's id can be reused once it is collected.
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=4,
+                        pool_maxsize=self.max_connections,
+                        pool_block=True,
+                    )
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def async_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                )
+                self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+connection_pool = LLMConnectionPool(settings.OLLAMA_MAX_CONNECTIONS)
 
 
 class OllamaClient:
     """LLM client that calls Ollama API with automatic mock fallback."""
 
-    def __init__(self, base_url: Optional[str] = None):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        pool: Optional[LLMConnectionPool] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
         self.base_url = base_url or settings.OLLAMA_BASE_URL
-        self._available = None
+        self.pool = pool or connection_pool
+        self.timeout = settings.OLLAMA_TIMEOUT_SECONDS
+        self.breaker = breaker or CircuitBreaker(
+            "LLMCircuit",
+            failure_rate_threshold=settings.LLM_BREAKER_FAILURE_RATE,
+            slow_call_seconds=settings.LLM_BREAKER_SLOW_CALL_SECONDS,
+            slow_call_rate_threshold=settings.LLM_BREAKER_SLOW_CALL_RATE,
+            window_size=settings.LLM_BREAKER_WINDOW,
+            min_calls=settings.LLM_BREAKER_MIN_CALLS,
+            open_seconds=settings.LLM_BREAKER_OPEN_SECONDS,
+            probe=self._probe,
+            probe_interval_seconds=settings.LLM_BREAKER_PROBE_INTERVAL_SECONDS,
+        )
+        self._probed = False
 
-    def is_available(self) -> bool:
-        if self._available is not None:
-            return self._available
+    def _probe(self) -> bool:
+        try:
+            resp = self.pool.session().get(f"{self.base_url}/api/tags", timeout=2)
+            return resp.status_code == 200
+        except Exception:
+            return False
+
+    async def _aprobe(self) -> bool:
         try:
-            resp = requests.get(f"{self.base_url}/api/tags", timeout=2)
-            self._available = resp.status_code == 200
+            resp = await self.pool.async_client().get(f"{self.base_url}/api/tags", timeout=2)
+            return resp.status_code == 200
         except Exception:
-            self._available = False
-        return self._available
+            return False
+
+    def _check_startup(self, healthy: bool):
+        self._probed = True
+        if not healthy:
+            self.breaker.trip("Ollama unreachable")
+
+    def is_available(self) -> bool:
+        """False while the circuit is open. The first call probes /api/tags; after that
+        availability follows the breaker, which re-probes in the background."""
+        if not self._probed:
+            self._check_startup(self._probe())
+        return self.breaker.state != OPEN
+
+    async def ais_available(self) -> bool:
+        if not self._probed:
+            self._check_startup(await self._aprobe())
+        return self.breaker.state != OPEN
+
+    def _acquire(self) -> bool:
+        if not self._probed:
+            self._check_startup(self._probe())
+        return self.breaker.allow_request()
+
+    async def _aacquire(self) -> bool:
+        if not self._probed:
+            self._check_startup(await self._aprobe())
+        return self.breaker.allow_request()
+
+    def _build_payload(self, prompt: str, model: Optional[str], system: Optional[str], temperature: float,
+                       format: Union[str, dict, None] = None) -> dict:
+        payload = {
+            "model": model or settings.OLLAMA_MODEL,
+            "prompt": prompt,
+            "temperature": temperature,
+            "stream": False,
+        }
+        if system:
+            payload["system"] = system
+        if format:
+            # "json" or a JSON schema; Ollama constrains decoding to match it
+            payload["format"] = format
+        return payload
+
+    def _cache_key(self, payload: dict, use_cache: bool) -> Optional[str]:
+        if not (use_cache and settings.LLM_CACHE_ENABLED):
+            return None
+        return llm_cache.make_key(
+            payload["model"], payload.get("system"), payload["prompt"], payload["temperature"], payload.get("format")
+        )
 
     def generate(
         self,
@@ -27,34 +170,217 @@ class OllamaClient:
         model: Optional[str] = None,
         system: Optional[str] = None,
         temperature: float = 0.7,
+        use_cache: bool = False,
+        format: Union[str, dict, None] = None,
+    ) -> str:
+        """Blocking completion over the shared keep-alive session.
+
+        With use_cache, identical requests are answered from the response
+        cache; mock fallbacks are never cached.
+        """
+        payload = self._build_payload(prompt, model, system, temperature, format)
+        cache_key = self._cache_key(payload, use_cache)
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        if not self._acquire():
+            return self._mock_response(prompt)
+
+        started = time.monotonic()
+        try:
+            resp = self.pool.session().post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=self.timeout,
+            )
+            resp.raise_for_status()
+            text = resp.json().get("response", "")
+        except Exception as e:
+            self.breaker.record_failure()
+            print(f"[LLM] Ollama error, using mock: {e}")
+            return self._mock_response(prompt)
+        self.breaker.record_success(time.monotonic() - started)
+
+        if cache_key and text:
+            llm_cache.set(cache_key, text, model=payload["model"])
+        return text
+
+    async def agenerate(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system: Optional[str] = None,
+        temperature: float = 0.7,
+        use_cache: bool = False,
+        format: Union[str, dict, None] = None,
     ) -> str:
-        model = model or settings.OLLAMA_MODEL
+        """Async completion; many calls can share one event loop and connection pool."""
+        payload = self._build_payload(prompt, model, system, temperature, format)
+        cache_key = self._cache_key(payload, use_cache)
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                return cached
 
-        if not self.is_available():
+        if not await self._aacquire():
             return self._mock_response(prompt)
 
+        started = time.monotonic()
         try:
-            payload = {
-                "model": model,
-                "prompt": prompt,
-                "temperature": temperature,
-                "stream": False,
-            }
-            if system:
-                payload["system"] = system
-
-            url = f"{self.base_url}/api/generate"
-            
-            resp = requests.post(
-                url,
+            resp = await self.pool.async_client().post(
+                f"{self.base_url}/api/generate",
                 json=payload,
-                timeout=120,
+                timeout=self.timeout,
             )
             resp.raise_for_status()
-            return resp.json().get("response", "")
+            text = resp.json().get("response", "")
         except Exception as e:
+            self.breaker.record_failure()
             print(f"[LLM] Ollama error, using mock: {e}")
             return self._mock_response(prompt)
+        self.breaker.record_success(time.monotonic() - started)
+
+        if cache_key and text:
+            llm_cache.set(cache_key, text, model=payload["model"])
+        return text
+
+    def stream(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system: Optional[str] = None,
+        temperature: float = 0.7,
+        use_cache: bool = False,
+        format: Union[str, dict, None] = None,
+    ) -> Iterator[str]:
+        """Yield completion text as Ollama's NDJSON stream arrives.
+
+        Cache hits and mock fallbacks are yielded as a single chunk. If the
+        stream breaks after some text was delivered it simply ends there.
+        """
+        payload = self._build_payload(prompt, model, system, temperature, format)
+        payload["stream"] = True
+        cache_key = self._cache_key(payload, use_cache)
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        if not self._acquire():
+            yield self._mock_response(prompt)
+            return
+
+        parts = []
+        started = time.monotonic()
+        first_token_at = None
+        settled = False
+        try:
+            with self.pool.session().post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=self.timeout,
+                stream=True,
+            ) as resp:
+                resp.raise_for_status()
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get("response", "")
+                    if token:
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                        parts.append(token)
+                        yield token
+                    if chunk.get("done"):
+                        break
+        except Exception as e:
+            settled = True
+            self.breaker.record_failure()
+            print(f"[LLM] Ollama stream error: {e}")
+            if not parts:
+                yield self._mock_response(prompt)
+            return
+        else:
+            settled = True
+            # Long answers are fine; latency for the breaker is time to first token
+            self.breaker.record_success((first_token_at or time.monotonic()) - started)
+        finally:
+            if not settled:
+                # The consumer stopped reading (e.g. the client disconnected); free the trial slot
+                self.breaker.release()
+
+        if cache_key and parts:
+            llm_cache.set(cache_key, "".join(parts), model=payload["model"])
+
+    async def astream(
+        self,
+        prompt: str,
+        model: Optional[str] = None,
+        system: Optional[str] = None,
+        temperature: float = 0.7,
+        use_cache: bool = False,
+        format: Union[str, dict, None] = None,
+    ) -> AsyncIterator[str]:
+        """Async counterpart of stream()."""
+        payload = self._build_payload(prompt, model, system, temperature, format)
+        payload["stream"] = True
+        cache_key = self._cache_key(payload, use_cache)
+        if cache_key:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        if not await self._aacquire():
+            yield self._mock_response(prompt)
+            return
+
+        parts = []
+        started = time.monotonic()
+        first_token_at = None
+        settled = False
+        try:
+            async with self.pool.async_client().stream(
+                "POST",
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=self.timeout,
+            ) as resp:
+                resp.raise_for_status()
+                async for line in resp.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get("response", "")
+                    if token:
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                        parts.append(token)
+                        yield token
+                    if chunk.get("done"):
+                        break
+        except Exception as e:
+            settled = True
+            self.breaker.record_failure()
+            print(f"[LLM] Ollama stream error: {e}")
+            if not parts:
+                yield self._mock_response(prompt)
+            return
+        else:
+            settled = True
+            # Long answers are fine; latency for the breaker is time to first token
+            self.breaker.record_success((first_token_at or time.monotonic()) - started)
+        finally:
+            if not settled:
+                # The consumer stopped reading (e.g. the client disconnected); free the trial slot
+                self.breaker.release()
+
+        if cache_key and parts:
+            llm_cache.set(cache_key, "".join(parts), model=payload["model"])
 
     def _mock_response(self, prompt: str) -> str:
         prompt_lower = prompt.lower()
@@ -0,0 +1,95 @@
+import threading
+from typing import Dict, Optional
+from app.config import settings
+
+# Task class -> model tier. Each task stays on the model its agent has always used
+# (the grading agents on the code model, the rest on the default model); moving a
+# task to another tier, e.g. the fast model, is an explicit LLM_ROUTE_OVERRIDES change.
+DEFAULT_TASK_TIERS: Dict[str, str] = {
+    "explanation": "code",
+    "quiz_feedback": "code",
+    "assignment_scoring": "code",
+    "code_review": "code",
+    "skill_portrait": "default",
+    "schedule": "default",
+    "risk": "default",
+    "report": "default",
+    "general": "default",
+}
+
+# Tier used when a fast-tier prompt is too long for the small model
+FAST_OVERFLOW_TIER = "default"
+
+
+class ModelRouter:
+    """Pick an Ollama model per (agent, task class, prompt size) and keep per-route latency.
+
+    Overrides (``LLM_ROUTE_OVERRIDES``) map a key to a tier name or a literal
+    model tag. Keys are checked most-specific first: ``"Agent.task"``, then
+    ``"Agent"``, then ``"task"``.
+    """
+
+    def __init__(self, task_tiers: Optional[Dict[str, str]] = None, overrides: Optional[Dict[str, str]] = None,
+                 fast_max_prompt_chars: Optional[int] = None):
+        self.task_tiers = dict(DEFAULT_TASK_TIERS if task_tiers is None else task_tiers)
+        self.overrides = dict(settings.LLM_ROUTE_OVERRIDES if overrides is None else overrides)
+        self.fast_max_prompt_chars = (
+            settings.LLM_FAST_MAX_PROMPT_CHARS if fast_max_prompt_chars is None else fast_max_prompt_chars
+        )
+        self._lock = threading.Lock()
+        self._routes: Dict[str, dict] = {}
+
+    @staticmethod
+    def tier_models() -> Dict[str, str]:
+        return {
+            "fast": settings.OLLAMA_FAST_MODEL,
+            "default": settings.OLLAMA_MODEL,
+            "code": settings.OLLAMA_CODE_MODEL,
+        }
+
+    def resolve(self, task: Optional[str], agent: Optional[str] = None, prompt: str = "") -> str:
+        task = task or "general"
+        choice = None
+        for key in (f"{agent}.{task}" if agent else None, agent, task):
+            if key and key in self.overrides:
+                choice = self.overrides[key]
+                break
+        if choice is None:
+            choice = self.task_tiers.get(task, "default")
+        if choice == "fast" and len(prompt) > self.fast_max_prompt_chars:
+            choice = FAST_OVERFLOW_TIER
+        return self.tier_models().get(choice, choice)
+
+    def record(self, agent: Optional[str], task: Optional[str], model: str, duration: float):
+        key = f"{agent or '-'}.{task or 'general'}"
+        ms = duration * 1000
+        with self._lock:
+            route = self._routes.setdefault(key, {"model": model, "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            route["model"] = model
+            route["calls"] += 1
+            route["total_ms"] += ms
+            route["max_ms"] = max(route["max_ms"], ms)
+            route["last_ms"] = ms
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {
+                key: {
+                    "model": r["model"],
+                    "calls": r["calls"],
+                    "avg_ms": round(r["total_ms"] / r["calls"], 1),
+                    "max_ms": round(r["max_ms"], 1),
+                    "last_ms": round(r["last_ms"], 1),
+                }
+                for key, r in self._routes.items()
+            }
+        return {
+            "tiers": self.tier_models(),
+            "task_tiers": self.task_tiers,
+            "overrides": self.overrides,
+            "fast_max_prompt_chars": self.fast_max_prompt_chars,
+            "routes": routes,
+        }
+
+
+model_router = ModelRouter()
@@ -0,0 +1,238 @@
+import multiprocessing
+import os
+import threading
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, TimeoutError as FutureTimeout, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from app.config import settings
+
+REPORT = "report"            # {"title", "content"} -> fpdf2 report (app/utils/pdf_generator.py)
+SUBMISSION = "submission"    # {"submission_data", "fresher_name", "assessment_title"} -> reportlab
+PERFORMANCE = "performance"  # {"fresher_data", "analytics_data"} -> reportlab
+KINDS = (REPORT, SUBMISSION, PERFORMANCE)
+
+
+# ---- worker side: runs in the pool processes (or inline when the pool is disabled) ----
+
+def _warm():
+    """Import both layout engines and build the reportlab styles once per worker."""
+    import app.utils.pdf_generator  # noqa: F401
+    import app.utils.pdf_generator_v2  # noqa: F401
+
+
+def _render_bytes(kind: str, payload: dict) -> bytes:
+    if kind == REPORT:
+        from app.utils.pdf_generator import generate_pdf_report
+        return bytes(generate_pdf_report(payload["title"], payload["content"]))
+    from app.utils.pdf_generator_v2 import pdf_generator
+    if kind == SUBMISSION:
+        buffer = pdf_generator.generate_submission_pdf(
+            payload["submission_data"], payload["fresher_name"], payload["assessment_title"]
+        )
+    elif kind == PERFORMANCE:
+        buffer = pdf_generator.generate_performance_report_pdf(payload["fresher_data"], payload["analytics_data"])
+    else:
+        raise ValueError(f"Unknown PDF kind: {kind}")
+    return buffer.getvalue()
+
+
+def _render_file(kind: str, payload: dict, path: str) -> int:
+    # Written by the worker so large PDFs never cross the process boundary
+    data = _render_bytes(kind, payload)
+    with open(path, "wb") as f:
+        f.write(data)
+    return len(data)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+# ---- parent side ----
+
+class PDFRenderer:
+    """Renders PDFs in a pool of worker processes so layout work stays off the API's GIL.
+
+    Payloads are plain JSON-like dicts tagged with a kind (see KINDS). Workers
+    are spawned (not forked from the threaded server), import fonts and styles
+    once, and are pre-warmed by ``start()``. A crashed pool is replaced and the
+    render retried once; a render that exceeds ``timeout_seconds`` fails and
+    its pool is killed and replaced so a hung worker cannot hold a slot. With
+    ``workers=0`` everything renders in-process.
+    """
+
+    def __init__(self, workers: int, timeout_seconds: float):
+        self.workers = max(0, workers)
+        self.timeout_seconds = timeout_seconds
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {"renders": 0, "failures": 0, "restarts": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PDF renderer is shut down")
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm,
+                )
+            return self._pool
+
+    def start(self):
+        """Spawn and warm the workers; on failure the pool is created again on first render."""
+        if not self.workers:
+            return
+        pool = self._executor()
+        try:
+            # One task per worker so every process is spawned and has run _warm
+            for future in [pool.submit(_ping) for _ in range(self.workers)]:
+                future.result(timeout=self.timeout_seconds)
+        except Exception as e:
+            self._reset(pool, f"failed to start ({e!r})")
+            return
+        print(f"[PDFRenderer] ✓ {self.workers} workers ready")
+
+    def _reset(self, pool: ProcessPoolExecutor, reason: str = "crashed"):
+        """Replace ``pool``, killing its workers so a hung render does not keep a process busy."""
+        with self._lock:
+            if self._pool is not pool:
+                return  # already replaced by another caller
+            self._pool = None
+            self._stats["restarts"] += 1
+        # ProcessPoolExecutor has no public way to stop a running task before Python 3.14
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            if process.is_alive():
+                process.kill()
+        pool.shutdown(wait=False, cancel_futures=True)
+        print(f"[PDFRenderer] ⚠ Worker pool {reason}; restarting")
+
+    def _call(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        for attempt in range(2):
+            pool = self._executor()
+            future = pool.submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout_seconds)
+            except FutureTimeout:
+                future.cancel()
+                self._reset(pool, f"timed out after {self.timeout_seconds:g}s")
+                raise TimeoutError(f"PDF render exceeded {self.timeout_seconds:g}s")
+            except BrokenProcessPool:
+                self._reset(pool)
+                if attempt:
+                    raise
+
+    def _count(self, ok: bool, n: int = 1):
+        with self._lock:
+            self._stats["renders" if ok else "failures"] += n
+
+    def render(self, kind: str, payload: dict) -> bytes:
+        try:
+            data = self._call(_render_bytes, kind, payload)
+        except Exception:
+            self._count(False)
+            raise
+        self._count(True)
+        return data
+
+    def render_to_file(self, kind: str, payload: dict, path: str) -> str:
+        """Render straight to ``path`` (written by the worker). Returns ``path``."""
+        try:
+            self._call(_render_file, kind, payload, path)
+        except Exception:
+            self._count(False)
+            raise
+        self._count(True)
+        return path
+
+    def render_many(self, jobs: Sequence[Tuple[str, dict]]) -> List[bytes]:
+        """Render ``(kind, payload)`` jobs across all workers; results in job order."""
+        results: List[Optional[bytes]] = [None] * len(jobs)
+        for index, data in self.render_iter(jobs, window=len(jobs)):
+            results[index] = data
+        return results
+
+    def render_iter(
+        self, jobs: Iterable[Tuple[str, dict]], window: Optional[int] = None, return_exceptions: bool = False
+    ) -> Iterator[Tuple[int, Union[bytes, Exception]]]:
+        """Yield ``(index, pdf)`` as renders finish, with at most ``window`` jobs in flight.
+
+        ``jobs`` is consumed lazily, so a large batch holds only ``window``
+        payloads and PDFs in memory at a time. By default the first failed
+        render raises; with ``return_exceptions`` it is yielded as
+        ``(index, exception)`` and the batch carries on, on a fresh pool if
+        the old one crashed or hung.
+        """
+        jobs = enumerate(jobs)
+        if not self.workers:
+            for index, (kind, payload) in jobs:
+                try:
+                    result = self.render(kind, payload)
+                except Exception as e:
+                    if not return_exceptions:
+                        raise
+                    result = e
+                yield index, result
+            return
+        window = max(1, window or self.workers * 2)
+        pending = {}  # future -> (index, pool it was submitted to)
+
+        def fill():
+            for index, (kind, payload) in itertools.islice(jobs, window - len(pending)):
+                pool = self._executor()
+                pending[pool.submit(_render_bytes, kind, payload)] = (index, pool)
+
+        try:
+            fill()
+            while pending:
+                done, _ = wait(pending, timeout=self.timeout_seconds, return_when=FIRST_COMPLETED)
+                if not done:
+                    error = TimeoutError(f"PDF render exceeded {self.timeout_seconds:g}s")
+                    for pool in {pool for _, pool in pending.values()}:
+                        self._reset(pool, f"timed out after {self.timeout_seconds:g}s")
+                    self._count(False, len(pending))
+                    if not return_exceptions:
+                        raise error
+                    stalled = sorted(index for index, _ in pending.values())
+                    pending.clear()
+                    for index in stalled:
+                        yield index, error
+                    fill()
+                    continue
+                for future in done:
+                    index, pool = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        if isinstance(e, BrokenProcessPool):
+                            self._reset(pool)
+                        self._count(False)
+                        if not return_exceptions:
+                            raise
+                        result = e
+                    else:
+                        self._count(True)
+                    yield index, result
+                fill()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"workers": self.workers, "running": self._pool is not None, **self._stats}
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+pdf_renderer = PDFRenderer(settings.PDF_RENDER_WORKERS, settings.PDF_RENDER_TIMEOUT_SECONDS)
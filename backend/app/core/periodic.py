@@ -0,0 +1,36 @@
+import threading
+import traceback
+from typing import Callable, Optional
+
+
+class PeriodicTask:
+    """Runs ``fn()`` on a daemon thread every ``interval_seconds`` until stopped.
+
+    The first run happens right after start(). Exceptions are logged and the
+    schedule continues.
+    """
+
+    def __init__(self, name: str, interval_seconds: float, fn: Callable[[], None]):
+        self.name = name
+        self.interval_seconds = interval_seconds
+        self.fn = fn
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is not None or self.interval_seconds <= 0:
+            return
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.fn()
+            except Exception as e:
+                print(f"[{self.name}] ✗ Run failed: {e}")
+                traceback.print_exc()
+            self._stop.wait(self.interval_seconds)
+
+    def stop(self):
+        self._stop.set()
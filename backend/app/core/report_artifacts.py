@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from typing import Optional, Tuple
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from app.config import settings
+from app.core.pdf_renderer import REPORT, pdf_renderer
+
+# Bump when generate_pdf_report changes its output so old artifacts are re-rendered
+RENDERER_VERSION = "1"
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def report_data(report) -> dict:
+    """``Report.content`` as a dict, tolerating legacy non-JSON content."""
+    try:
+        data = json.loads(report.content) if isinstance(report.content, str) else report.content
+        return data if isinstance(data, dict) else {"summary": str(data)}
+    except Exception as e:
+        print(f"[ERROR] JSON parse error for report {report.id}: {e}")
+        return {"summary": "Error parsing report content."}
+
+
+class ReportArtifactStore:
+    """Rendered report PDFs on disk, addressed by report id and content hash.
+
+    Report content is immutable once stored, so a PDF is rendered once (at
+    generation time or on first download) and every later download streams
+    the file. The hash doubles as the download ETag.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._locks = [threading.Lock() for _ in range(32)]
+
+    def digest(self, report) -> str:
+        h = hashlib.sha256()
+        for part in (RENDERER_VERSION, report.title or "", report.content or ""):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()[:32]
+
+    def path_for(self, report_id: int, digest: str) -> str:
+        return os.path.join(self.root, f"report-{report_id}-{digest}.pdf")
+
+    def ensure_pdf(self, report) -> Tuple[str, str]:
+        """Return (path, digest) of ``report``'s PDF, rendering it if missing."""
+        digest = self.digest(report)
+        path = self.path_for(report.id, digest)
+        if os.path.exists(path):
+            return path, digest
+        with self._locks[report.id % len(self._locks)]:
+            if not os.path.exists(path):
+                self._render(report, path)
+                self._drop_stale(report.id, path)
+        return path, digest
+
+    def _render(self, report, path: str):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        try:
+            pdf_renderer.render_to_file(REPORT, {"title": report.title, "content": report_data(report)}, tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        print(f"[Artifacts] ✓ Rendered report {report.id} PDF ({os.path.getsize(path)} bytes)")
+
+    def _drop_stale(self, report_id: int, keep: str):
+        prefix = f"report-{report_id}-"
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.startswith(prefix) and name.endswith(".pdf") and path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def remove(self, report_id: int):
+        if os.path.isdir(self.root):
+            self._drop_stale(report_id, keep="")
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) for a single ``bytes=`` range; None to serve the whole file."""
+    match = _RANGE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start, end = int(first), int(last) if last else size - 1
+    else:
+        start, end = max(size - int(last), 0), size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+def _iter_file(path: str, start: int, length: int, chunk_size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_download(path: str, digest: str, filename: str, request_headers, media_type: str = "application/pdf") -> Response:
+    """Stream ``path`` honouring ``If-None-Match`` and single ``Range`` requests."""
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "private, max-age=0, must-revalidate"}
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = request_headers.get("range")
+    if_range = request_headers.get("if-range")
+    span = _parse_range(range_header, size) if range_header and (not if_range or if_range == etag) else None
+    if span is None:
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+    start, end = span
+    headers.update({
+        "Content-Range": f"bytes {start}-{end}/{size}",
+        "Content-Length": str(end - start + 1),
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    })
+    return StreamingResponse(_iter_file(path, start, end - start + 1), status_code=206,
+                             media_type=media_type, headers=headers)
+
+
+report_artifacts = ReportArtifactStore(settings.REPORT_ARTIFACT_DIR)
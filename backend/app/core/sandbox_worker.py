@@ -0,0 +1,228 @@
+"""Code-challenge worker process, spawned by app.core.code_sandbox.
+
+Runs as a standalone script (``python -I -S sandbox_worker.py <limits>``) and
+imports nothing from the app. Each process serves one request, sent on stdin
+as a length-prefixed task (code, entry point, inputs) followed by a line of
+expected outputs. The worker reads the task, forks a child that drops the
+protocol pipes, applies the resource limits and runs the submission, and only
+then reads the expected outputs, so the submission never sees them. The child
+reports raw return values over a private pipe; this parent compares them and
+writes the header line and one JSON line per test case to stdout.
+
+This bounds CPU, memory and file writes and keeps grading out of the
+submission's reach; it is not a full security boundary.
+"""
+import ast
+import json
+import os
+import signal
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Non-POSIX: only the parent's wall-clock limit applies
+    resource = None
+
+MAX_OUTPUT_CHARS = 2000
+# Longest return value the child reports; longer ones cannot match any expected output
+MAX_ACTUAL_CHARS = 1_000_000
+
+
+def _apply_limits(limits: dict):
+    """Limits for the child that runs the submission."""
+    if resource is None:
+        return
+    memory = int(limits.get("memory_mb", 256)) * 1024 * 1024
+    cpu = int(limits.get("cpu_seconds", 5))
+    for name, value in (
+        ("RLIMIT_AS", (memory, memory)),
+        ("RLIMIT_CPU", (cpu, cpu + 1)),
+        ("RLIMIT_FSIZE", (0, 0)),
+        ("RLIMIT_NPROC", (0, 0)),
+        ("RLIMIT_CORE", (0, 0)),
+    ):
+        try:
+            resource.setrlimit(getattr(resource, name), value)
+        except (AttributeError, ValueError, OSError):
+            pass
+
+
+def _parse_input(raw):
+    if not isinstance(raw, str):
+        return raw
+    try:
+        if raw.strip().startswith("["):
+            return ast.literal_eval(raw)
+        return int(raw) if raw.isdigit() else raw
+    except Exception:
+        return raw
+
+
+def _entry_point(namespace: dict, name=None):
+    """The named function, else the first public function the submission itself
+    defines, else the first public callable of any kind (e.g. an imported one)."""
+    if name and callable(namespace.get(name)):
+        return namespace[name]
+    public = [(key, value) for key, value in namespace.items() if callable(value) and not key.startswith("_")]
+    for _, value in public:
+        code = getattr(value, "__code__", None)
+        if code is not None and code.co_filename == "<submission>":
+            return value
+    return public[0][1] if public else None
+
+
+def _run(task: dict, emit):
+    """Child side: run the submission and report raw results, never pass/fail."""
+    try:
+        code = compile(task.get("code") or "", "<submission>", "exec")
+        namespace = {"__name__": "__submission__"}
+        exec(code, namespace)
+    except BaseException as e:
+        emit({"error": str(e) or type(e).__name__})
+        return
+    func = _entry_point(namespace, task.get("entry_point"))
+    if func is None:
+        emit({"error": "No callable function defined in code", "actual": "No function found"})
+        return
+    emit({"error": None})
+
+    # Inputs are parsed up front so timings cover only the call itself
+    inputs = [_parse_input(value) for value in task.get("inputs") or []]
+    clock = time.perf_counter
+    for value in inputs:
+        started = clock()
+        try:
+            actual = func(value)
+            elapsed = clock() - started
+            emit({"actual": str(actual)[:MAX_ACTUAL_CHARS], "duration_ms": round(elapsed * 1000, 3)})
+        except BaseException as e:
+            emit({
+                "exception": (str(e) or type(e).__name__)[:MAX_OUTPUT_CHARS],
+                "duration_ms": round((clock() - started) * 1000, 3),
+            })
+
+
+def _grade(record: dict, expected: str) -> dict:
+    """Parent side: turn one child record into a test outcome."""
+    duration = record.get("duration_ms")
+    duration = round(float(duration), 3) if isinstance(duration, (int, float)) else None
+    if "exception" in record:
+        return {"passed": False, "actual": "Error", "error": str(record["exception"])[:MAX_OUTPUT_CHARS], "duration_ms": duration}
+    actual = str(record.get("actual"))
+    passed = actual == expected
+    return {
+        "passed": passed,
+        "actual": actual[:MAX_OUTPUT_CHARS],
+        "error": None if passed else f"Expected {expected}, got {actual}"[:MAX_OUTPUT_CHARS],
+        "duration_ms": duration,
+    }
+
+
+def _read_line(fd: int) -> bytes:
+    # Byte at a time so nothing past the newline is pulled into this process
+    data = b""
+    while not data.endswith(b"\n"):
+        chunk = os.read(fd, 1)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _read_exact(fd: int, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = os.read(fd, size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def _not_dumpable():
+    """Stop the child (same uid) from ptracing this process or reading its memory."""
+    try:
+        import ctypes
+        ctypes.CDLL(None).prctl(4, 0, 0, 0, 0)  # PR_SET_DUMPABLE
+    except Exception:
+        pass
+
+
+def _child(task: dict, result_fd: int, limits: dict):
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+    _apply_limits(limits)
+    out = os.fdopen(result_fd, "w")
+
+    def emit(record):
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    _run(task, emit)
+
+
+def main():
+    limits = json.loads(sys.argv[1]) if len(sys.argv) > 1 else {}
+    _not_dumpable()
+    if resource is not None:
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    header = _read_line(0)
+    if not header.strip():
+        return
+    task = json.loads(_read_exact(0, int(header)))
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            _child(task, write_fd, limits)
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    del task
+
+    # Read only after the fork: the expected outputs never exist in the child
+    expected = [str(value) for value in json.loads(_read_line(0) or b"[]")]
+    results = os.fdopen(read_fd, "r")
+    out = sys.stdout
+
+    def emit(record):
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    def next_record():
+        line = results.readline(MAX_ACTUAL_CHARS * 2)
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return None  # Child died mid-write or sent garbage
+        return record if isinstance(record, dict) else None
+
+    first = next_record()
+    if first is not None:
+        if first.get("error"):
+            emit({"error": str(first["error"])[:MAX_OUTPUT_CHARS], "actual": str(first.get("actual", "Error"))[:MAX_OUTPUT_CHARS]})
+        else:
+            emit({"error": None})
+            for value in expected:
+                record = next_record()
+                if record is None:
+                    break
+                emit(_grade(record, value))
+    results.close()
+
+    _, status = os.waitpid(pid, 0)
+    code = os.waitstatus_to_exitcode(status)
+    if code < 0:
+        # Die by the child's signal so the pool can tell a CPU-limit kill from a crash
+        signal.signal(-code, signal.SIG_DFL)
+        os.kill(os.getpid(), -code)
+    sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
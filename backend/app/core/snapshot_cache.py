@@ -0,0 +1,93 @@
+import threading
+from typing import Any, Callable, Dict, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.llm_cache import LRUCache
+from app.models.analytics import TrendRollup
+from app.models.assessment import Assessment, Submission
+from app.models.fresher import Fresher, Skill
+from app.models.report import Alert, Report
+from app.models.schedule import ScheduleItem
+from app.models.user import User
+
+
+class SnapshotCache:
+    """Short-lived cache for expensive read models (e.g. the manager dashboard).
+
+    Entries expire after ``ttl_seconds`` and are dropped as soon as any session
+    commits a change to one of the ``watch`` models, so a snapshot is never
+    staler than the TTL and usually fresher. ORM ``query(...).update/delete``
+    statements are caught too; ``bulk_*_mappings`` writes bypass session
+    events, so their callers call invalidate() after committing.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, watch: Tuple[type, ...], max_entries: int = 64):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.watch = tuple(watch)
+        self._entries = LRUCache(max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "do_orm_execute", self._on_execute)
+        event.listen(Session, "after_commit", self._after_commit)
+
+    def get_or_build(self, key, builder: Callable[[], Any]) -> Any:
+        if self.ttl_seconds <= 0:
+            return builder()
+        value = self._entries.get(key)
+        if value is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+            return value
+        with self._lock:
+            self._stats["misses"] += 1
+            generation = self._generation
+        value = builder()
+        with self._lock:
+            # Don't store a snapshot that an invalidation raced past
+            if generation == self._generation:
+                self._entries.set(key, value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._stats["invalidations"] += 1
+        self._entries.clear()
+
+    def _after_flush(self, session, flush_context):
+        if session.info.get(self._flag):
+            return
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, self.watch):
+                session.info[self._flag] = True
+                return
+
+    def _on_execute(self, state):
+        if (state.is_update or state.is_delete) and any(
+            issubclass(mapper.class_, self.watch) for mapper in state.all_mappers
+        ):
+            state.session.info[self._flag] = True
+
+    def _after_commit(self, session):
+        if session.info.pop(self._flag, False):
+            self.invalidate()
+
+    @property
+    def _flag(self) -> str:
+        return f"snapshot_dirty:{self.name}"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"name": self.name, "ttl_seconds": self.ttl_seconds, "entries": len(self._entries), **self._stats}
+
+
+# Manager dashboard (analytics.get_dashboard) and department stats
+dashboard_snapshots = SnapshotCache(
+    "Dashboard",
+    ttl_seconds=settings.DASHBOARD_CACHE_TTL_SECONDS,
+    watch=(Fresher, User, Skill, Alert, Report, Submission, Assessment, ScheduleItem, TrendRollup),
+)
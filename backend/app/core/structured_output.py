@@ -0,0 +1,185 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional, Type
+from pydantic import BaseModel, ValidationError
+from app.config import settings
+
+
+class JSONStreamParser:
+    """Incremental, tolerant extractor for the first JSON object in LLM output.
+
+    Text is fed in chunks (stream tokens or one full response) and scanned once.
+    Anything before the first ``{`` (prose, markdown fences) and after the
+    matching ``}`` is ignored; trailing commas are dropped as they are seen.
+    If the output stops early, result() closes open strings and brackets and,
+    failing that, rolls back to the last complete member.
+    """
+
+    MAX_ROLLBACKS = 8
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._stack: List[str] = []
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._complete = False
+        # (buffer length, open brackets) just before each structural comma
+        self._safe_points: List[tuple] = []
+        self.repaired = False
+
+    @property
+    def complete(self) -> bool:
+        return self._complete
+
+    def feed(self, chunk: str):
+        if self._complete or not chunk:
+            return
+        buf, stack = self._buf, self._stack
+        for ch in chunk:
+            if not self._started:
+                if ch != "{":
+                    continue
+                self._started = True
+            if self._in_string:
+                buf.append(ch)
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                stack.append(ch)
+            elif ch in "}]":
+                while buf and buf[-1].isspace():
+                    buf.pop()
+                if buf and buf[-1] == ",":
+                    buf.pop()
+                if stack:
+                    stack.pop()
+                buf.append(ch)
+                if not stack:
+                    self._complete = True
+                    return
+                continue
+            elif ch == ",":
+                self._safe_points.append((len(buf), tuple(stack)))
+            buf.append(ch)
+
+    def result(self) -> Optional[Any]:
+        """Parsed value, repairing truncated output if needed; None if nothing usable."""
+        if not self._started:
+            return None
+        text = "".join(self._buf)
+        if self._complete:
+            try:
+                return json.loads(text)
+            except ValueError:
+                pass
+
+        # Truncated: close the open string and brackets as they stand
+        head = text
+        if self._in_string:
+            if self._escape:
+                head = head[:-1]
+            head += '"'
+        head = head.rstrip().rstrip(",").rstrip()
+        if head.endswith(":"):
+            head += " null"
+        candidate = self._close(head, self._stack)
+        try:
+            value = json.loads(candidate)
+            self.repaired = True
+            return value
+        except ValueError:
+            pass
+
+        # Roll back to the last member that was complete
+        for length, stack in reversed(self._safe_points[-self.MAX_ROLLBACKS:]):
+            try:
+                value = json.loads(self._close(text[:length], stack))
+                self.repaired = True
+                return value
+            except ValueError:
+                continue
+        return None
+
+    @staticmethod
+    def _close(text: str, stack) -> str:
+        return text + "".join("}" if b == "{" else "]" for b in reversed(stack))
+
+
+def parse_json(text: str) -> Optional[Any]:
+    """One-shot tolerant parse of the first JSON object in ``text``."""
+    parser = JSONStreamParser()
+    parser.feed(text or "")
+    return parser.result()
+
+
+class StructuredOutputMetrics:
+    """Per-schema counters for structured LLM output (exposed at /agents/structured-output)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, outcome: str):
+        with self._lock:
+            counts = self._counts.setdefault(
+                name, {"calls": 0, "ok": 0, "repaired": 0, "json_failures": 0, "validation_failures": 0}
+            )
+            counts["calls"] += 1
+            counts[outcome] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            schemas = {name: dict(c) for name, c in self._counts.items()}
+        total = sum(c["calls"] for c in schemas.values())
+        failed = sum(c["json_failures"] + c["validation_failures"] for c in schemas.values())
+        for c in schemas.values():
+            c["failure_rate"] = round((c["json_failures"] + c["validation_failures"]) / c["calls"], 3)
+        return {
+            "calls": total,
+            "failures": failed,
+            "failure_rate": round(failed / total, 3) if total else 0.0,
+            "schemas": schemas,
+        }
+
+
+structured_metrics = StructuredOutputMetrics()
+
+
+def validate_output(parser: JSONStreamParser, schema: Type[BaseModel], name: Optional[str] = None) -> Optional[dict]:
+    """Validate a fed parser's result against ``schema``; returns a plain dict or None.
+
+    Keys the model omitted stay omitted (rather than filled with schema defaults)
+    so callers' existing ``.get(key, fallback)`` defaults keep applying.
+    """
+    name = name or schema.__name__
+    data = parser.result()
+    if not isinstance(data, dict):
+        structured_metrics.record(name, "json_failures")
+        print(f"[StructuredOutput] ✗ {name}: no parseable JSON object")
+        return None
+    try:
+        value = schema.model_validate(data).model_dump(exclude_unset=True)
+    except ValidationError as e:
+        structured_metrics.record(name, "validation_failures")
+        print(f"[StructuredOutput] ✗ {name}: {e.error_count()} validation error(s)")
+        return None
+    structured_metrics.record(name, "repaired" if parser.repaired else "ok")
+    return value
+
+
+def request_format(schema: Type[BaseModel]):
+    """Value for Ollama's ``format`` field per LLM_STRUCTURED_FORMAT ("json", "schema" or off)."""
+    mode = (settings.LLM_STRUCTURED_FORMAT or "").lower()
+    if mode == "schema":
+        return schema.model_json_schema()
+    if mode == "json":
+        return "json"
+    return None
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
@@ -23,13 +23,44 @@ def get_db():
 
 def create_tables():
     from app.models import (
-        User, Fresher, Skill, Achievement,
+        User, Fresher, Skill, Achievement, SkillScoreAggregate,
         Schedule, ScheduleItem,
         Assessment, Submission,
         Curriculum, Report, Alert,
     )
     from app.models.badge import Badge, FresherBadge
     from app.models.schedule_assessment import AssessmentSchedule
-    from app.models.analytics import PerformanceAnalytics
+    from app.models.analytics import PerformanceAnalytics, TrendRollup
     from app.models.certification import Certification, AssignmentHistory
+    from app.models.event import OutboxEvent, OutboxDelivery
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _add_missing_indexes()
+
+
+def _add_missing_columns():
+    """create_all() never alters existing tables; add columns introduced since a DB was created.
+
+    Only plain nullable columns are handled, which is all new model fields use.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}'))
+                print(f"[DB] Added column {table.name}.{column.name}")
+
+
+def _add_missing_indexes():
+    """create_all() skips indexes on tables that already exist; create any declared since."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
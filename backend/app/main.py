@@ -63,5 +63,69 @@ async def startup():
     finally:
         db.close()
 
+    if settings.LLM_CACHE_ENABLED:
+        from app.core.llm_cache import llm_cache
+        purged = llm_cache.purge_expired()
+        if purged:
+            print(f"[OK] Purged {purged} expired LLM cache entries")
+
+    # Post-grading subscribers must be registered before anything publishes
+    from app.core.event_bus import event_bus
+    from app.agents.post_grading import register_subscribers
+    from app.agents import notifications, trends
+    register_subscribers(event_bus)
+    trends.register_subscribers(event_bus)
+    notifications.register_subscribers(event_bus)
+    event_bus.recover()
+
+    db = SessionLocal()
+    try:
+        trends.ensure_backfilled(db)
+    finally:
+        db.close()
+
+    from app.agents.analytics_agent import cohort_rank_refresher
+    from app.agents.risk_engine import risk_refresher
+    cohort_rank_refresher.start()
+    risk_refresher.start()
+
+    # Pick up submissions that were still grading when the last process stopped
+    from app.api.routes.workflows import resume_pending_grading
+    resume_pending_grading()
+
+    from app.api.routes.reports import resume_pending_reports
+    resume_pending_reports()
+
+    from app.core.code_sandbox import code_sandbox
+    code_sandbox.start()
+
+    from app.core.pdf_renderer import pdf_renderer
+    pdf_renderer.start()
+
     print("[READY] MaverickAI API ready at http://localhost:8000")
     print("[DOCS] Swagger docs at http://localhost:8000/docs")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    from app.core.job_queue import grading_queue, feedback_queue, report_queue
+    from app.core.llm_client import connection_pool, llm_client
+    from app.core.code_sandbox import code_sandbox
+    from app.core.pdf_renderer import pdf_renderer
+    from app.core.event_bus import event_bus
+    from app.agents import notifications
+    from app.agents.analytics_agent import cohort_rank_refresher
+    from app.agents.risk_engine import risk_refresher
+    cohort_rank_refresher.stop()
+    risk_refresher.stop()
+    grading_queue.shutdown(wait=False)
+    feedback_queue.shutdown(wait=False)
+    report_queue.shutdown(wait=False)
+    event_bus.shutdown()
+    notifications.close()
+    code_sandbox.shutdown()
+    pdf_renderer.shutdown()
+    llm_client.breaker.shutdown()
+    await connection_pool.aclose()
+    connection_pool.close()
+    print("[STOP] MaverickAI Backend stopped")
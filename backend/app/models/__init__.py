@@ -1,10 +1,11 @@
 from app.models.user import User
-from app.models.fresher import Fresher, Skill, Achievement
+from app.models.fresher import Fresher, Skill, Achievement, SkillScoreAggregate
 from app.models.schedule import Schedule, ScheduleItem
 from app.models.assessment import Assessment, Submission
 from app.models.curriculum import Curriculum
 from app.models.report import Report, Alert
 from app.models.badge import Badge, FresherBadge
 from app.models.schedule_assessment import AssessmentSchedule
-from app.models.analytics import PerformanceAnalytics
+from app.models.analytics import PerformanceAnalytics, TrendRollup
 from app.models.certification import Certification, AssignmentHistory
+from app.models.event import OutboxEvent, OutboxDelivery
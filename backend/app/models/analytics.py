@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -41,7 +41,33 @@ class PerformanceAnalytics(Base):
     # Comparison data
     cohort_rank = Column(Integer, nullable=True)
     cohort_percentile = Column(Float, nullable=True)
+
+    # Running sums behind the columns above (see AnalyticsAgent.apply_graded_submission)
+    materialized_state = Column(JSON, nullable=True)
     
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     fresher = relationship("Fresher", back_populates="performance_analytics")
+
+
+class TrendRollup(Base):
+    """Activity pre-bucketed per (granularity, bucket, department, cohort); see app/agents/trends.py."""
+    __tablename__ = "trend_rollups"
+    # Also serves as the (granularity, bucket_start) index trend queries scan
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "department", "cohort", name="uq_trend_rollup"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(8), nullable=False)  # day, week
+    bucket_start = Column(String(10), nullable=False)  # ISO date; weeks start on Monday
+    department = Column(String, nullable=False)
+    cohort = Column(String, nullable=False)  # fresher join month, YYYY-MM
+
+    submissions = Column(Integer, default=0)  # graded submissions
+    score_total = Column(Float, default=0)
+    passed = Column(Integer, default=0)
+    items_completed = Column(Integer, default=0)  # completed schedule items
+    active_freshers = Column(Integer, default=0)  # distinct freshers with any of the above
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
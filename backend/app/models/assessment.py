@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, ForeignKey, Index, func
 from app.database import Base
 
 
@@ -27,10 +27,13 @@ class Assessment(Base):
     available_from = Column(String, nullable=True)
     available_until = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 
 class Submission(Base):
     __tablename__ = "submissions"
+    # Last-N attempts per (user, assessment), see ReportingAgent._recent_attempts
+    __table_args__ = (Index("ix_submissions_recent_attempts", "user_id", "assessment_id", "submitted_at"),)
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     assessment_id = Column(Integer, ForeignKey("assessments.id"), nullable=False, index=True)
@@ -40,10 +43,14 @@ class Submission(Base):
     language = Column(String, nullable=True)
     answers = Column(Text, nullable=True)  # JSON string
     score = Column(Float, nullable=True)
+    aggregated_score = Column(Float, nullable=True)  # score currently counted in SkillScoreAggregate
+    in_analytics = Column(Boolean, nullable=True)  # already folded into PerformanceAnalytics
+    trend_day = Column(String, nullable=True)  # day bucket the submission is counted in (TrendRollup)
     max_score = Column(Integer, default=100)
     passing_score = Column(Integer, default=60)
     pass_status = Column(String, nullable=True)  # pass, fail
     status = Column(String, default="pending")  # pending, grading, graded, completed, failed
+    feedback_status = Column(String, nullable=True)  # pending, ready, failed (two-phase grading)
     feedback = Column(Text, nullable=True)  # JSON string
     test_results = Column(Text, nullable=True)  # JSON string
     trace_id = Column(String, nullable=True, index=True)
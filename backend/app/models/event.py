@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, UniqueConstraint, func
+from app.database import Base
+
+
+class OutboxEvent(Base):
+    """A domain event recorded for asynchronous subscribers (see app/core/event_bus.py)."""
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    event_type = Column(String, nullable=False, index=True)  # e.g. submission.graded
+    dedupe_key = Column(String, nullable=False, unique=True)  # publishing the same key twice is a no-op
+    payload = Column(Text, nullable=False)  # JSON string
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class OutboxDelivery(Base):
+    """Delivery state of one event to one subscriber."""
+    __tablename__ = "outbox_deliveries"
+    __table_args__ = (UniqueConstraint("event_id", "subscriber", name="uq_outbox_delivery"),)
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    event_id = Column(Integer, ForeignKey("outbox_events.id"), nullable=False, index=True)
+    subscriber = Column(String, nullable=False)
+    status = Column(String, default="pending", index=True)  # pending, done, failed
+    attempts = Column(Integer, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
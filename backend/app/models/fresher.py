@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, UniqueConstraint, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -38,6 +38,28 @@ class Skill(Base):
     assessments_count = Column(Integer, default=0)
 
 
+class SkillScoreAggregate(Base):
+    """Running score statistics per (fresher, skill), maintained as submissions are graded."""
+    __tablename__ = "skill_score_aggregates"
+    __table_args__ = (UniqueConstraint("fresher_id", "skill_name", name="uq_skill_score_aggregate"),)
+
+    # skill_name of the row aggregating every graded submission, whatever its skills
+    ALL_SKILLS = "*"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    fresher_id = Column(Integer, ForeignKey("freshers.id"), nullable=False, index=True)
+    skill_name = Column(String, nullable=False)
+    count = Column(Integer, default=0)
+    total = Column(Float, default=0.0)
+    min_score = Column(Float, nullable=True)
+    max_score = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
 class Achievement(Base):
     __tablename__ = "achievements"
 
@@ -13,6 +13,12 @@ class Report(Base):
     file_path = Column(String, nullable=True)
     content = Column(Text, nullable=True)  # Stores JSON report data
     generated_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Background generation (see reports.generate_report); NULL on reports made synchronously
+    status = Column(String, nullable=True)  # queued, running, ready, failed
+    progress = Column(Integer, nullable=True)  # 0-100
+    error = Column(Text, nullable=True)
+    params = Column(Text, nullable=True)  # JSON: report_type, filters, user_id
+    completed_at = Column(DateTime(timezone=True), nullable=True)
 
 
 class Alert(Base):
@@ -28,3 +28,4 @@ class ScheduleItem(Base):
     content = Column(String, nullable=True)  # Markdown or text content
     external_url = Column(String, nullable=True)  # For videos (YouTube/Loom) or external docs
     assessment_id = Column(Integer, ForeignKey("assessments.id"), nullable=True, index=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
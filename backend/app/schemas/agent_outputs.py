@@ -0,0 +1,138 @@
+"""Schemas for structured LLM output, validated by app.core.structured_output.
+
+Models are lenient on shape (a bare string where a list is expected becomes a
+one-item list; extra keys are kept) but strict on the fields each agent
+actually depends on.
+"""
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, BeforeValidator, ConfigDict, field_validator
+from typing_extensions import Annotated
+
+
+def _as_str_list(value: Any) -> Any:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value] if value.strip() else []
+    if isinstance(value, list):
+        return [v if isinstance(v, str) else _as_text(v) for v in value]
+    return value
+
+
+def _as_text(value: Any) -> str:
+    if isinstance(value, dict):
+        return "; ".join(f"{k}: {v}" for k, v in value.items())
+    return str(value)
+
+
+StrList = Annotated[List[str], BeforeValidator(_as_str_list)]
+
+
+class LLMOutput(BaseModel):
+    model_config = ConfigDict(extra="allow")
+
+
+def _clamp_score(value: Any) -> float:
+    return max(0.0, min(100.0, float(value)))
+
+
+class QuizHRFeedback(LLMOutput):
+    overall_assessment: str
+    competency_level: str
+    strengths: StrList = []
+    development_areas: StrList
+    recommended_actions: StrList
+    hr_notes: str = ""
+
+
+class AssignmentHRFeedback(LLMOutput):
+    score: float
+    overall_assessment: str
+    competency_rating: str
+    strengths: StrList = []
+    areas_for_improvement: StrList
+    content_analysis: Dict[str, Any] = {}
+    developmental_recommendations: StrList = []
+    business_readiness_notes: str = ""
+    hr_recommendation: str = ""
+
+    @field_validator("score")
+    @classmethod
+    def _score(cls, v):
+        return _clamp_score(v)
+
+
+class ReviewFeedback(LLMOutput):
+    """Quiz / code / assignment review produced by AssessmentAgent."""
+    score: Optional[float] = None
+    overall_comment: str = ""
+    strengths: StrList = []
+    weaknesses: StrList = []
+    suggestions: StrList = []
+    missing_points: StrList = []
+    errors: StrList = []
+    improvements: StrList = []
+    risk_level: str = "low"
+    rubric_scores: Dict[str, Any] = {}
+
+    @field_validator("score")
+    @classmethod
+    def _score(cls, v):
+        return None if v is None else _clamp_score(v)
+
+
+class RiskPrediction(LLMOutput):
+    risk_level: str
+    risk_score: float = 0
+    factors: StrList = []
+    recommendations: StrList = []
+
+    @field_validator("risk_level")
+    @classmethod
+    def _level(cls, v):
+        v = str(v).strip().lower()
+        if v not in ("low", "medium", "high", "critical"):
+            raise ValueError("risk_level must be low, medium, high or critical")
+        return v
+
+    @field_validator("risk_score")
+    @classmethod
+    def _risk_score(cls, v):
+        return _clamp_score(v)
+
+
+class RiskExplanation(LLMOutput):
+    factors: StrList
+    recommendations: StrList = []
+
+
+class ScheduleTask(LLMOutput):
+    time: str = "09:00"
+    title: str
+    type: str = "reading"
+    duration: int = 30
+
+
+class SchedulePlan(LLMOutput):
+    tasks: List[ScheduleTask]
+
+
+class CohortReport(LLMOutput):
+    summary: str
+    highlights: StrList = []
+    recommendations: StrList = []
+
+
+class IndividualHRReport(LLMOutput):
+    executive_summary: str
+
+
+class CohortInsights(LLMOutput):
+    executive_summary: str
+    key_strengths: StrList = []
+    areas_of_concern: StrList = []
+    cohort_health_rating: str = "Satisfactory"
+    immediate_actions_required: StrList = []
+    talent_retention_outlook: str = ""
+    strategic_recommendations: StrList = []
+    hr_notes: str = ""
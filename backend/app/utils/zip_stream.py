@@ -0,0 +1,38 @@
+"""Streaming ZIP writer for bulk downloads."""
+import io
+import zipfile
+from typing import Iterable, Iterator, Tuple
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, unseekable buffer that zipfile writes into and the stream drains."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Yield a ZIP archive chunk by chunk as ``(name, data)`` entries arrive.
+
+    Only the entry being written is buffered, so memory stays flat however
+    many entries there are. Entries are stored uncompressed: they are PDFs,
+    whose page streams are already compressed.
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in entries:
+            archive.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
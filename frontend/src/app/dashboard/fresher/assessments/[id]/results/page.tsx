@@ -22,6 +22,7 @@ function toDisplayString(val: unknown): string {
 interface WorkflowStatus {
   submission_id: string;
   status: string;
+  feedback_status?: string | null;
   score: number;
   max_score: number;
   pass_status: string;
@@ -54,6 +55,11 @@ interface WorkflowStatus {
   graded_at?: string;
 }
 
+// Grading (and the AI feedback after it) runs in the background; poll on one timer within a budget
+const GRADING_POLL_INTERVAL_MS = 2000;
+const FEEDBACK_POLL_INTERVAL_MS = 3000;
+const GRADING_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
 export default function ResultsPage() {
   const params = useParams();
   const router = useRouter();
@@ -65,7 +71,6 @@ export default function ResultsPage() {
   const [result, setResult] = useState<WorkflowStatus | null>(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
-  const [pollingCount, setPollingCount] = useState(0);
 
   useEffect(() => {
     console.log(`[RESULTS] Page loaded, traceId=${traceId}, assessmentId=${assessmentId}`);
@@ -116,6 +121,13 @@ export default function ResultsPage() {
       return;
     }
 
+    let cancelled = false;
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const deadline = Date.now() + GRADING_POLL_TIMEOUT_MS;
+    const schedule = (delay: number) => {
+      if (!cancelled) timer = setTimeout(pollStatus, delay);
+    };
+
     const pollStatus = async () => {
       if (authLoading) return;
 
@@ -126,6 +138,7 @@ export default function ResultsPage() {
 
       console.log(`[RESULTS] Polling status for trace_id=${traceId}`);
       const response = await api.workflow.getStatus(traceId, token);
+      if (cancelled) return; // Left the page; stop polling
 
       if (response.error) {
         console.log(`[RESULTS] Status API error:`, response.error);
@@ -145,6 +158,7 @@ export default function ResultsPage() {
           setResult({
             ...resultData,
             status: data.status || resultData.status,
+            feedback_status: data.feedback_status ?? resultData.feedback_status,
             submission_id: resultData.submission_id,
             score: resultData.score || 0,
             max_score: resultData.max_score || 100,
@@ -162,14 +176,18 @@ export default function ResultsPage() {
             test_results: resultData.test_results || [],
           });
           setLoading(false);
+
+          // Score is final; AI feedback is attached in the background, so refresh until it lands
+          if (data.feedback_status === 'pending' && Date.now() < deadline) {
+            schedule(FEEDBACK_POLL_INTERVAL_MS);
+          }
         } else if (data.status === 'failed') {
           setError('Assessment grading failed. Please contact support.');
           setLoading(false);
         } else {
           // Continue polling
-          setPollingCount((prev) => prev + 1);
-          if (pollingCount < 30) {
-            setTimeout(pollStatus, 2000);
+          if (Date.now() < deadline) {
+            schedule(GRADING_POLL_INTERVAL_MS);
           } else {
             setError('Grading is taking longer than expected. Please check back later.');
             setLoading(false);
@@ -179,7 +197,11 @@ export default function ResultsPage() {
     };
 
     pollStatus();
-  }, [traceId, router, pollingCount, token, authLoading]);
+    return () => {
+      cancelled = true;
+      if (timer) clearTimeout(timer);
+    };
+  }, [traceId, router, token, authLoading]);
 
   const getRiskColor = (level: string) => {
     switch (level?.toLowerCase()) {
@@ -385,6 +407,12 @@ export default function ResultsPage() {
             <span>🤖</span> AI Agent Feedback
           </h2>
 
+          {result.feedback_status === 'pending' && (
+            <p className="mb-6 text-sm text-gray-500">
+              Your score is final. Detailed AI feedback is still being prepared and will appear here shortly.
+            </p>
+          )}
+
           {/* Overall Comment */}
           <div className="mb-6 p-6 bg-blue-50 border-l-4 border-blue-500 rounded-r-lg">
             <h3 className="font-semibold text-blue-900 mb-2 flex items-center gap-2">
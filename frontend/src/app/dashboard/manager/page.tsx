@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useEffect, useCallback } from 'react';
+import React, { useState, useEffect, useCallback, useRef } from 'react';
 import Link from 'next/link';
 import { useRouter } from 'next/navigation';
 import {
@@ -29,6 +29,10 @@ const getDemoData = () => ({
   reports: [] as any[],
 });
 
+// Stop waiting on a queued report after this long; it keeps generating server-side
+const REPORT_POLL_INTERVAL_MS = 1000;
+const REPORT_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+
 // Interfaces for type safety
 interface DepartmentStat { name: string; freshers: number; avgProgress: number; atRisk: number; }
 interface TopPerformer { name: string; progress: number; trend: string; assessmentScore: number; }
@@ -234,6 +238,12 @@ export default function ManagerDashboard() {
   const [selectedReportDept, setSelectedReportDept] = useState<string>('all');
   const [lastGeneratedReportId, setLastGeneratedReportId] = useState<string | null>(null);
   const [lastGeneratedType, setLastGeneratedType] = useState<string | null>(null);
+  const [reportNotice, setReportNotice] = useState<string | null>(null);
+  const mountedRef = useRef(true);
+  useEffect(() => {
+    mountedRef.current = true;
+    return () => { mountedRef.current = false; };
+  }, []);
   const [aiTopic, setAiTopic] = useState('React Hooks');
   const [aiType, setAiType] = useState('quiz');
   const [aiStatus, setAiStatus] = useState<string | null>(null);
@@ -255,16 +265,12 @@ export default function ManagerDashboard() {
     setIsGeneratingReport(true);
     setActiveReportType(type);
     setReportProgress(0);
-
-    // Smooth progress simulation
-    const interval = setInterval(() => {
-      setReportProgress(p => { if (p >= 90) { return 90; } return p + 10; });
-    }, 300);
+    setReportNotice(null);
 
     try {
       let reportId: string | null = null;
 
-      // 1. Generate Report
+      // 1. Queue the report (the server generates it in the background)
       setLastGeneratedReportId(null);
       setLastGeneratedType(null);
 
@@ -276,18 +282,38 @@ export default function ManagerDashboard() {
 
       if (result.data) {
         reportId = result.data.id;
-        setLastGeneratedReportId(result.data.id);
-        setLastGeneratedType(type);
         // Background refresh - don't await blocking
         fetchDashboardData();
       }
 
-      // Complete bar
-      clearInterval(interval);
-      setReportProgress(100);
-      await new Promise(r => setTimeout(r, 400)); // Visual completion
+      // 2. Poll until the report is ready, mirroring server-side progress
+      if (reportId) {
+        const apiUrl = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/v1';
+        const deadline = Date.now() + REPORT_POLL_TIMEOUT_MS;
+        let ready = false;
+        while (!ready && Date.now() < deadline) {
+          await new Promise(r => setTimeout(r, REPORT_POLL_INTERVAL_MS));
+          if (!mountedRef.current) return; // Left the page; stop polling
+          const res = await fetch(`${apiUrl}/reports/${reportId}/status`, {
+            headers: { Authorization: `Bearer ${token}` },
+          });
+          if (!res.ok) throw new Error(`Status check failed (${res.status})`);
+          const status = await res.json();
+          if (status.status === 'failed') throw new Error(status.error || 'Report generation failed');
+          setReportProgress(Number(status.progress) || 0);
+          ready = status.status === 'ready';
+        }
+        if (!ready) {
+          setReportNotice('This report is still being generated. Check back later; it will appear under Recent Reports when ready.');
+          return;
+        }
+        setLastGeneratedReportId(reportId);
+        setLastGeneratedType(type);
+        fetchDashboardData();
+        await new Promise(r => setTimeout(r, 400)); // Visual completion
+      }
 
-      // 2. Download Report via direct browser navigation (most reliable)
+      // 3. Download Report via direct browser navigation (most reliable)
       if (reportId) {
         try {
           console.log(`[Manager] Starting download for report ${reportId}`);
@@ -324,7 +350,6 @@ export default function ManagerDashboard() {
       setIsGeneratingReport(false);
       setActiveReportType(null);
       setReportProgress(0);
-      clearInterval(interval);
     }
   };
 
@@ -543,6 +568,9 @@ export default function ManagerDashboard() {
             <div className="space-y-6">
               <div className="bg-white rounded-xl border p-6">
                 <h2 className="text-lg font-semibold text-gray-900 mb-6">Report Generation</h2>
+                {reportNotice && !isGeneratingReport && (
+                  <div className="mb-6 p-4 bg-yellow-50 rounded-xl text-sm text-yellow-800">{reportNotice}</div>
+                )}
                 {isGeneratingReport && (
                   <div className="mb-6 p-4 bg-purple-50 rounded-xl">
                     <div className="flex items-center justify-between mb-2"><span className="text-sm font-medium text-purple-700">Generating report...</span><span className="text-sm text-purple-600">{reportProgress}%</span></div>